@@ -1,9 +1,15 @@
-import os
 from abc import ABC, abstractmethod
+import asyncio
+import hashlib
+import importlib.util
 import json
 import logging
-from openai import OpenAI
-from groq import Groq
+import threading
+import time
+import weakref
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from groq import Groq, AsyncGroq
 from src import config
 
 # Configure logging
@@ -13,19 +19,60 @@ logger = logging.getLogger(__name__)
 class AIProvider(ABC):
     """Abstract base class for AI Providers."""
 
-    def __init__(self, api_key: str, model_name: str, temperature: float = 0.1):
+    provider_name = ""
+    max_concurrency = None  # Most calls worth having in flight at once (None: no provider limit)
+
+    def __init__(self, api_key: str, model_name: str, temperature: float = 0.1, timeout: float = None):
         self.api_key = api_key
         self.model_name = model_name
         self.temperature = temperature
+        self.timeout = timeout or config.AI_REQUEST_TIMEOUT_SECONDS
+        self.token_usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        # One client can be shared by several worker threads (e.g. ZIP ingestion)
+        self._usage_lock = threading.Lock()
 
     @abstractmethod
-    def generate_critique(self, prompt: str, system_instruction: str = None) -> str:
+    def generate_critique(self, prompt: str, system_instruction: str = None, timeout: float = None,
+                          max_tokens: int = None, schema: dict = None) -> str:
         """
         Generates a critique for the given prompt.
         Must return a string resembling a JSON object.
+        `timeout` (seconds) overrides the provider's per-call timeout and
+        `max_tokens` the completion budget (default DEFAULT_MAX_TOKENS).
+        `schema` is the JSON schema the answer should follow; providers with
+        schema-constrained decoding use it, the others rely on the prompt.
         """
         pass
 
+    async def agenerate_critique(self, prompt: str, system_instruction: str = None, timeout: float = None,
+                                 max_tokens: int = None, schema: dict = None) -> str:
+        """
+        Async variant of generate_critique for use on an event loop.
+        Providers without a native async client run the sync call in a worker thread.
+        """
+        return await asyncio.to_thread(self.generate_critique, prompt, system_instruction, timeout, max_tokens, schema)
+
+    @staticmethod
+    def _build_messages(prompt: str, system_instruction: str = None) -> list:
+        messages = []
+        if system_instruction:
+            messages.append({"role": "system", "content": system_instruction})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _record_usage(self, response):
+        """Accumulate token usage reported by an OpenAI-compatible response."""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        self._add_usage(**{key: getattr(usage, key, 0) or 0 for key in self.token_usage})
+
+    def _add_usage(self, prompt_tokens: int = 0, completion_tokens: int = 0, total_tokens: int = 0):
+        with self._usage_lock:
+            self.token_usage["prompt_tokens"] += prompt_tokens
+            self.token_usage["completion_tokens"] += completion_tokens
+            self.token_usage["total_tokens"] += total_tokens
+
     def validate(self) -> tuple[bool, str]:
         """Simple validation of the API key availability."""
         if not self.api_key:
@@ -36,16 +83,15 @@ class AIProvider(ABC):
 class OpenAIProvider(AIProvider):
     """Provider for OpenAI (GPT-4, etc.)"""
 
-    def generate_critique(self, prompt: str, system_instruction: str = None) -> str:
+    provider_name = config.PROVIDER_OPENAI
+
+    def generate_critique(self, prompt: str, system_instruction: str = None, timeout: float = None,
+                          max_tokens: int = None, schema: dict = None) -> str:
         if not self.api_key:
             raise ValueError("OpenAI API Key is missing.")
 
-        client = OpenAI(api_key=self.api_key)
-
-        messages = []
-        if system_instruction:
-            messages.append({"role": "system", "content": system_instruction})
-        messages.append({"role": "user", "content": prompt})
+        client = OpenAI(api_key=self.api_key, timeout=self.timeout if timeout is None else timeout, max_retries=config.AI_REQUEST_MAX_RETRIES)
+        messages = self._build_messages(prompt, system_instruction)
 
         try:
             response = client.chat.completions.create(
@@ -53,8 +99,29 @@ class OpenAIProvider(AIProvider):
                 messages=messages,
                 response_format={"type": "json_object"},  # Force JSON mode
                 temperature=self.temperature,
-                max_tokens=config.DEFAULT_MAX_TOKENS
+                max_tokens=max_tokens or config.DEFAULT_MAX_TOKENS
             )
+            self._record_usage(response)
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.error(f"OpenAI Error: {e}")
+            raise e
+
+    async def agenerate_critique(self, prompt: str, system_instruction: str = None, timeout: float = None,
+                                 max_tokens: int = None, schema: dict = None) -> str:
+        if not self.api_key:
+            raise ValueError("OpenAI API Key is missing.")
+
+        try:
+            async with AsyncOpenAI(api_key=self.api_key, timeout=self.timeout if timeout is None else timeout, max_retries=config.AI_REQUEST_MAX_RETRIES) as client:
+                response = await client.chat.completions.create(
+                    model=self.model_name,
+                    messages=self._build_messages(prompt, system_instruction),
+                    response_format={"type": "json_object"},
+                    temperature=self.temperature,
+                    max_tokens=max_tokens or config.DEFAULT_MAX_TOKENS
+                )
+            self._record_usage(response)
             return response.choices[0].message.content.strip()
         except Exception as e:
             logger.error(f"OpenAI Error: {e}")
@@ -64,25 +131,47 @@ class OpenAIProvider(AIProvider):
 class GroqProvider(AIProvider):
     """Provider for Groq (Llama 3, etc.)"""
 
-    def generate_critique(self, prompt: str, system_instruction: str = None) -> str:
+    provider_name = config.PROVIDER_GROQ
+
+    def generate_critique(self, prompt: str, system_instruction: str = None, timeout: float = None,
+                          max_tokens: int = None, schema: dict = None) -> str:
         if not self.api_key:
             raise ValueError("Groq API Key is missing.")
 
-        client = Groq(api_key=self.api_key)
-
-        messages = []
-        if system_instruction:
-            messages.append({"role": "system", "content": system_instruction})
-        messages.append({"role": "user", "content": prompt})
+        client = Groq(api_key=self.api_key, timeout=self.timeout if timeout is None else timeout, max_retries=config.AI_REQUEST_MAX_RETRIES)
+        messages = self._build_messages(prompt, system_instruction)
 
         try:
             response = client.chat.completions.create(
                 model=self.model_name,
                 messages=messages,
                 temperature=self.temperature,
-                max_tokens=config.DEFAULT_MAX_TOKENS,
+                max_tokens=max_tokens or config.DEFAULT_MAX_TOKENS,
                 response_format={"type": "json_object"} # Groq supports JSON mode for Llama 3 models
             )
+            self._record_usage(response)
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.error(f"Groq Error: {e}")
+            if "401" in str(e):
+                 raise Exception("Invalid Groq API Key.")
+            raise e
+
+    async def agenerate_critique(self, prompt: str, system_instruction: str = None, timeout: float = None,
+                                 max_tokens: int = None, schema: dict = None) -> str:
+        if not self.api_key:
+            raise ValueError("Groq API Key is missing.")
+
+        try:
+            async with AsyncGroq(api_key=self.api_key, timeout=self.timeout if timeout is None else timeout, max_retries=config.AI_REQUEST_MAX_RETRIES) as client:
+                response = await client.chat.completions.create(
+                    model=self.model_name,
+                    messages=self._build_messages(prompt, system_instruction),
+                    temperature=self.temperature,
+                    max_tokens=max_tokens or config.DEFAULT_MAX_TOKENS,
+                    response_format={"type": "json_object"}
+                )
+            self._record_usage(response)
             return response.choices[0].message.content.strip()
         except Exception as e:
             logger.error(f"Groq Error: {e}")
@@ -90,11 +179,216 @@ class GroqProvider(AIProvider):
                  raise Exception("Invalid Groq API Key.")
             raise e
 
+
+class MockProvider(AIProvider):
+    """
+    Offline provider for tests, demos and load testing.
+    Returns a deterministic, well-formed critique derived from a hash of the
+    prompt, after an optional simulated latency (MOCK_LATENCY_SECONDS).
+    Only the fields the schema asks for are returned, so triage answers are short.
+    """
+
+    provider_name = config.PROVIDER_MOCK
+
+    def _mock_response(self, prompt: str, schema: dict = None) -> str:
+        digest = hashlib.sha256(f"{self.model_name}:{prompt}".encode("utf-8", errors="ignore")).digest()
+        scores = {cat: 3 + digest[i] % 7 for i, cat in enumerate(config.ANALYSIS_CATEGORIES)}
+        response = {
+            "scores": scores,
+            "overall_score": round(sum(scores.values()) / len(scores)),
+            "feedback": {cat: f"Mock feedback for {cat} (score {score}/10)." for cat, score in scores.items()},
+            "recommendations": "Mock recommendation: quantify achievements and tailor keywords to the target role.",
+            "pros": [f"Strong {max(scores, key=scores.get)}"],
+            "cons": [f"Weak {min(scores, key=scores.get)}"]
+        }
+        if schema:
+            response = {k: v for k, v in response.items() if k in schema.get("properties", {})}
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = 60 * len(config.ANALYSIS_CATEGORIES) if "feedback" in response else 8 * len(config.ANALYSIS_CATEGORIES)
+        self._add_usage(prompt_tokens, completion_tokens, prompt_tokens + completion_tokens)
+        return json.dumps(response)
+
+    def validate(self) -> tuple[bool, str]:
+        return True, ""
+
+    def generate_critique(self, prompt: str, system_instruction: str = None, timeout: float = None,
+                          max_tokens: int = None, schema: dict = None) -> str:
+        timeout = self.timeout if timeout is None else timeout
+        if config.MOCK_LATENCY_SECONDS > 0:
+            time.sleep(min(config.MOCK_LATENCY_SECONDS, timeout))
+            if config.MOCK_LATENCY_SECONDS > timeout:
+                raise TimeoutError(f"Mock request timed out after {timeout:.1f}s")
+        return self._mock_response(prompt, schema)
+
+    async def agenerate_critique(self, prompt: str, system_instruction: str = None, timeout: float = None,
+                                 max_tokens: int = None, schema: dict = None) -> str:
+        timeout = self.timeout if timeout is None else timeout
+        if config.MOCK_LATENCY_SECONDS > 0:
+            await asyncio.sleep(min(config.MOCK_LATENCY_SECONDS, timeout))
+            if config.MOCK_LATENCY_SECONDS > timeout:
+                raise TimeoutError(f"Mock request timed out after {timeout:.1f}s")
+        return self._mock_response(prompt, schema)
+
+
+class _LocalServer:
+    """
+    Connection pool and slot limit shared by every LocalProvider that talks to
+    one server, so calls reuse warm keep-alive connections and never send the
+    server more requests than it has slots for.
+    """
+
+    def __init__(self, base_url: str, api_key: str):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.slots = config.LOCAL_SERVER_SLOTS or self._discover_slots() or 4
+        self.http2 = config.LOCAL_HTTP2
+        if self.http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("LOCAL_HTTP2 needs the h2 package (pip install httpx[http2]); using HTTP/1.1 keep-alive")
+            self.http2 = False
+        self.client = OpenAI(base_url=base_url, api_key=api_key, max_retries=config.AI_REQUEST_MAX_RETRIES,
+                             http_client=httpx.Client(limits=self._limits(), http2=self.http2))
+        self.slot_gate = threading.BoundedSemaphore(self.slots)
+        # httpx.AsyncClient connections and asyncio primitives belong to one event loop
+        self._async = weakref.WeakKeyDictionary()
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.slots, max_keepalive_connections=self.slots,
+                            keepalive_expiry=config.LOCAL_KEEPALIVE_SECONDS)
+
+    def _discover_slots(self) -> int:
+        """Parallel slots reported by a llama.cpp server (GET /props), or 0 if unknown."""
+        root = self.base_url.rstrip("/").removesuffix("/v1")
+        try:
+            response = httpx.get(f"{root}/props", timeout=2.0)
+            slots = int(response.json().get("total_slots") or 0) if response.is_success else 0
+        except (httpx.HTTPError, ValueError, TypeError, AttributeError):
+            slots = 0
+        if slots:
+            logger.info(f"Local model server {root} reports {slots} slot(s)")
+        return slots
+
+    def async_client(self):
+        """(AsyncOpenAI client, asyncio.Semaphore) for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if loop not in self._async:
+            client = AsyncOpenAI(base_url=self.base_url, api_key=self.api_key, max_retries=config.AI_REQUEST_MAX_RETRIES,
+                                 http_client=httpx.AsyncClient(limits=self._limits(), http2=self.http2))
+            self._async[loop] = (client, asyncio.Semaphore(self.slots))
+        return self._async[loop]
+
+
+_local_servers = {}
+_local_servers_lock = threading.Lock()
+
+
+def _get_local_server(base_url: str, api_key: str) -> _LocalServer:
+    with _local_servers_lock:
+        key = (base_url, api_key)
+        if key not in _local_servers:
+            _local_servers[key] = _LocalServer(base_url, api_key)
+        return _local_servers[key]
+
+
+class LocalProvider(AIProvider):
+    """
+    Provider for an OpenAI-compatible server on our own hosts (llama.cpp,
+    vLLM, ...) at LOCAL_BASE_URL. Calls go over pooled keep-alive
+    connections, at most one per server slot, and can be constrained to the
+    chunk response schema (LOCAL_CONSTRAINED_DECODING).
+    """
+
+    provider_name = config.PROVIDER_LOCAL
+
+    def __init__(self, api_key: str, model_name: str, temperature: float = 0.1, timeout: float = None, base_url: str = None):
+        super().__init__(api_key, model_name, temperature, timeout)
+        self.base_url = base_url or config.LOCAL_BASE_URL
+
+    @property
+    def max_concurrency(self):
+        return self._server().slots
+
+    def _server(self) -> _LocalServer:
+        if not self.base_url:
+            raise ValueError("LOCAL_BASE_URL is not set.")
+        return _get_local_server(self.base_url, self.api_key or "local")
+
+    def validate(self) -> tuple[bool, str]:
+        if not self.base_url:
+            return False, "LOCAL_BASE_URL is not set."
+        return True, ""
+
+    def _request_args(self, prompt: str, system_instruction: str = None, max_tokens: int = None, schema: dict = None) -> dict:
+        args = {
+            "model": self.model_name,
+            "messages": self._build_messages(prompt, system_instruction),
+            "temperature": self.temperature,
+            "max_tokens": max_tokens or config.DEFAULT_MAX_TOKENS
+        }
+        if config.LOCAL_CONSTRAINED_DECODING == "json_schema" and schema is not None:
+            args["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "chunk_analysis", "schema": schema, "strict": True}
+            }
+        elif config.LOCAL_CONSTRAINED_DECODING in ("json_schema", "json_object"):
+            # Without a schema the answer is still held to JSON
+            args["response_format"] = {"type": "json_object"}
+        return args
+
+    def generate_critique(self, prompt: str, system_instruction: str = None, timeout: float = None,
+                          max_tokens: int = None, schema: dict = None) -> str:
+        timeout = self.timeout if timeout is None else timeout
+        server = self._server()
+        started = time.monotonic()
+        # Waiting for a free slot counts against the call's timeout
+        if not server.slot_gate.acquire(timeout=timeout):
+            raise TimeoutError(f"No free slot on {self.base_url} within {timeout:.1f}s")
+        try:
+            response = server.client.chat.completions.create(
+                **self._request_args(prompt, system_instruction, max_tokens, schema),
+                timeout=max(0.1, timeout - (time.monotonic() - started))
+            )
+            self._record_usage(response)
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.error(f"Local model Error: {e}")
+            raise e
+        finally:
+            server.slot_gate.release()
+
+    async def agenerate_critique(self, prompt: str, system_instruction: str = None, timeout: float = None,
+                                 max_tokens: int = None, schema: dict = None) -> str:
+        timeout = self.timeout if timeout is None else timeout
+        # The first call to a server may ask it for its slot count (a blocking GET /props)
+        server = await asyncio.to_thread(self._server)
+        client, slot_gate = server.async_client()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(slot_gate.acquire(), timeout)
+        except TimeoutError:
+            raise TimeoutError(f"No free slot on {self.base_url} within {timeout:.1f}s") from None
+        try:
+            response = await client.chat.completions.create(
+                **self._request_args(prompt, system_instruction, max_tokens, schema),
+                timeout=max(0.1, timeout - (time.monotonic() - started))
+            )
+            self._record_usage(response)
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.error(f"Local model Error: {e}")
+            raise e
+        finally:
+            slot_gate.release()
+
+
 def get_provider(provider_name: str, api_key: str, model_name: str) -> AIProvider:
     """Factory function to get the correct provider instance."""
     if provider_name == config.PROVIDER_OPENAI:
         return OpenAIProvider(api_key, model_name)
     elif provider_name == config.PROVIDER_GROQ:
         return GroqProvider(api_key, model_name)
+    elif provider_name == config.PROVIDER_MOCK:
+        return MockProvider(api_key, model_name)
+    elif provider_name == config.PROVIDER_LOCAL:
+        return LocalProvider(api_key, model_name)
     else:
         raise ValueError(f"Unknown provider: {provider_name}")
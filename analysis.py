@@ -0,0 +1,736 @@
+"""
+Resume analysis pipeline for Resume Critiquer application.
+Text extraction, chunking, prompt building, response parsing and
+aggregation, shared by the Streamlit app and the HTTP API.
+"""
+import asyncio
+import codecs
+import contextlib
+import io
+import json
+import logging
+import re
+import sqlite3
+import zlib
+import PyPDF2
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from src import config, chunk_cache, single_flight, response_schema, deadlines, persistence
+from src.response_schema import ChunkAnalysis
+
+logger = logging.getLogger(__name__)
+
+
+def iter_pdf_pages(stream):
+    """Yield the text of each PDF page in order, read from a binary stream (pages without text are skipped)."""
+    for page in PyPDF2.PdfReader(stream).pages:
+        page_text = page.extract_text()
+        if page_text:
+            yield page_text + "\n"
+
+def iter_text_pieces(stream, piece_bytes=None):
+    """Yield a UTF-8 text file's content in pieces of about STREAM_READ_BYTES."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    piece_bytes = piece_bytes or config.STREAM_READ_BYTES
+    while True:
+        block = stream.read(piece_bytes)
+        if not block:
+            break
+        text = decoder.decode(block)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+def iter_document_text(stream, is_pdf):
+    """Page texts of a PDF, or pieces of a plain-text file, read lazily from `stream`."""
+    return iter_pdf_pages(stream) if is_pdf else iter_text_pieces(stream)
+
+def extract_text(stream, is_pdf):
+    try:
+        return "".join(iter_document_text(stream, is_pdf))
+    except Exception:
+        return ""
+
+def extract_text_from_pdf_bytes(pdf_bytes):
+    return extract_text(io.BytesIO(pdf_bytes), is_pdf=True)
+
+def extract_text_from_bytes(content, is_pdf):
+    if is_pdf:
+        return extract_text_from_pdf_bytes(content)
+    return content.decode("utf-8", errors="ignore")
+
+def extract_text_from_uploaded(uploaded_file):
+    # PyPDF2 reads straight from the upload; no extra copy of its bytes is made
+    try:
+        uploaded_file.seek(0)
+    except Exception:
+        return ""
+    return extract_text(uploaded_file, uploaded_file.type == "application/pdf")
+
+def _next_chunk_cut(text, start, max_len, min_len):
+    """
+    End of the chunk starting at `start`: just after the first line, at least
+    min_len into the chunk, whose trailing CDC_WINDOW_CHARS characters hash to
+    0 mod CDC_BOUNDARY_DIVISOR. If no line qualifies before max_len, the chunk
+    is cut at the last newline or space before max_len instead. Only reads
+    text[start:start + max_len + 1].
+    """
+    window = config.CDC_WINDOW_CHARS
+    divisor = config.CDC_BOUNDARY_DIVISOR
+    pos = text.find("\n", start + min_len - 1, start + max_len)
+    while pos != -1:
+        tail = text[max(start, pos + 1 - window):pos + 1]
+        if zlib.crc32(tail.encode("utf-8", errors="ignore")) % divisor == 0:
+            return pos + 1
+        pos = text.find("\n", pos + 1, start + max_len)
+    limit = start + max_len
+    fallback = max(text.rfind("\n", start + min_len, limit), text.rfind(" ", start + min_len, limit))
+    return fallback + 1 if fallback != -1 else limit
+
+def find_chunk_boundaries(text, max_len):
+    """
+    Content-defined cut points (see _next_chunk_cut), once each chunk is at
+    least max_len/2 long. Cuts depend only on nearby content, so an edit moves
+    the boundaries of the chunk it touches and nothing after it.
+    """
+    min_len = max(1, max_len // 2)
+    cuts = []
+    start = 0
+    while len(text) - start > max_len:
+        start = _next_chunk_cut(text, start, max_len, min_len)
+        cuts.append(start)
+    return cuts
+
+def iter_chunks(pieces, size=3000, overlap=200):
+    """
+    Streaming chunk_text: consumes text pieces (e.g. PDF pages from
+    iter_document_text) and yields exactly the chunks chunk_text would give
+    for their concatenation, holding about one chunk plus one piece at a time.
+    """
+    if size <= 0:
+        text = "".join(pieces)
+        if text:
+            yield text
+        return
+    overlap = max(0, min(overlap, size // 2))
+    max_len = size - overlap
+    min_len = max(1, max_len // 2)
+    # Each chunk is prefixed with the tail of the previous one and never
+    # exceeds `size` characters in total. buf holds the text from `overlap`
+    # characters before the current chunk start onward.
+    buf = ""
+    start = 0
+    for piece in pieces:
+        buf += piece
+        while len(buf) - start > max_len:
+            cut = _next_chunk_cut(buf, start, max_len, min_len)
+            yield buf[max(0, start - overlap):cut]
+            start = cut
+        keep_from = max(0, start - overlap)
+        buf = buf[keep_from:]
+        start -= keep_from
+    if buf[start:]:
+        yield buf
+
+def chunk_text(text, size=3000, overlap=200):
+    if not text: return []
+    return list(iter_chunks([text], size, overlap))
+
+def count_chunks(text, size=3000, overlap=200):
+    """len(chunk_text(text, size, overlap)), from the cut points alone; no chunk is built."""
+    if not text: return 0
+    if size <= 0: return 1
+    overlap = max(0, min(overlap, size // 2))
+    return len(find_chunk_boundaries(text, size - overlap)) + 1
+
+def get_system_instruction():
+    return """You are an expert resume reviewer with years of HR and recruitment experience.
+    Analyze the resume content provided by the user.
+    Output must be a valid JSON object ONLY.
+    Follow the structure strictly."""
+
+def build_prompt_for_chunk(resume_chunk, job_role=None, keyword_digest=None):
+    role_snip = f"Target role: {job_role}\n" if job_role else ""
+    keyword_snip = f"""
+    Local ATS keyword scan of the WHOLE resume (deterministic, already verified — use it for the ATS & Keywords category instead of re-deriving keyword lists):
+    {keyword_digest}
+    """ if keyword_digest else ""
+    prompt = f"""
+    You are an expert resume reviewer with years of HR and recruitment experience.
+    Analyze the following resume chunk. Return ONLY a JSON object (no markdown or extra text but explain each and every section in detail.
+    Make sure to cover all the little details that should be informed to the user.
+    Have a priority on being specific and try not to generalize the response.
+    Make sure to have a professional and humanly tone to make a better understanding.
+    Be as informative as possible
+    Take extra care while explaining the ATS & Keyword section, provide the user with exactly what words to use and why
+    Ensure role-specific insights:
+    “Tailor the analysis toward the specific type of role the resume seems to target (e.g., IT, Marketing, Finance, Operations) and explicitly mention how well it aligns with that role.”
+    Add industry benchmarking:
+    “Where possible, compare the resume’s strengths and weaknesses against common industry standards or expectations for the candidate’s field and seniority level.”
+    Highlight language/tone use:
+    “Comment on the language, tone, and action verbs used in the resume, and suggest stronger alternatives where impact is lacking.”
+    Include red flags:
+    “Identify any potential red flags (e.g., employment gaps, vague job descriptions, outdated skills) and explain how recruiters or ATS might interpret them.”
+    Add keyword strategy detail:
+    “In the ats_keywords section, go beyond listing present/missing keywords and provide context for placement (e.g., ‘add “risk management” under your Acme Corp role where you handled compliance processes’).”
+    Point out formatting compatibility issues:
+    “Note any risks of ATS parsing errors (e.g., tables, graphics, uncommon fonts, headers/footers).”
+    Final polish suggestion:
+    “Suggest how the candidate can make the resume stand out to a human recruiter after passing ATS (e.g., storytelling, achievement framing).”
+    If analysis fails return: {{ "error": "Resume could not be analyzed" }}
+    First give the score in each category individually and then give the overall score after aggregation.
+    Structure:
+    {{
+      "scores": {{
+        "Content Clarity & Impact": <int 0-10>,
+        "Skills Presentation": <int 0-10>,
+        "Experience Descriptions": <int 0-10>,
+        "Tailoring": <int 0-10>,
+        "Structure & Readability": <int 0-10>,
+        "Achievements & Metrics": <int 0-10>,
+        "ATS & Keywords": <int 0-10>,
+        "Specific Improvements": <int 0-10>
+      }},
+      "overall_score": <int 0-10>,
+      "feedback": {{
+        "Content Clarity & Impact": "<text>",
+        "Skills Presentation": "<text>",
+        "Experience Descriptions": "<text>",
+        "Tailoring": "<text>",
+        "Structure & Readability": "<text>",
+        "Achievements & Metrics": "<text>",
+        "ATS & Keywords": "<text>",
+        "Specific Improvements": "<text>"
+      }},
+      "recommendations": "<summary>",
+      "pros": ["<...>"],
+      "cons": ["<...>"]
+    }}
+
+    {role_snip}{keyword_snip}
+    Resume chunk:
+    {resume_chunk}
+    """
+    return prompt
+
+def build_triage_prompt_for_chunk(resume_chunk, job_role=None, keyword_digest=None):
+    """
+    Scores-only prompt for triage runs: no per-category feedback or
+    recommendations, so the answer is a few hundred tokens instead of thousands.
+    """
+    role_snip = f"Target role: {job_role}\n" if job_role else ""
+    keyword_snip = f"""
+    Local ATS keyword scan of the WHOLE resume (deterministic, already verified — use it for the ATS & Keywords score):
+    {keyword_digest}
+    """ if keyword_digest else ""
+    scores = ",\n".join(f'        "{cat}": <int 0-10>' for cat in config.ANALYSIS_CATEGORIES)
+    return f"""
+    Score the following resume chunk for a quick screening pass. Return ONLY a JSON object, no explanations.
+    Give every category an integer score from 0 to 10, then the overall score.
+    List at most {config.TRIAGE_MAX_LIST_ITEMS} pros and {config.TRIAGE_MAX_LIST_ITEMS} cons of a few words each.
+    If analysis fails return: {{ "error": "Resume could not be analyzed" }}
+    Structure:
+    {{
+      "scores": {{
+{scores}
+      }},
+      "overall_score": <int 0-10>,
+      "pros": ["<few words>"],
+      "cons": ["<few words>"]
+    }}
+
+    {role_snip}{keyword_snip}
+    Resume chunk:
+    {resume_chunk}
+    """
+
+def extract_first_json(text):
+    """
+    Attempt to find and parse the first JSON object in text.
+    """
+    # Try clean load
+    try:
+        return json.loads(text)
+    except Exception:
+        # An answer cut off mid-object (e.g. at max_tokens) keeps the members it completed
+        salvaged = _salvage_truncated_json(text)
+        if salvaged is not None:
+            return salvaged
+        # try regex for balanced braces (best-effort)
+        # This regex uses a greedy match; we then try to parse progressively smaller substrings if needed.
+        brace_open = [m.start() for m in re.finditer(r"\{", text)]
+        for start in brace_open:
+            # try to find a matching closing brace by scanning forward
+            for end_idx in range(start+1, min(len(text), start+20000)):
+                if text[end_idx] == "}":
+                    candidate = text[start:end_idx+1]
+                    try:
+                        return json.loads(candidate)
+                    except Exception:
+                        continue
+        # As a last resort, try extracting via broad regex
+        m = re.search(r"\{[\s\S]*\}", text)
+        if m:
+            try:
+                return json.loads(m.group(0))
+            except Exception:
+                pass
+    raise ValueError("No valid JSON object found in model response.")
+
+
+def _salvage_truncated_json(text):
+    """
+    Parse a JSON object whose text ends before the object closes: keep it up to
+    the last complete member and close the brackets still open.
+    Returns None if the object does close, or if nothing parses.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    closers = []
+    cuts = []  # (end, closers) where the text could stop
+    in_string = escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            closers.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if closers:
+                closers.pop()
+            if not closers:
+                return None
+            cuts.append((i + 1, "".join(reversed(closers))))
+        elif ch == ",":
+            cuts.append((i, "".join(reversed(closers))))
+    for end, closing in reversed(cuts):
+        try:
+            data = json.loads(text[start:end] + closing)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
+
+
+def aggregate_chunk_analyses(chunk_results):
+    """
+    chunk_results: list of ChunkAnalysis records, one per chunk
+    Numeric scores are averaged over the chunks that scored each category.
+    For textual feedback, we concatenate unique lines and keep the most common recommendations.
+    """
+    records = [ch for ch in chunk_results if isinstance(ch, ChunkAnalysis)]
+    if not records:
+        return None
+
+    cats = config.ANALYSIS_CATEGORIES
+
+    # compute averages (or 0 if no chunk produced a valid score)
+    final_scores = {}
+    scored = []
+    for cat in cats:
+        vals = [ch.scores[cat] for ch in records if cat in ch.scores]
+        final_scores[cat] = int(round(sum(vals)/len(vals))) if vals else 0
+        if vals:
+            scored.append(final_scores[cat])
+
+    overall_vals = [ch.overall_score for ch in records if ch.overall_score is not None]
+    if overall_vals:
+        final_overall = int(round(sum(overall_vals)/len(overall_vals)))
+    else:
+        # No chunk gave an overall score; fall back to the mean of the scored categories
+        final_overall = int(round(sum(scored)/len(scored))) if scored else 0
+
+    # Join feedbacks intelligently (unique, keep order and truncate to reasonable length)
+    final_feedback = {}
+    for cat in cats:
+        pieces = list(dict.fromkeys(ch.feedback[cat] for ch in records if cat in ch.feedback))
+        final_feedback[cat] = " ".join(pieces)[:1200]  # truncate
+
+    # recommendations: top few unique
+    rec_seen = list(dict.fromkeys(ch.recommendations for ch in records if ch.recommendations))
+    final_recommendations = " ".join(rec_seen[:3])[:1000]
+
+    # pros/cons unique
+    pros_unique = list(dict.fromkeys(p for ch in records for p in ch.pros))
+    cons_unique = list(dict.fromkeys(c for ch in records for c in ch.cons))
+
+    return {
+        "scores": final_scores,
+        "overall_score": final_overall,
+        "feedback": final_feedback,
+        "recommendations": final_recommendations,
+        "pros": pros_unique,
+        "cons": cons_unique
+    }
+
+def request_critique(ai_client, prompt, deadline=None, triage=False, schema=None):
+    """
+    Call the provider and parse its JSON. Identical requests already in flight
+    anywhere in the process (same prompt, provider, model, temperature) are
+    not sent again; they wait for and share that call's parsed result.
+    The shared call is bounded only by the provider's per-call timeout, so a
+    caller with little time left doesn't cut it short for the others; with a
+    deadline, each caller gives up on its own once that deadline passes or is
+    cancelled.
+    Triage calls get the smaller TRIAGE_MAX_TOKENS budget and the triage schema;
+    `schema` overrides the chunk schema (a re-ask asks for fewer fields).
+    """
+    system_instruction = get_system_instruction()
+    key = single_flight.make_key(ai_client.provider_name, ai_client.model_name, ai_client.temperature, prompt, system_instruction)
+    max_tokens = config.TRIAGE_MAX_TOKENS if triage else None
+    schema = schema or response_schema.chunk_json_schema(triage)
+
+    def call():
+        return extract_first_json(ai_client.generate_critique(prompt, system_instruction=system_instruction, timeout=ai_client.timeout,
+                                                              max_tokens=max_tokens, schema=schema))
+
+    return deadlines.call_with_deadline(lambda: single_flight.shared.do(key, call), deadline)
+
+async def arequest_critique(ai_client, prompt, semaphore=None, deadline=None, schema=None):
+    """Async variant of request_critique; `semaphore` bounds calls actually sent."""
+    system_instruction = get_system_instruction()
+    key = single_flight.make_key(ai_client.provider_name, ai_client.model_name, ai_client.temperature, prompt, system_instruction)
+    schema = schema or response_schema.chunk_json_schema()
+
+    async def call():
+        async with semaphore or contextlib.nullcontext():
+            timeout = ai_client.timeout
+            try:
+                raw_response = await asyncio.wait_for(
+                    ai_client.agenerate_critique(prompt, system_instruction=system_instruction, timeout=timeout, schema=schema), timeout
+                )
+            except TimeoutError as e:
+                raise deadlines.DeadlineExceeded(f"AI call timed out after {timeout:.1f}s") from e
+        return extract_first_json(raw_response)
+
+    if deadline is None:
+        return await single_flight.shared_async.do(key, call)
+    deadline.check()
+    try:
+        return await asyncio.wait_for(single_flight.shared_async.do(key, call), deadline.remaining())
+    except TimeoutError as e:
+        if isinstance(e, deadlines.DeadlineExceeded):
+            raise
+        raise deadlines.DeadlineExceeded("Time limit reached") from e
+
+def _log_incomplete(result, triage=False):
+    missing = result.missing_fields(triage)
+    if missing:
+        logger.warning(f"Chunk analysis still missing {', '.join(missing)} after re-asking")
+
+def critique_chunk(ai_client, resume_chunk, job_role=None, keyword_digest=None, deadline=None, triage=False):
+    """
+    Critique one chunk and decode the answer into a ChunkAnalysis.
+    If fields are missing or invalid, a short follow-up prompt asks for just
+    those fields (up to SCHEMA_REASK_ATTEMPTS times) instead of re-running the
+    whole critique. Whatever is still missing afterwards is left out of the
+    record, and aggregation averages over the chunks that have it.
+    With triage, only scores and short pros/cons are asked for.
+    """
+    prompt_builder = build_triage_prompt_for_chunk if triage else build_prompt_for_chunk
+    result, missing = response_schema.decode_chunk_analysis(
+        request_critique(ai_client, prompt_builder(resume_chunk, job_role, keyword_digest), deadline, triage), triage
+    )
+    for _ in range(config.SCHEMA_REASK_ATTEMPTS):
+        if not missing:
+            break
+        try:
+            answer = request_critique(ai_client, response_schema.build_reask_prompt(resume_chunk, missing, job_role), deadline, triage,
+                                      response_schema.reask_json_schema(missing))
+        except Exception as e:
+            logger.warning(f"Re-ask failed: {e}")
+            break
+        response_schema.decode_fields(answer, into=result)
+        missing = result.missing_fields(triage)
+    _log_incomplete(result, triage)
+    return result
+
+async def acritique_chunk(ai_client, resume_chunk, job_role=None, keyword_digest=None, semaphore=None, deadline=None):
+    """Async variant of critique_chunk."""
+    result, missing = response_schema.decode_chunk_analysis(
+        await arequest_critique(ai_client, build_prompt_for_chunk(resume_chunk, job_role, keyword_digest), semaphore, deadline)
+    )
+    for _ in range(config.SCHEMA_REASK_ATTEMPTS):
+        if not missing:
+            break
+        try:
+            answer = await arequest_critique(ai_client, response_schema.build_reask_prompt(resume_chunk, missing, job_role), semaphore, deadline,
+                                             response_schema.reask_json_schema(missing))
+        except Exception as e:
+            logger.warning(f"Re-ask failed: {e}")
+            break
+        response_schema.decode_fields(answer, into=result)
+        missing = result.missing_fields()
+    _log_incomplete(result)
+    return result
+
+def _get_cached_analysis(cache_conn, cache_key, triage=False):
+    """Cached ChunkAnalysis for a chunk, or None on a miss or an incomplete entry."""
+    cached = chunk_cache.get_cached_result(cache_conn, cache_key)
+    if cached is None:
+        return None
+    result = response_schema.decode_fields(cached)
+    return None if result.missing_fields(triage) else result
+
+def _lookup_chunk(cache_conn, ch, job_role, ai_client, triage=False):
+    """
+    Returns (cache_key, cached ChunkAnalysis or None); a full critique already cached also serves triage.
+    A cache that can't be read (e.g. a locked database) counts as a miss.
+    """
+    cache_key = chunk_cache.make_cache_key(ch, job_role, ai_client.provider_name, ai_client.model_name, triage)
+    try:
+        cached = _get_cached_analysis(cache_conn, cache_key, triage)
+        if cached is None and triage:
+            full_key = chunk_cache.make_cache_key(ch, job_role, ai_client.provider_name, ai_client.model_name)
+            cached = _get_cached_analysis(cache_conn, full_key)
+    except sqlite3.Error as e:
+        logger.warning(f"Chunk cache lookup failed, sending the chunk to the model: {e}")
+        cached = None
+    return cache_key, cached
+
+def _store_analysis(cache_key, ai_client, result, triage=False):
+    """Hand a chunk result to the write-behind writer for the chunk cache; never waits on the database."""
+    # Incomplete results aren't memoized, so the next run gets another chance at the missing fields
+    if cache_key is None or result.missing_fields(triage):
+        return
+    try:
+        persistence.get_writer().submit_chunk_result(cache_key, ai_client.provider_name, ai_client.model_name, result.to_dict())
+    except RuntimeError as e:
+        logger.warning(f"Chunk result not cached: {e}")
+
+# Chunk-cache reads from the event loop run here: off the loop, and one at a
+# time, since the API shares a single connection between its jobs
+_cache_io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chunk-cache")
+
+def analyze_chunks(ai_client, chunks, job_role=None, keyword_digest=None, cache_conn=None, deadline=None, triage=False):
+    """
+    Run every chunk prompt through one provider.
+    `chunks` may be any iterable (e.g. iter_chunks); each chunk is pulled, and
+    its prompt built, only when the previous one has been answered.
+    With cache_conn, chunks already analyzed for the same role, model and
+    prompt version are served from the chunk cache; only new chunks are sent.
+    With a deadline, chunks not finished when it passes (or is cancelled) are
+    skipped, so the results cover only the chunks that completed.
+    With triage, chunks are only scored (see build_triage_prompt_for_chunk).
+    Returns (chunk_results, errors, cache_hits); chunk_results are ChunkAnalysis
+    records and errors are messages for chunks that failed.
+    """
+    chunk_results = []
+    errors = []
+    cache_hits = 0
+    for i, ch in enumerate(chunks):
+        if deadline is not None and deadline.expired:
+            errors.append(f"segment {i+1} onward: skipped ({'cancelled' if deadline.cancelled else 'time limit reached'})")
+            break
+        cache_key = None
+        if cache_conn is not None:
+            cache_key, cached = _lookup_chunk(cache_conn, ch, job_role, ai_client, triage)
+            if cached is not None:
+                chunk_results.append(cached)
+                cache_hits += 1
+                continue
+        try:
+            result = critique_chunk(ai_client, ch, job_role, keyword_digest, deadline, triage)
+        except Exception as e:
+            errors.append(f"segment {i+1}: {e}")
+            continue
+        chunk_results.append(result)
+        _store_analysis(cache_key, ai_client, result, triage)
+    return chunk_results, errors, cache_hits
+
+async def analyze_chunks_async(ai_client, chunks, job_role=None, keyword_digest=None, semaphore=None, cache_conn=None, deadline=None, max_in_flight=None):
+    """
+    Event-loop variant of analyze_chunks: chunks of a resume are sent
+    concurrently, with `semaphore` bounding how many calls are in flight
+    across all callers. Chunks are pulled from `chunks` (any iterable) only
+    as earlier ones finish, at most `max_in_flight` at a time (default
+    API_MAX_CONCURRENT_CALLS, capped by the provider's max_concurrency), so
+    prompts are built no faster than the model can take them. Calls still
+    running when `deadline` passes are abandoned. Chunk-cache lookups run on
+    a worker thread and stores go to the write-behind writer, so SQLite never
+    blocks the loop.
+    Returns (chunk_results, errors, cache_hits), chunk_results in chunk order.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def run_one(i, ch):
+        cache_key = None
+        if cache_conn is not None:
+            cache_key, cached = await loop.run_in_executor(_cache_io, _lookup_chunk, cache_conn, ch, job_role, ai_client)
+            if cached is not None:
+                return i, cached, None, True
+        try:
+            result = await acritique_chunk(ai_client, ch, job_role, keyword_digest, semaphore, deadline)
+        except Exception as e:
+            return i, None, f"segment {i+1}: {e}", False
+        _store_analysis(cache_key, ai_client, result)
+        return i, result, None, False
+
+    limit = max_in_flight or config.API_MAX_CONCURRENT_CALLS
+    # A local server is asked for its slot count on first use; keep that request off the loop
+    max_concurrency = await asyncio.to_thread(lambda: ai_client.max_concurrency)
+    if max_concurrency:
+        # Prompts beyond what the server runs at once would only wait
+        limit = min(limit, max_concurrency)
+    limit = max(1, limit)
+    outcomes = []
+    pending = set()
+    try:
+        for i, ch in enumerate(chunks):
+            if len(pending) >= limit:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                outcomes.extend(task.result() for task in done)
+            pending.add(asyncio.ensure_future(run_one(i, ch)))
+        if pending:
+            done, pending = await asyncio.wait(pending)
+            outcomes.extend(task.result() for task in done)
+    finally:
+        # Only non-empty if this coroutine itself was cancelled
+        for task in pending:
+            task.cancel()
+
+    outcomes.sort(key=lambda outcome: outcome[0])
+    chunk_results = [result for _, result, _, _ in outcomes if result is not None]
+    errors = [error for _, _, error, _ in outcomes if error]
+    cache_hits = sum(1 for _, _, _, hit in outcomes if hit)
+    return chunk_results, errors, cache_hits
+
+def generate_detail(ai_client, chunks, job_role=None, keyword_digest=None, cache_conn=None, deadline=None):
+    """
+    Second tier of a triage run: the full critique of a resume, generated
+    when its detailed feedback is first opened. Chunks critiqued before are
+    served from the chunk cache.
+    Returns (detail, errors); detail holds feedback, recommendations, pros and
+    cons for build_record's fields, or is None if no chunk could be critiqued.
+    """
+    chunk_results, errors, _ = analyze_chunks(ai_client, chunks, job_role, keyword_digest, cache_conn=cache_conn, deadline=deadline)
+    aggregated = aggregate_chunk_analyses(chunk_results)
+    if aggregated is None:
+        return None, errors
+    return {k: aggregated[k] for k in ("feedback", "recommendations", "pros", "cons")}, errors
+
+def build_record(filename, aggregated, chunk_results, provider_name, model_name, job_role=None, keyword_scan=None, partial=False, triage=False):
+    """
+    Flatten an aggregated analysis into the record shape stored in `analyses`.
+    `partial` marks an aggregation of only the chunks that finished before a deadline or stop.
+    `triage` marks a scores-only record whose detailed feedback is still to be generated.
+    """
+    return {
+        "filename": filename,
+        "job_role": job_role,
+        "provider": provider_name,
+        "model": model_name,
+        "analysis_time": datetime.now(timezone.utc).isoformat(),
+        "overall_score": aggregated.get("overall_score", 0),
+        "scores": aggregated.get("scores", {}),
+        "feedback": aggregated.get("feedback", {}),
+        "recommendations": aggregated.get("recommendations", ""),
+        "pros": aggregated.get("pros", []),
+        "cons": aggregated.get("cons", []),
+        "raw_response": json.dumps([ch.to_dict() for ch in chunk_results]),
+        "keywords": keyword_scan,
+        "partial": partial,
+        "triage": triage,
+        "detail_pending": triage,
+        "segments_analyzed": len(chunk_results)
+    }
+
+def _synthetic_pdf(pages, lines=None):
+    """Minimal text-only PDF with `pages` resume-like pages (the same `lines` on each), for benchmarks."""
+    lines = lines or [
+        "Senior Backend Engineer, Acme Corp 2019-2024",
+        "Built Python microservices on AWS with Docker and Kubernetes",
+        "Cut p99 latency by 40% using Redis caching and Kafka message queues",
+        "Led a team of 6 engineers, mentored 3 junior developers",
+        "Designed REST APIs serving 20k requests per second",
+    ] * 8
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", "", "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        stream = "BT /F1 10 Tf 14 TL 50 780 Td " + " T* ".join(f"({line}, page {page + 1}) Tj" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+def benchmark_memory(pdf_pages=100, batch_files=1000, chunk_size=None, chunk_overlap=None):
+    """
+    Measure peak traced memory (tracemalloc) of the extract, chunk and prompt pipeline.
+
+    Args:
+        pdf_pages: Page count of the long PDF
+        batch_files: Number of 2-page PDFs in the batch run
+        chunk_size: Chunk size (default DEFAULT_CHUNK_SIZE)
+        chunk_overlap: Chunk overlap (default DEFAULT_CHUNK_OVERLAP)
+
+    Returns:
+        Dictionary with the long PDF's size, page count and peak, and the batch
+        run's file count, segments analyzed and peak (mock provider, no cache)
+    """
+    import tracemalloc
+    from src import ai_providers
+
+    chunk_size = chunk_size or config.DEFAULT_CHUNK_SIZE
+    chunk_overlap = chunk_overlap or config.DEFAULT_CHUNK_OVERLAP
+    long_pdf = _synthetic_pdf(pdf_pages)
+    small_pdf = _synthetic_pdf(2)
+    client = ai_providers.MockProvider("", config.DEFAULT_MODELS[config.PROVIDER_MOCK])
+
+    tracemalloc.start()
+    prompts = 0
+    for chunk in iter_chunks(iter_pdf_pages(io.BytesIO(long_pdf)), chunk_size, chunk_overlap):
+        build_prompt_for_chunk(chunk)
+        prompts += 1
+    _, long_peak = tracemalloc.get_traced_memory()
+
+    tracemalloc.reset_peak()
+    segments = 0
+    scores = []
+    for _ in range(batch_files):
+        chunk_results, _, _ = analyze_chunks(client, iter_chunks(iter_pdf_pages(io.BytesIO(small_pdf)), chunk_size, chunk_overlap))
+        segments += len(chunk_results)
+        scores.append(aggregate_chunk_analyses(chunk_results)["overall_score"])
+    _, batch_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "pdf_pages": pdf_pages,
+        "pdf_mb": len(long_pdf) / (1024 * 1024),
+        "pdf_segments": prompts,
+        "pdf_peak_mb": long_peak / (1024 * 1024),
+        "batch_files": batch_files,
+        "batch_segments": segments,
+        "batch_peak_mb": batch_peak / (1024 * 1024)
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    stats = benchmark_memory(pages, files)
+    print(f"{stats['pdf_pages']}-page PDF ({stats['pdf_mb']:.2f} MB, {stats['pdf_segments']} segments): peak {stats['pdf_peak_mb']:.2f} MB")
+    print(f"{stats['batch_files']}-file batch ({stats['batch_segments']} segments): peak {stats['batch_peak_mb']:.2f} MB")
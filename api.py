@@ -0,0 +1,325 @@
+"""
+Headless HTTP API for Resume Critiquer application.
+Runs the same extract/chunk/prompt/parse/aggregate pipeline as the Streamlit
+app on an asyncio event loop, persists results to the `analyses` table and
+optionally notifies a webhook when each job finishes.
+
+Usage:
+    uvicorn src.api:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import functools
+import hashlib
+import hmac
+import json
+import logging
+import tempfile
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from src import config, validators, ai_providers, ats_keywords, analysis, database, single_flight, deadlines, persistence
+
+logger = logging.getLogger(__name__)
+
+# Job state lives in memory; finished results are also persisted to `analyses`
+JOBS: dict = {}
+_state = SimpleNamespace(conn=None, semaphore=None, job_slots=None, tasks=set())
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    config.DATA_DIR.mkdir(exist_ok=True)
+    _state.conn = database.get_connection()
+    database.init_db(_state.conn)
+    _state.semaphore = asyncio.Semaphore(config.API_MAX_CONCURRENT_CALLS)
+    _state.job_slots = asyncio.Semaphore(config.API_MAX_CONCURRENT_JOBS)
+    yield
+    # Let in-flight jobs finish (and their webhooks fire) before closing the database
+    if _state.tasks:
+        await asyncio.gather(*_state.tasks, return_exceptions=True)
+    await asyncio.to_thread(persistence.get_writer().flush, config.WRITE_FLUSH_TIMEOUT_SECONDS)
+    _state.conn.close()
+
+
+app = FastAPI(title="Resume Critiquer API", version="1.0", lifespan=lifespan)
+
+
+# ---------------------------
+# Job bookkeeping
+# ---------------------------
+def _job_status(job: dict) -> dict:
+    return {k: job[k] for k in ("id", "status", "filename", "provider", "model", "job_role",
+                                "created_time", "finished_time", "analysis_id", "error")}
+
+
+def _prune_jobs():
+    """Forget the oldest finished jobs once more than API_MAX_TRACKED_JOBS are tracked."""
+    excess = len(JOBS) - config.API_MAX_TRACKED_JOBS
+    if excess <= 0:
+        return
+    finished = [job_id for job_id, job in JOBS.items() if job["status"] in ("completed", "failed", "cancelled")]
+    for job_id in finished[:excess]:
+        del JOBS[job_id]
+
+
+async def send_webhook(url: str, payload: dict) -> bool:
+    """
+    POST a job payload to a callback URL, retrying with backoff.
+
+    Returns:
+        True if the receiver answered with a 2xx status
+    """
+    if url != config.API_WEBHOOK_URL:
+        # Checked again at send time: the host's DNS may have changed since the job was submitted
+        is_valid, error = await asyncio.to_thread(validators.validate_callback_url, url)
+        if not is_valid:
+            logger.warning(f"Webhook {url} not sent: {error}")
+            return False
+
+    body = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if config.API_WEBHOOK_SECRET:
+        signature = hmac.new(config.API_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+        headers["X-Resume-Critiquer-Signature"] = f"sha256={signature}"
+
+    async with httpx.AsyncClient(timeout=config.API_WEBHOOK_TIMEOUT_SECONDS) as client:
+        for attempt in range(config.API_WEBHOOK_RETRIES):
+            try:
+                response = await client.post(url, content=body, headers=headers)
+                if response.is_success:
+                    return True
+                logger.warning(f"Webhook {url} answered {response.status_code} (attempt {attempt + 1})")
+            except httpx.HTTPError as e:
+                logger.warning(f"Webhook {url} failed: {e} (attempt {attempt + 1})")
+            await asyncio.sleep(2 ** attempt * 0.5)
+    return False
+
+
+async def notify_callback(job: dict):
+    """Send a finished job's status and result to its callback URL, if it has one."""
+    if job["callback_url"]:
+        payload = _job_status(job)
+        payload["result"] = job["result"]
+        await send_webhook(job["callback_url"], payload)
+
+
+def _track(task: asyncio.Task):
+    """Keep a background task referenced until it finishes; shutdown waits for these."""
+    _state.tasks.add(task)
+    task.add_done_callback(_state.tasks.discard)
+
+
+def _cancelled_before_start(job: dict, upload, task: asyncio.Task):
+    """
+    Done-callback of a job's task. A task cancelled before run_job began
+    never ran its cleanup, so free the upload and send the webhook here.
+    """
+    if not task.cancelled() or job.get("started"):
+        return
+    upload.close()
+    job["status"] = "cancelled"
+    job["error"] = "Cancelled by request"
+    job["finished_time"] = job["finished_time"] or datetime.now(timezone.utc).isoformat()
+    _track(asyncio.get_running_loop().create_task(notify_callback(job)))
+
+
+async def run_job(job: dict, upload, chunk_size: int, chunk_overlap: int):
+    """
+    Analyze one uploaded resume and record the outcome on the job.
+    `upload` is the spooled upload; it is closed (freeing memory or its temp
+    file) as soon as its text has been extracted.
+    """
+    job["started"] = True
+    conn = _state.conn
+    try:
+        # Only API_MAX_CONCURRENT_JOBS jobs hold extracted text and prompts at once;
+        # queued jobs hold nothing but their spooled upload
+        async with _state.job_slots:
+            job["status"] = "running"
+            deadline = deadlines.Deadline(config.RESUME_DEADLINE_SECONDS)
+            is_pdf = validators.sniff_file_type(upload.read(1024)) == "pdf"
+            upload.seek(0)
+            # PDF parsing is CPU-bound; keep it off the event loop
+            text = await asyncio.to_thread(analysis.extract_text, upload, is_pdf)
+            upload.close()
+            is_valid, error = validators.validate_extracted_text(text, job["filename"])
+            if not is_valid:
+                raise ValueError(error)
+
+            keyword_scan = ats_keywords.scan_keywords(text, job["job_role"])
+            # Chunks are cut as the analysis pulls them, so only those in flight are held
+            chunks = analysis.iter_chunks([text], size=chunk_size, overlap=chunk_overlap)
+            segments = analysis.count_chunks(text, size=chunk_size, overlap=chunk_overlap)
+            client = ai_providers.get_provider(job["provider"], config.PROVIDER_API_KEYS.get(job["provider"], ""), job["model"])
+            chunk_results, chunk_errors, cache_hits = await analysis.analyze_chunks_async(
+                client, chunks, job["job_role"], ats_keywords.format_keyword_digest(keyword_scan),
+                semaphore=_state.semaphore, cache_conn=conn, deadline=deadline
+            )
+        aggregated = analysis.aggregate_chunk_analyses(chunk_results)
+        if aggregated is None:
+            raise ValueError(f"No valid chunk analyses ({'; '.join(chunk_errors) or 'empty response'})")
+
+        partial = len(chunk_results) < segments and deadline.expired
+        record = analysis.build_record(job["filename"], aggregated, chunk_results, job["provider"], job["model"],
+                                       job["job_role"], keyword_scan, partial)
+        # Stored by the background writer; the event loop never waits on SQLite locks
+        job["analysis_id"] = await asyncio.wrap_future(persistence.get_writer().submit(record, index_text=text))
+
+        result = {k: v for k, v in record.items() if k != "raw_response"}
+        result.update({
+            "analysis_id": job["analysis_id"],
+            "segments": segments,
+            "segments_from_cache": cache_hits,
+            "segment_errors": chunk_errors,
+            "token_usage": dict(client.token_usage)
+        })
+        job["result"] = result
+        job["status"] = "completed"
+    except asyncio.CancelledError:
+        job["status"] = "cancelled"
+        job["error"] = "Cancelled by request"
+    except Exception as e:
+        logger.error(f"Job {job['id']} failed: {e}")
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        upload.close()
+        job["finished_time"] = datetime.now(timezone.utc).isoformat()
+
+    await notify_callback(job)
+
+
+# ---------------------------
+# Endpoints
+# ---------------------------
+@app.get("/health")
+async def health():
+    return {"status": "ok", "jobs_tracked": len(JOBS)}
+
+
+@app.get("/metrics")
+async def metrics():
+    statuses = {}
+    for job in JOBS.values():
+        statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+    return {"jobs": statuses, "single_flight": single_flight.get_stats(), "writes": persistence.get_writer().stats()}
+
+
+@app.post("/v1/analyses", status_code=202)
+async def submit_resume(
+    file: UploadFile = File(...),
+    target_role: Optional[str] = Form(None),
+    provider: str = Form(config.API_DEFAULT_PROVIDER),
+    model: Optional[str] = Form(None),
+    chunk_size: int = Form(config.DEFAULT_CHUNK_SIZE),
+    chunk_overlap: int = Form(config.DEFAULT_CHUNK_OVERLAP),
+    callback_url: Optional[str] = Form(None)
+):
+    """Queue a resume for analysis. Returns immediately with the job id."""
+    if provider not in config.PROVIDER_MODELS:
+        raise HTTPException(status_code=422, detail=f"Unknown provider: {provider}")
+    model = model or config.DEFAULT_MODELS.get(provider)
+    if model not in config.PROVIDER_MODELS[provider]:
+        raise HTTPException(status_code=422, detail=f"Unknown model for {provider}: {model}")
+    if not config.PROVIDER_API_KEYS.get(provider):
+        raise HTTPException(status_code=422, detail=f"{provider} API Key is not configured on the server")
+    if provider == config.PROVIDER_LOCAL and not config.LOCAL_BASE_URL:
+        raise HTTPException(status_code=422, detail="LOCAL_BASE_URL is not configured on the server")
+
+    for is_valid, error in (validators.validate_target_role(target_role),
+                            validators.validate_chunk_params(chunk_size, chunk_overlap)):
+        if not is_valid:
+            raise HTTPException(status_code=422, detail=error)
+    if callback_url:
+        is_valid, error = await asyncio.to_thread(validators.validate_callback_url, callback_url)
+        if not is_valid:
+            raise HTTPException(status_code=422, detail=error)
+
+    filename = validators.sanitize_filename(file.filename or "")
+    content = await file.read()
+    await file.close()
+    is_valid, error = validators.validate_uploaded_file(SimpleNamespace(name=filename, size=len(content)))
+    if is_valid:
+        is_valid, error = validators.validate_file_content(content, filename)
+    if not is_valid:
+        raise HTTPException(status_code=422, detail=error)
+
+    # Queued uploads wait on disk past API_UPLOAD_SPOOL_BYTES instead of in memory
+    upload = tempfile.SpooledTemporaryFile(max_size=config.API_UPLOAD_SPOOL_BYTES)
+    upload.write(content)
+    upload.seek(0)
+    del content
+
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "status": "queued",
+        "filename": filename,
+        "provider": provider,
+        "model": model,
+        "job_role": (target_role or "").strip() or None,
+        "created_time": datetime.now(timezone.utc).isoformat(),
+        "finished_time": None,
+        "analysis_id": None,
+        "error": None,
+        "result": None,
+        "callback_url": callback_url or config.API_WEBHOOK_URL or None
+    }
+    JOBS[job_id] = job
+    _prune_jobs()
+
+    task = asyncio.create_task(run_job(job, upload, chunk_size, chunk_overlap))
+    job["task"] = task
+    _track(task)
+    task.add_done_callback(functools.partial(_cancelled_before_start, job, upload))
+
+    return {
+        "id": job_id,
+        "status": job["status"],
+        "status_url": f"/v1/analyses/{job_id}",
+        "result_url": f"/v1/analyses/{job_id}/result"
+    }
+
+
+@app.get("/v1/analyses/{job_id}")
+async def get_status(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return _job_status(job)
+
+
+@app.post("/v1/analyses/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job; its outstanding AI calls are abandoned."""
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    if job["status"] == "queued":
+        # The task may not have started yet; _cancelled_before_start then closes its upload and sends the webhook
+        job["status"] = "cancelled"
+        job["error"] = "Cancelled by request"
+        job["finished_time"] = datetime.now(timezone.utc).isoformat()
+        job["task"].cancel()
+    elif job["status"] == "running":
+        job["task"].cancel()
+    return _job_status(job)
+
+
+@app.get("/v1/analyses/{job_id}/result")
+async def get_result(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    if job["status"] in ("failed", "cancelled"):
+        return JSONResponse(status_code=422, content=_job_status(job))
+    if job["status"] != "completed":
+        return JSONResponse(status_code=409, content=_job_status(job))
+    return job["result"]
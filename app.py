@@ -1,20 +1,18 @@
 # AI RESUME CRITIQUER.
 import streamlit as st
-import PyPDF2
-import io
-import os
 import time
-import json
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
+from datetime import datetime, timedelta
 from math import ceil
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 import sqlite3
-import re
+import html
+import contextlib
 
 # Import modules from src package
-from src import config, validators, ai_providers
+from src import config, validators, ai_providers, ats_keywords, retrieval, feedback_search, analysis, database, single_flight, deadlines, persistence, profiling, charts, reports, bulk_ingest
 from src.utils import cleanup
 
 # ---------------------------
@@ -71,14 +69,8 @@ if selected_provider in config.DEFAULT_MODELS:
 selected_model = st.sidebar.selectbox("Select Model", available_models, index=default_model_index)
 
 # API Key Management
-api_key = ""
-env_key_name = ""
-if selected_provider == config.PROVIDER_OPENAI:
-    env_key_name = "OPENAI_API_KEY"
-    api_key = config.OPENAI_API_KEY
-elif selected_provider == config.PROVIDER_GROQ:
-    env_key_name = "GROQ_API_KEY"
-    api_key = config.GROQ_API_KEY
+env_key_name = config.PROVIDER_API_KEY_ENV_VARS.get(selected_provider, "")
+api_key = config.PROVIDER_API_KEYS.get(selected_provider, "")
 
 if api_key:
     st.sidebar.success(f"✅ API Key loaded from Environment")
@@ -87,13 +79,39 @@ else:
     if not api_key:
         st.sidebar.warning(f"⚠️ {selected_provider} requires an API Key")
 
+api_keys = {selected_provider: api_key}
+
+# Multi-model comparison
+st.sidebar.markdown("---")
+st.sidebar.header("⚖️ Model Comparison")
+comparison_mode = st.sidebar.checkbox("Compare multiple models", value=False, help="Send the same chunk prompts to several models at the same time and compare their scores.")
+comparison_pairs = []
+if comparison_mode:
+    model_options = [(p, m) for p in config.AVAILABLE_PROVIDERS for m in config.PROVIDER_MODELS.get(p, [])]
+    default_pairs = [(p, m) for p, m in config.DEFAULT_MODELS.items() if (p, m) in model_options]
+    comparison_pairs = st.sidebar.multiselect("Models to compare", model_options, default=default_pairs, format_func=lambda pair: f"{pair[0]} / {pair[1]}")
+    for provider_name in dict.fromkeys(p for p, _ in comparison_pairs):
+        if provider_name in api_keys:
+            continue
+        provider_key = config.PROVIDER_API_KEYS.get(provider_name, "")
+        if not provider_key:
+            provider_key = st.sidebar.text_input(f"Enter {provider_name} API Key", type="password", key=f"api_key_{provider_name}",
+                                                 help=f"Set {config.PROVIDER_API_KEY_ENV_VARS.get(provider_name, '')} in .env to skip this.")
+        api_keys[provider_name] = provider_key
+
 st.sidebar.markdown("---")
 st.sidebar.header("Analysis Settings")
 target_role = st.sidebar.text_input("Target job role (optional)", placeholder="e.g., Backend Engineer")
 chart_type = st.sidebar.radio("Chart type", options=config.CHART_TYPES)
 chunk_chars = st.sidebar.number_input("Chunk size (chars)", min_value=config.MIN_CHUNK_SIZE, max_value=config.MAX_CHUNK_SIZE, value=config.DEFAULT_CHUNK_SIZE, step=500)
 chunk_overlap = st.sidebar.number_input("Chunk overlap (chars)", min_value=0, max_value=1000, value=config.DEFAULT_CHUNK_OVERLAP, step=50)
+resume_time_limit = st.sidebar.number_input("Time limit per resume (s)", min_value=10, max_value=3600, value=config.RESUME_DEADLINE_SECONDS, step=30)
+batch_time_limit = st.sidebar.number_input("Time limit per batch (s)", min_value=30, max_value=7200, value=config.BATCH_DEADLINE_SECONDS, step=60)
+triage_mode = st.sidebar.checkbox("Triage mode (scores only)", value=config.TRIAGE_MODE,
+                                  help="Ask only for scores and short pros/cons, which is much faster. A resume's detailed feedback is generated when you open it.")
 save_to_db = st.sidebar.checkbox("Save analyses to DB", value=True)
+profile_run = st.sidebar.checkbox("Profile analysis runs", value=config.PROFILE_ANALYSIS,
+                                  help="Sample where a run spends its time and save the profile to the exports folder (set PROFILE_ANALYSIS=true to default this on).")
 
 # Storage Info
 st.sidebar.markdown("---")
@@ -102,9 +120,18 @@ export_summary = cleanup.get_export_summary()
 db_size = cleanup.get_database_size()
 st.sidebar.markdown(f"**Exports:** {export_summary['total_files']} ({export_summary['total_size_mb']:.1f} MB)")
 st.sidebar.markdown(f"**Database:** {db_size:.2f} MB")
+flight_stats = single_flight.get_stats()
+if flight_stats["requests"]:
+    st.sidebar.markdown(f"**Coalesced AI calls:** {flight_stats['coalesced']}/{flight_stats['requests']} ({flight_stats['coalescing_rate']:.0%}, all sessions)")
+write_stats = persistence.get_writer().stats()
+if write_stats["pending"]:
+    st.sidebar.markdown(f"**Pending DB writes:** {write_stats['pending']}")
+if write_stats["failed"]:
+    st.sidebar.warning(f"{write_stats['failed']} analysis record(s) could not be saved; they were written to {config.WRITE_SPILL_PATH.name}")
 
 if st.sidebar.button("🧹 Clean Old Exports"):
     num_deleted, deleted = cleanup.cleanup_old_exports(max_keep=config.MAX_EXPORTS_TO_KEEP)
+    num_deleted += cleanup.cleanup_chart_cache()
     if num_deleted > 0:
         st.sidebar.success(f"Deleted {num_deleted} files")
 
@@ -118,403 +145,750 @@ cleanup.cleanup_database_on_startup()
 # ---------------------------
 # Helpers
 # ---------------------------
-def extract_text_from_pdf_bytes(pdf_bytes):
-    try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
-        text = ""
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-        return text
-    except Exception:
-        return ""
-
-def extract_text_from_uploaded(uploaded_file):
-    try:
-        content = uploaded_file.read()
-        uploaded_file.seek(0)
-        if uploaded_file.type == "application/pdf":
-            return extract_text_from_pdf_bytes(content)
-        else:
-            return content.decode("utf-8", errors="ignore")
-    except Exception:
-        return ""
-
-def chunk_text(text, size=3000, overlap=200):
-    if not text: return []
-    if size <= 0: return [text]
-    chunks = []
-    start = 0
-    text_len = len(text)
-    while start < text_len:
-        end = start + size
-        chunks.append(text[start:end])
-        if end >= text_len: break
-        start = end - overlap if (end - overlap) > start else end
-    return chunks
-
-def get_system_instruction():
-    return """You are an expert resume reviewer with years of HR and recruitment experience.
-    Analyze the resume content provided by the user.
-    Output must be a valid JSON object ONLY.
-    Follow the structure strictly."""
-
-def build_prompt_for_chunk(resume_chunk, job_role=None):
-    role_snip = f"Target role: {job_role}\n" if job_role else ""
-    prompt = f"""
-    You are an expert resume reviewer with years of HR and recruitment experience.
-    Analyze the following resume chunk. Return ONLY a JSON object (no markdown or extra text but explain each and every section in detail.
-    Make sure to cover all the little details that should be informed to the user.
-    Have a priority on being specific and try not to generalize the response.
-    Make sure to have a professional and humanly tone to make a better understanding.
-    Be as informative as possible
-    Take extra care while explaining the ATS & Keyword section, provide the user with exactly what words to use and why
-    Ensure role-specific insights:
-    “Tailor the analysis toward the specific type of role the resume seems to target (e.g., IT, Marketing, Finance, Operations) and explicitly mention how well it aligns with that role.”
-    Add industry benchmarking:
-    “Where possible, compare the resume’s strengths and weaknesses against common industry standards or expectations for the candidate’s field and seniority level.”
-    Highlight language/tone use:
-    “Comment on the language, tone, and action verbs used in the resume, and suggest stronger alternatives where impact is lacking.”
-    Include red flags:
-    “Identify any potential red flags (e.g., employment gaps, vague job descriptions, outdated skills) and explain how recruiters or ATS might interpret them.”
-    Add keyword strategy detail:
-    “In the ats_keywords section, go beyond listing present/missing keywords and provide context for placement (e.g., ‘add “risk management” under your Acme Corp role where you handled compliance processes’).”
-    Point out formatting compatibility issues:
-    “Note any risks of ATS parsing errors (e.g., tables, graphics, uncommon fonts, headers/footers).”
-    Final polish suggestion:
-    “Suggest how the candidate can make the resume stand out to a human recruiter after passing ATS (e.g., storytelling, achievement framing).”
-    If analysis fails return: {{ "error": "Resume could not be analyzed" }}
-    First give the score in each category individually and then give the overall score after aggregation.
-    Structure:
-    {{
-      "scores": {{
-        "Content Clarity & Impact": <int 0-10>,
-        "Skills Presentation": <int 0-10>,
-        "Experience Descriptions": <int 0-10>,
-        "Tailoring": <int 0-10>,
-        "Structure & Readability": <int 0-10>,
-        "Achievements & Metrics": <int 0-10>,
-        "ATS & Keywords": <int 0-10>,
-        "Specific Improvements": <int 0-10>
-      }},
-      "overall_score": <int 0-10>,
-      "feedback": {{
-        "Content Clarity & Impact": "<text>",
-        "Skills Presentation": "<text>",
-        "Experience Descriptions": "<text>",
-        "Tailoring": "<text>",
-        "Structure & Readability": "<text>",
-        "Achievements & Metrics": "<text>",
-        "ATS & Keywords": "<text>",
-        "Specific Improvements": "<text>"
-      }},
-      "recommendations": "<summary>",
-      "pros": ["<...>"],
-      "cons": ["<...>"]
-    }}
-
-    {role_snip}
-    Resume chunk:
-    {resume_chunk}
+def run_model_comparison(model_pairs, keys, chunks, job_role=None, keyword_digest=None, deadline=None):
     """
-    return prompt
-
-def extract_first_json(text):
+    Send the same chunk prompts to several (provider, model) pairs concurrently.
+    Each model gets its own thread, so total time is that of the slowest model.
     """
-    Attempt to find and parse the first JSON object in text.
+    def run_one(pair):
+        provider_name, model_name = pair
+        result = {"provider": provider_name, "model": model_name, "chunk_results": [], "errors": [], "token_usage": {}}
+        start = time.perf_counter()
+        try:
+            client = ai_providers.get_provider(provider_name, keys.get(provider_name, ""), model_name)
+            # No chunk cache here: comparisons measure each model's real latency and tokens
+            result["chunk_results"], result["errors"], _ = analysis.analyze_chunks(client, chunks, job_role, keyword_digest, deadline=deadline)
+            result["token_usage"] = dict(client.token_usage)
+        except Exception as e:
+            result["errors"].append(str(e))
+        result["latency"] = time.perf_counter() - start
+        result["aggregated"] = analysis.aggregate_chunk_analyses(result["chunk_results"])
+        result["partial"] = len(result["chunk_results"]) < len(chunks) and deadline is not None and deadline.expired
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, len(model_pairs))) as pool:
+        return list(pool.map(run_one, model_pairs))
+
+def run_until_done(fn, deadline, status, label, on_stop=None):
     """
-    # Try clean load
+    Run fn in a worker thread while the script thread keeps `status` updated.
+    Streamlit only notices the Stop button (or any rerun) when the script
+    thread touches an element, so the periodic update is what keeps Stop
+    responsive during long AI calls. When the script is interrupted, the
+    deadline is cancelled so the worker abandons its outstanding calls, and
+    whatever it finished is handed to on_stop before the interruption goes on.
+    """
+    pool = ThreadPoolExecutor(max_workers=1)
+    future = pool.submit(fn)
+    pool.shutdown(wait=False)
+    start = time.perf_counter()
     try:
-        return json.loads(text)
-    except Exception:
-        # try regex for balanced braces (best-effort)
-        # This regex uses a greedy match; we then try to parse progressively smaller substrings if needed.
-        brace_open = [m.start() for m in re.finditer(r"\{", text)]
-        for start in brace_open:
-            # try to find a matching closing brace by scanning forward
-            for end_idx in range(start+1, min(len(text), start+20000)):
-                if text[end_idx] == "}":
-                    candidate = text[start:end_idx+1]
-                    try:
-                        return json.loads(candidate)
-                    except Exception:
-                        continue
-        # As a last resort, try extracting via broad regex
-        m = re.search(r"\{[\s\S]*\}", text)
-        if m:
+        while True:
             try:
-                return json.loads(m.group(0))
-            except Exception:
-                pass
-    raise ValueError("No valid JSON object found in model response.")
-
-
-def aggregate_chunk_analyses(chunk_results):
+                return future.result(timeout=0.5)
+            except FuturesTimeout:
+                status.caption(f"⏳ {label} · {time.perf_counter() - start:.0f}s elapsed")
+    except BaseException:
+        deadline.cancel()
+        if on_stop is not None:
+            with contextlib.suppress(Exception):
+                on_stop(future.result(timeout=config.STOP_GRACE_SECONDS))
+        raise
+
+def stop_analysis():
+    st.session_state["analysis_stopped"] = True
+
+def compute_model_agreement(results):
     """
-    chunk_results: list of parsed JSON dicts from each chunk
-    We average numeric scores, pick the min overall_score? We'll average overall as well.
-    For textual feedback, we concatenate unique lines and keep the most common recommendations.
+    Returns (scores_df, stats_df): scores per category x model, and the
+    mean / standard deviation / spread of each category across models.
     """
-    if not chunk_results:
-        return None
+    columns = {}
+    for r in results:
+        if r["aggregated"]:
+            columns[f"{r['provider']} / {r['model']}"] = {**r["aggregated"]["scores"], "Overall": r["aggregated"]["overall_score"]}
+    scores_df = pd.DataFrame(columns)
+    if scores_df.empty:
+        return scores_df, pd.DataFrame()
+    stats_df = pd.DataFrame({
+        "Mean": scores_df.mean(axis=1).round(2),
+        "Std Dev": scores_df.std(axis=1, ddof=0).round(2),
+        "Spread": scores_df.max(axis=1) - scores_df.min(axis=1)
+    })
+    return scores_df, stats_df
+
+def make_comparison_heatmap(records, title="Category Scores by Resume"):
+    """
+    One figure for the whole batch: a single heatmap trace (resume x category)
+    instead of one chart per resume.
+    """
+    cats = config.ANALYSIS_CATEGORIES
+    z = [[r["scores"].get(cat, 0) for cat in cats] for r in records]
+    labels = [f"{i+1}. {r['filename']}" for i, r in enumerate(records)]
+    fig = go.Figure(go.Heatmap(z=z, x=cats, y=labels, zmin=0, zmax=10, colorscale="RdYlGn",
+                               hovertemplate="%{y}<br>%{x}: %{z}<extra></extra>"))
+    fig.update_layout(title=title, height=max(300, 28 * len(records) + 150), yaxis=dict(autorange="reversed"))
+    return fig
 
-    # expected categories
-    cats = ["Content Clarity & Impact","Skills Presentation","Experience Descriptions","Tailoring","Structure & Readability","Achievements & Metrics","ATS & Keywords","Specific Improvements"]
+def build_leaderboard(records):
+    return pd.DataFrame([
+        {
+            "Filename": r["filename"] + (" ⏱️ partial" if r.get("partial") else ""),
+            "Score": r["overall_score"],
+            "Keyword Coverage %": round(r["keywords"]["coverage"] * 100) if r.get("keywords") else None,
+            **{cat: r["scores"].get(cat, 0) for cat in config.ANALYSIS_CATEGORIES}
+        }
+        for r in records
+    ])
+
+def render_resume_detail(record, kind):
+    """Build the per-resume chart and feedback only for the resume being viewed."""
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    if record.get("partial"):
+        st.warning(f"⏱️ Partial result: based only on the {record.get('segments_analyzed', 0)} segment(s) that finished before the time limit or stop.")
+    col1, col2 = st.columns([1, 1])
+
+    with col1:
+        st.subheader(f"Overall Score: {record.get('overall_score', 0)}/10")
+        if record.get("detail_pending"):
+            st.write("**Recommendations:** open *Detailed Feedback* below to generate them.")
+        else:
+            st.write(f"**Recommendations:** {record.get('recommendations', 'None')}")
+        st.write("**Pros:**")
+        st.write(", ".join(record.get("pros", [])))
+        st.write("**Cons:**")
+        st.write(", ".join(record.get("cons", [])))
+
+    with col2:
+        fig = charts.make_score_chart(record.get("scores", {}), f"Skills Assessment - {record['filename']}", kind)
+        st.plotly_chart(fig, use_container_width=True)
+
+    keywords = record.get("keywords")
+    if keywords:
+        st.markdown(f"#### 🔑 ATS Keywords ({keywords['role']}, {keywords['coverage'] * 100:.0f}% coverage)")
+        st.write(f"**Present:** {', '.join(keywords['present']) or 'none'}")
+        st.write(f"**Missing:** {', '.join(keywords['missing']) or 'none'}")
+
+    if record.get("triage"):
+        render_lazy_detail(record)
+    else:
+        st.markdown("#### Detailed Feedback")
+        for cat, fb in record.get("feedback", {}).items():
+            st.markdown(f"**{cat}**: {fb}")
+    st.markdown('</div>', unsafe_allow_html=True)
+
+def render_lazy_detail(record):
+    """Triage results: the full critique is only generated when it is first asked for."""
+    with st.expander("Detailed Feedback"):
+        if record.get("detail_pending"):
+            if detail_key(record) not in st.session_state.get("detail_sources", {}):
+                # E.g. a resume skipped as analyzed before: its text was never read in this session
+                st.caption("Only scores are stored for this resume. Analyze it again with triage off for detailed feedback.")
+            elif st.button("📝 Generate detailed feedback", key=f"detail_{detail_key(record)}"):
+                load_detail(record)
+        if not record.get("detail_pending"):
+            for cat, fb in record.get("feedback", {}).items():
+                st.markdown(f"**{cat}**: {fb}")
 
-    # numeric aggregation
-    agg_scores = {cat: [] for cat in cats}
-    overall_vals = []
-    pros_all = []
-    cons_all = []
-    feedback_concat = {cat: [] for cat in cats}
-    recommendations_all = []
+def render_batch_results(records, kind):
+    """
+    Batch view: sortable, paginated leaderboard plus one comparison heatmap.
+    Individual charts and feedback are only built for the opened resume.
+    """
+    leaderboard = build_leaderboard(records)
+
+    st.markdown("## 🏆 Leaderboard")
+    sort_col1, sort_col2, sort_col3 = st.columns([2, 1, 1])
+    sort_by = sort_col1.selectbox("Sort by", ["Score"] + config.ANALYSIS_CATEGORIES + ["Filename"])
+    ascending = sort_col2.radio("Order", ["Descending", "Ascending"], horizontal=True) == "Ascending"
+    total_pages = max(1, ceil(len(records) / config.RESULTS_PAGE_SIZE))
+    page = sort_col3.number_input("Page", min_value=1, max_value=total_pages, value=1, step=1)
+
+    ordered = leaderboard.sort_values(sort_by, ascending=ascending, kind="stable")
+    start = (page - 1) * config.RESULTS_PAGE_SIZE
+    page_df = ordered.iloc[start:start + config.RESULTS_PAGE_SIZE]
+    st.dataframe(page_df, use_container_width=True)
+    st.caption(f"Showing {start + 1}-{start + len(page_df)} of {len(records)} resume(s) · page {page}/{total_pages}")
+
+    page_records = [records[i] for i in page_df.index]
+    st.plotly_chart(make_comparison_heatmap(page_records, title=f"Category Scores (page {page})"), use_container_width=True)
+
+    st.markdown("## 🔎 Resume Details")
+    selected = st.selectbox(
+        "Open resume",
+        options=[None] + list(ordered.index),
+        format_func=lambda i: "— select a resume —" if i is None else f"{records[i]['filename']} ({records[i]['overall_score']}/10)"
+    )
+    if selected is not None:
+        render_resume_detail(records[selected], kind)
+
+def render_model_comparison(runs):
+    """Side-by-side view of per-model scores, agreement, latency and token usage."""
+    st.markdown("## ⚖️ Model Comparison")
+    for run in runs:
+        st.markdown(f"### 📄 {run['filename']}")
+        st.dataframe(pd.DataFrame([
+            {
+                "Model": f"{r['provider']} / {r['model']}" + (" ⏱️ partial" if r.get("partial") else ""),
+                "Overall": r["aggregated"]["overall_score"] if r["aggregated"] else None,
+                "Latency (s)": round(r["latency"], 2),
+                "Prompt Tokens": r["token_usage"].get("prompt_tokens", 0),
+                "Completion Tokens": r["token_usage"].get("completion_tokens", 0),
+                "Errors": "; ".join(r["errors"])
+            }
+            for r in run["results"]
+        ]), use_container_width=True)
 
-    for ch in chunk_results:
-        # if error
-        if not isinstance(ch, dict):
+        scores_df, stats_df = compute_model_agreement(run["results"])
+        if scores_df.empty:
+            st.error("No model produced a valid analysis.")
             continue
-        scores = ch.get("scores", {})
-        for cat in cats:
-            v = scores.get(cat)
-            try:
-                if v is not None:
-                    agg_scores[cat].append(float(v))
-            except Exception:
-                pass
-        ov = ch.get("overall_score")
-        try:
-            if ov is not None:
-                overall_vals.append(float(ov))
-        except Exception:
-            pass
-
-        fb = ch.get("feedback", {})
-        for cat in cats:
-            text = fb.get(cat)
-            if text:
-                feedback_concat[cat].append(text)
-
-        rec = ch.get("recommendations")
-        if rec:
-            recommendations_all.append(rec)
-        pros_all.extend(ch.get("pros", []) or [])
-        cons_all.extend(ch.get("cons", []) or [])
-
-    # compute averages (or 0)
-    final_scores = {}
-    for cat in cats:
-        vals = agg_scores.get(cat, [])
-        final_scores[cat] = int(round(sum(vals)/len(vals))) if vals else 0
-
-    final_overall = int(round(sum(overall_vals)/len(overall_vals))) if overall_vals else 0
-
-    # Join feedbacks intelligently (unique, keep order and truncate to reasonable length)
-    final_feedback = {}
-    for cat in cats:
-        pieces = []
-        seen = set()
-        for p in feedback_concat[cat]:
-            p_strip = p.strip()
-            if p_strip and p_strip not in seen:
-                pieces.append(p_strip)
-                seen.add(p_strip)
-        final_feedback[cat] = " ".join(pieces)[:1200]  # truncate
-
-    # recommendations: top few unique
-    rec_seen = []
-    for r in recommendations_all:
-        r_strip = r.strip()
-        if r_strip and r_strip not in rec_seen:
-            rec_seen.append(r_strip)
-    final_recommendations = " ".join(rec_seen[:3])[:1000]
-
-    # pros/cons unique
-    pros_unique = list(dict.fromkeys([p for p in pros_all if p]))
-    cons_unique = list(dict.fromkeys([c for c in cons_all if c]))
-
-    return {
-        "scores": final_scores,
-        "overall_score": final_overall,
-        "feedback": final_feedback,
-        "recommendations": final_recommendations,
-        "pros": pros_unique,
-        "cons": cons_unique
-    }
+        if len(scores_df.columns) > 1:
+            within_one = (stats_df["Spread"] <= 1).mean() * 100
+            st.markdown(f"**Agreement:** mean spread {stats_df['Spread'].mean():.2f} points · {within_one:.0f}% of categories within 1 point")
 
-def make_radar_chart(data, title):
-    df = pd.DataFrame(dict(r=list(data.values()), theta=list(data.keys())))
-    fig = px.line_polar(df, r='r', theta='theta', line_close=True, title=title)
-    fig.update_traces(fill='toself')
-    fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 10])))
-    return fig
-
-def make_bar_chart(data, title):
-    df = pd.DataFrame(list(data.items()), columns=['Category', 'Score'])
-    fig = px.bar(df, x='Category', y='Score', title=title, range_y=[0, 10])
-    return fig
-
-def make_pie_chart(data, title):
-    df = pd.DataFrame(list(data.items()), columns=['Category', 'Score'])
-    fig = px.pie(df, values='Score', names='Category', title=title)
-    return fig
+        col1, col2 = st.columns([3, 2])
+        with col1:
+            long_df = scores_df.reset_index(names="Category").melt(id_vars="Category", var_name="Model", value_name="Score")
+            fig = px.bar(long_df, x="Category", y="Score", color="Model", barmode="group", range_y=[0, 10])
+            st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            st.dataframe(scores_df.join(stats_df), use_container_width=True)
+
+def render_report_job(job):
+    """Progress of a background report batch, then its download."""
+    if not job.finished:
+        st.progress(job.done / max(1, job.total), text=f"📄 Writing {job.fmt} reports: {job.done}/{job.total}")
+        return
+    if job.error:
+        st.error(f"Report generation failed: {job.error}")
+        return
+    if job.chart_error:
+        st.warning(f"Charts could not be rendered ({job.chart_error}); the reports were written without chart images.")
+    st.caption(f"{job.total} {job.fmt} report(s) written in {job.elapsed:.1f}s to `{job.path}`")
+    if job.path.exists():
+        st.download_button("Download candidate reports (ZIP)", job.path.read_bytes(), job.path.name, "application/zip")
+
+def render_jd_ranking(jd_state, kind):
+    """Retrieval ranking of the pool, with LLM and blended scores for the critiqued top-K."""
+    st.markdown("## 🎯 Job Description Ranking")
+    st.caption(f"Ranked {len(jd_state['ranking'])} matching resume(s) out of {jd_state['pool_size']} in {jd_state['rank_ms']:.1f} ms")
+    records = jd_state["records"]
+    rows = []
+    for rank, hit in enumerate(jd_state["ranking"], start=1):
+        record = records.get(hit["doc_id"])
+        rows.append({
+            "Rank": rank,
+            "Filename": hit["filename"],
+            "Retrieval Score": hit["score"],
+            "LLM Score": record["overall_score"] if record else None,
+            "Blended Score": record["blended_score"] if record else None
+        })
+    ranking_df = pd.DataFrame(rows)
+    if records:
+        ranking_df = ranking_df.sort_values(["Blended Score", "Retrieval Score"], ascending=False, na_position="last")
+    st.dataframe(ranking_df.head(config.RESULTS_PAGE_SIZE * 5), use_container_width=True, hide_index=True)
+
+    if records:
+        selected = st.selectbox(
+            "Open candidate",
+            options=[None] + list(records),
+            format_func=lambda d: "— select a candidate —" if d is None else f"{records[d]['filename']} ({records[d]['blended_score']}/10 blended)"
+        )
+        if selected is not None:
+            render_resume_detail(records[selected], kind)
 
 # ---------------------------
 # SQLite persistence
 # ---------------------------
 if save_to_db:
-    conn = sqlite3.connect(**config.get_db_connection_params())
-    c = conn.cursor()
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS analyses (
-        id INTEGER PRIMARY KEY,
-        filename TEXT,
-        job_role TEXT,
-        analysis_time TEXT,
-        overall_score REAL,
-        scores_json TEXT,
-        feedback_json TEXT,
-        recommendations TEXT,
-        pros_json TEXT,
-        cons_json TEXT,
-        raw_response TEXT
-    )""")
-    conn.commit()
+    conn = database.get_connection()
+    database.init_db(conn)
 else:
     conn = None
 
 
+def save_record(record, index_text=None):
+    # Queued for the background writer, so the script thread never waits on SQLite locks
+    if save_to_db:
+        future = persistence.get_writer().submit(record, index_text)
+        if record.get("triage"):
+            # Its detailed feedback is stored on this row once generated
+            def remember_id(f):
+                if f.exception() is None:
+                    record["analysis_id"] = f.result()
+            future.add_done_callback(remember_id)
+
+def detail_key(record):
+    return f"{record['filename']}|{record['analysis_time']}"
+
+def load_detail(record):
+    """Generate the full critique of a triage record and store it on its saved analysis."""
+    source = st.session_state.get("detail_sources", {}).get(detail_key(record))
+    if source is None:
+        st.info("The resume text for this result is no longer available; analyze it again to generate detailed feedback.")
+        return
+    chunks = analysis.iter_chunks([source["text"]], size=source["chunk_size"], overlap=source["chunk_overlap"])
+    segments = analysis.count_chunks(source["text"], size=source["chunk_size"], overlap=source["chunk_overlap"])
+    deadline = deadlines.Deadline(resume_time_limit)
+    status = st.empty()
+    detail, errors = run_until_done(
+        lambda: analysis.generate_detail(source["client"], chunks, record["job_role"], source["keyword_digest"], cache_conn=conn, deadline=deadline),
+        deadline, status, f"Detailed feedback for {record['filename']}: {segments} segment(s)"
+    )
+    status.empty()
+    for error in errors:
+        st.error(f"Error analyzing {record['filename']}, {error}")
+    if detail is None:
+        return
+    if save_to_db and "analysis_id" not in record:
+        # The triage row may still be queued; let it be written before the record changes
+        persistence.get_writer().wait_for_pending(lambda item: item.record is record, config.WRITE_FLUSH_TIMEOUT_SECONDS)
+    record.update(detail, detail_pending=False)
+    del st.session_state["detail_sources"][detail_key(record)]
+    if save_to_db and "analysis_id" in record:
+        persistence.get_writer().submit(record, analysis_id=record["analysis_id"])
+
+def find_analyzed(digest):
+    """The stored analysis of this exact file for the current role and model, if any."""
+    if conn is None:
+        return None
+    # An earlier run's analysis of this very file may still be queued for the database
+    persistence.get_writer().wait_for_pending(lambda item: item.record.get("content_hash") == digest, config.WRITE_FLUSH_TIMEOUT_SECONDS)
+    # A scores-only triage result is enough for a triage run, not for a full one
+    return database.find_analysis_by_hash(conn, digest, target_role, selected_provider, selected_model, include_pending=triage_mode)
+
+def analyze_zip_entry(ai_client, entry, content, batch_deadline, results_records, detail_sources):
+    """
+    Extract, analyze and save one resume from a ZIP. Runs on an ingestion
+    worker thread, so no Streamlit calls here; problems are returned as messages.
+    """
+    is_pdf = validators.sniff_file_type(content) == "pdf"
+    text = analysis.extract_text_from_bytes(content, is_pdf)
+    is_valid, error = validators.validate_extracted_text(text, entry.filename)
+    if not is_valid:
+        return None, [error]
+
+    keyword_scan = ats_keywords.scan_keywords(text, target_role)
+    keyword_digest = ats_keywords.format_keyword_digest(keyword_scan)
+    # Chunks are cut as the analysis pulls them, so only those in flight are held
+    chunks = analysis.iter_chunks([text], size=chunk_chars, overlap=chunk_overlap)
+    segments = analysis.count_chunks(text, size=chunk_chars, overlap=chunk_overlap)
+    resume_deadline = deadlines.Deadline(resume_time_limit, parent=batch_deadline)
+    # Workers run side by side, so each needs its own connection for the chunk cache
+    with contextlib.closing(database.get_connection()) if conn is not None else contextlib.nullcontext() as cache_conn:
+        chunk_results, chunk_errors, _ = analysis.analyze_chunks(ai_client, chunks, target_role, keyword_digest, cache_conn=cache_conn,
+                                                                 deadline=resume_deadline, triage=triage_mode)
+    aggregated = analysis.aggregate_chunk_analyses(chunk_results)
+    if aggregated is None:
+        return None, chunk_errors or ["no valid chunk analyses"]
+
+    partial = len(chunk_results) < segments and resume_deadline.expired
+    record = analysis.build_record(entry.filename, aggregated, chunk_results, selected_provider, selected_model, target_role, keyword_scan, partial, triage_mode)
+    record["content_hash"] = entry.content_hash
+    if triage_mode:
+        detail_sources[detail_key(record)] = {"text": text, "keyword_digest": keyword_digest, "client": ai_client,
+                                              "chunk_size": chunk_chars, "chunk_overlap": chunk_overlap}
+    # Appended here rather than by the script thread, so resumes finishing after a Stop are kept too
+    results_records.append(record)
+    save_record(record, index_text=text)
+    return record, chunk_errors
+
+def render_ingest_log(log):
+    """Outcome of every entry of the last ZIP ingestion."""
+    counts = pd.Series([row["Status"] for row in log]).value_counts()
+    with st.expander(f"📦 ZIP ingestion: {len(log)} file(s) · " + " · ".join(f"{n} {status}" for status, n in counts.items())):
+        st.dataframe(pd.DataFrame(log), hide_index=True, use_container_width=True)
+
+
 # ---------------------------
 # Main Logic
 # ---------------------------
 uploaded_files = st.file_uploader("Upload resumes", type=["pdf", "txt"], accept_multiple_files=True)
+zip_upload = st.file_uploader("Or upload a ZIP of resumes (for large requisitions)", type=["zip"],
+                              help=f"Read one file at a time and analyzed {config.ZIP_INGEST_WORKERS} at once. "
+                                   "Files already analyzed for the same role and model are skipped.")
 analyze_btn = st.button("🔍 Analyze Resume(s)")
+if st.session_state.pop("analysis_stopped", False) and not analyze_btn:
+    st.info("⏹️ Analysis stopped. Resumes finished before the stop are shown below; an interrupted resume is marked partial.")
 
 if analyze_btn:
-    if not uploaded_files:
+    if not uploaded_files and zip_upload is None:
         st.warning("Please upload a resume.")
         st.stop()
 
-    if not api_key:
-        st.error(f"❌ Please provide a {selected_provider} API Key to proceed.")
+    if uploaded_files and zip_upload is not None:
+        st.error("Upload either individual resumes or a ZIP archive, not both.")
         st.stop()
 
-    # Initialize Provider
-    try:
-        ai_client = ai_providers.get_provider(selected_provider, api_key, selected_model)
-    except Exception as e:
-        st.error(f"Error initializing AI Provider: {e}")
+    if zip_upload is not None:
+        is_valid, error = validators.validate_zip_archive(zip_upload)
+        if not is_valid:
+            st.error(error)
+            st.stop()
+        if comparison_mode:
+            st.error("❌ ZIP archives are analyzed with a single model; turn off model comparison.")
+            st.stop()
+
+    if len(uploaded_files or []) > config.MAX_FILES_PER_BATCH:
+        st.error(f"Too many files ({len(uploaded_files)}). Maximum allowed: {config.MAX_FILES_PER_BATCH}")
         st.stop()
 
-    st.info(f"🚀 Starting analysis using **{selected_provider}** ({selected_model})...")
-
-    results_records = []
-    progress_bar = st.progress(0)
+    is_valid, error = validators.validate_chunk_params(chunk_chars, chunk_overlap)
+    if not is_valid:
+        st.error(error)
+        st.stop()
 
-    for idx, up in enumerate(uploaded_files):
-        progress_bar.progress(int((idx / len(uploaded_files)) * 100))
+    if comparison_mode:
+        if len(comparison_pairs) < 2:
+            st.error("❌ Select at least two models to compare.")
+            st.stop()
+        missing_keys = [p for p in dict.fromkeys(p for p, _ in comparison_pairs) if not api_keys.get(p)]
+        if missing_keys:
+            st.error(f"❌ Please provide API Keys for: {', '.join(missing_keys)}")
+            st.stop()
+    elif not api_key:
+        st.error(f"❌ Please provide a {selected_provider} API Key to proceed.")
+        st.stop()
 
-        safe_filename = validators.sanitize_filename(up.name)
-        st.markdown(f"### 📄 {safe_filename}")
+    if zip_upload is not None:
+        # Entries are validated one by one as they are read
+        try:
+            ingest = bulk_ingest.ZipIngest(zip_upload, find_analyzed=find_analyzed)
+        except Exception as e:
+            st.error(f"Could not read '{validators.sanitize_filename(zip_upload.name)}': {e}")
+            st.stop()
+        if not ingest.total:
+            st.error("The archive holds no files to analyze.")
+            st.stop()
+        uploaded_files = []
+    else:
+        # Pre-flight: reject bad uploads before any PDF parsing or LLM calls
+        ingest = None
+        uploaded_files, rejected_files = validators.preflight_file_batch(uploaded_files)
+        if rejected_files:
+            st.warning(f"⚠️ {len(rejected_files)} file(s) rejected before analysis:")
+            for rejected_name, reason in rejected_files:
+                st.markdown(f"- **{rejected_name}**: {reason}")
+        if not uploaded_files:
+            st.error("No valid files to analyze.")
+            st.stop()
+
+    if comparison_mode:
+        model_labels = ", ".join(f"{p} ({m})" for p, m in comparison_pairs)
+        st.info(f"🚀 Comparing {len(comparison_pairs)} models concurrently: {model_labels}...")
+    else:
+        # Initialize Provider
+        try:
+            ai_client = ai_providers.get_provider(selected_provider, api_key, selected_model)
+        except Exception as e:
+            st.error(f"Error initializing AI Provider: {e}")
+            st.stop()
 
-        # Extract
-        text = extract_text_from_uploaded(up)
-        if not text or len(text) < config.MIN_RESUME_TEXT_LENGTH:
-            st.error(f"Could not extract sufficient text from {safe_filename}.")
-            continue
+        st.info(f"🚀 Starting analysis using **{selected_provider}** ({selected_model})...")
 
-        # Chunk
-        chunks = chunk_text(text, size=chunk_chars, overlap=chunk_overlap)
-        st.write(f"Analyzing {len(chunks)} text segment(s)...")
+    # Stored up front and filled as resumes finish, so results survive a Stop;
+    # they also persist across reruns so sorting, paging and opening a resume don't re-analyze
+    results_records = []
+    comparison_runs = []
+    # What a triage record needs to generate its detailed feedback later
+    detail_sources = {}
+    st.session_state["results_records"] = results_records
+    st.session_state["comparison_runs"] = comparison_runs
+    st.session_state["detail_sources"] = detail_sources
+    ingest_log = []
+    st.session_state["ingest_log"] = ingest_log
+    st.button("⏹️ Stop", on_click=stop_analysis, help="Cancel outstanding AI calls and keep the results finished so far")
+    progress_bar = st.progress(0)
+    keyword_status = st.empty()
+    call_status = st.empty()
+    batch_deadline = deadlines.Deadline(batch_time_limit)
 
-        chunk_results = []
-        for i, ch in enumerate(chunks):
-            prompt = build_prompt_for_chunk(ch, target_role)
-            try:
-                # Call AI Provider
-                raw_response = ai_client.generate_critique(prompt, system_instruction=get_system_instruction())
-                parsed = extract_first_json(raw_response)
-                chunk_results.append(parsed)
-            except Exception as e:
-                st.error(f"Error analyzing segment {i+1}: {e}")
-
-        # aggregate chunk results
-        aggregated = aggregate_chunk_analyses(chunk_results)
-        if aggregated is None:
-            st.error(f"Could not analyze {safe_filename} (no valid chunk analyses).")
-            continue
+    profiler = profiling.SamplingProfiler().start() if profile_run else None
+    try:
+        if ingest is not None:
+            ingest_start = time.perf_counter()
+            entries = ingest.process(
+                lambda entry, content: analyze_zip_entry(ai_client, entry, content, batch_deadline, results_records, detail_sources),
+                deadline=batch_deadline
+            )
+            # Closed on Stop, which cancels the batch deadline so running resumes abandon their calls
+            with contextlib.closing(entries):
+                for entry in entries:
+                    if entry is not None:
+                        ingest_log.append({"File": entry.name, "Status": entry.status, "Details": entry.message})
+                        if entry.status == "skipped":
+                            results_records.append(entry.record)
+                        progress_bar.progress(int(ingest.done / ingest.total * 100), text=f"📦 {entry.filename}: {entry.status} ({ingest.done}/{ingest.total})")
+                    call_status.caption(f"⏳ {ingest.done}/{ingest.total} file(s) processed · {time.perf_counter() - ingest_start:.0f}s elapsed")
+
+        for idx, up in enumerate(uploaded_files):
+            if batch_deadline.expired:
+                st.warning(f"⏱️ Batch time limit reached; {len(uploaded_files) - idx} resume(s) were not analyzed.")
+                break
+            safe_filename = validators.sanitize_filename(up.name)
+            progress_bar.progress(int((idx / len(uploaded_files)) * 100), text=f"📄 {safe_filename} ({idx + 1}/{len(uploaded_files)})")
+
+            # Extract
+            text = analysis.extract_text_from_uploaded(up)
+            is_valid, error = validators.validate_extracted_text(text, safe_filename)
+            if not is_valid:
+                st.error(error)
+                continue
+
+            # Local keyword scan: instant, and passed to the model as a digest
+            keyword_scan = ats_keywords.scan_keywords(text, target_role)
+            keyword_digest = ats_keywords.format_keyword_digest(keyword_scan)
+            keyword_status.caption(f"🔑 {safe_filename}: {keyword_scan['coverage'] * 100:.0f}% {keyword_scan['role']} keyword coverage · missing: {', '.join(keyword_scan['missing'][:8]) or 'none'}")
+
+            # Chunk: cut as the analysis pulls them, so only the chunks in flight are held
+            segments = analysis.count_chunks(text, size=chunk_chars, overlap=chunk_overlap)
+            resume_deadline = deadlines.Deadline(resume_time_limit, parent=batch_deadline)
+            status_label = f"{safe_filename}: {segments} segment(s)"
+
+            if comparison_mode:
+                # Every model reads the same chunks, so they are cut once
+                chunks = analysis.chunk_text(text, size=chunk_chars, overlap=chunk_overlap)
+                model_results = run_until_done(
+                    lambda: run_model_comparison(comparison_pairs, api_keys, chunks, target_role, keyword_digest, resume_deadline),
+                    resume_deadline, call_status, status_label
+                )
+                for r in model_results:
+                    if r["aggregated"] is not None:
+                        save_record(analysis.build_record(safe_filename, r["aggregated"], r["chunk_results"], r["provider"], r["model"], target_role, keyword_scan, r["partial"]))
+                comparison_runs.append({"filename": safe_filename, "results": model_results})
+                continue
+
+            detail_source = {"text": text, "keyword_digest": keyword_digest, "client": ai_client,
+                             "chunk_size": chunk_chars, "chunk_overlap": chunk_overlap}
+
+            def keep_partial(outcome, filename=safe_filename, keyword_scan=keyword_scan, detail_source=detail_source):
+                # Runs while the script is being interrupted, so no Streamlit calls here
+                aggregated = analysis.aggregate_chunk_analyses(outcome[0])
+                if aggregated is None:
+                    return
+                record = analysis.build_record(filename, aggregated, outcome[0], selected_provider, selected_model, target_role, keyword_scan, partial=True, triage=triage_mode)
+                if triage_mode:
+                    detail_sources[detail_key(record)] = detail_source
+                results_records.append(record)
+                save_record(record)
+
+            chunks = analysis.iter_chunks([text], size=chunk_chars, overlap=chunk_overlap)
+            chunk_results, chunk_errors, cache_hits = run_until_done(
+                lambda: analysis.analyze_chunks(ai_client, chunks, target_role, keyword_digest, cache_conn=conn, deadline=resume_deadline, triage=triage_mode),
+                resume_deadline, call_status, status_label, on_stop=keep_partial
+            )
+            call_status.empty()
+            for chunk_error in chunk_errors:
+                st.error(f"Error analyzing {safe_filename}, {chunk_error}")
+            if cache_hits:
+                st.caption(f"♻️ {safe_filename}: reused {cache_hits}/{segments} unchanged segment(s) from cache")
+
+            # aggregate chunk results
+            aggregated = analysis.aggregate_chunk_analyses(chunk_results)
+            if aggregated is None:
+                st.error(f"Could not analyze {safe_filename} (no valid chunk analyses).")
+                continue
+
+            # Save results
+            partial = len(chunk_results) < segments and resume_deadline.expired
+            if partial:
+                st.warning(f"⏱️ {safe_filename}: time limit reached; result is a partial aggregation of {len(chunk_results)}/{segments} segment(s).")
+            record = analysis.build_record(safe_filename, aggregated, chunk_results, selected_provider, selected_model, target_role, keyword_scan, partial, triage_mode)
+            record["content_hash"] = bulk_ingest.file_content_hash(up)
+            if triage_mode:
+                detail_sources[detail_key(record)] = detail_source
+            results_records.append(record)
+            save_record(record, index_text=text)
+    finally:
+        if profiler is not None:
+            # Also saved when the run is stopped, which is when a profile is most wanted
+            st.session_state["last_profile"] = profiler.finish()
 
-        scores = aggregated.get("scores", {})
+    progress_bar.progress(100)
+    call_status.empty()
+    st.success("Analysis Complete!")
 
-        # Display
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        col1, col2 = st.columns([1, 1])
+ingest_log = st.session_state.get("ingest_log")
+if ingest_log:
+    render_ingest_log(ingest_log)
 
-        with col1:
-            st.subheader(f"Overall Score: {aggregated.get('overall_score', 0)}/10")
-            st.write(f"**Recommendations:** {aggregated.get('recommendations', 'None')}")
-            st.write("**Pros:**")
-            st.write(", ".join(aggregated.get("pros", [])))
-            st.write("**Cons:**")
-            st.write(", ".join(aggregated.get("cons", [])))
+comparison_runs = st.session_state.get("comparison_runs", [])
+if comparison_runs:
+    render_model_comparison(comparison_runs)
 
-        with col2:
-            if chart_type == "Radar":
-                fig = make_radar_chart(scores, f"Skills Assessment - {safe_filename}")
-            elif chart_type == "Pie":
-                fig = make_pie_chart(scores, f"Skills Assessment - {safe_filename}")
-            else:
-                fig = make_bar_chart(scores, f"Skills Assessment - {safe_filename}")
-            st.plotly_chart(fig, use_container_width=True)
+results_records = st.session_state.get("results_records", [])
+if results_records:
+    render_batch_results(results_records, chart_type)
 
-        with st.expander("Detailed Feedback"):
-            for cat, fb in aggregated.get("feedback", {}).items():
-                st.markdown(f"**{cat}**: {fb}")
-        st.markdown('</div>', unsafe_allow_html=True)
-
-        # Save results
-        record = {
-            "filename": safe_filename,
-            "job_role": target_role,
-            "analysis_time": datetime.utcnow().isoformat(),
-            "overall_score": aggregated.get("overall_score", 0),
-            "scores": aggregated.get("scores", {}),
-            "feedback": aggregated.get("feedback", {}),
-            "recommendations": aggregated.get("recommendations", ""),
-            "pros": aggregated.get("pros", []),
-            "cons": aggregated.get("cons", []),
-            "raw_response": json.dumps(chunk_results)
+    # Export options
+    df = pd.DataFrame([
+        {
+            "Filename": r["filename"],
+            "Score": r["overall_score"],
+            "Recommendations": r["recommendations"],
+            **{f"Score_{k}": v for k, v in r["scores"].items()}
         }
-        results_records.append(record)
+        for r in results_records
+    ])
+
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv = df.to_csv(index=False).encode('utf-8')
+    st.download_button("Download CSV Report", csv, f"resume_report_{ts}.csv", "text/csv")
+
+    # Candidate reports are written in the background; the results stay usable meanwhile
+    report_col1, report_col2 = st.columns([1, 3])
+    report_format = report_col1.radio("Report format", config.REPORT_FORMATS, horizontal=True)
+    if report_col2.button(f"📄 Generate {len(results_records)} candidate report(s)"):
+        st.session_state["report_job"] = reports.ReportJob(results_records, report_format, chart_type).start()
+
+report_job = st.session_state.get("report_job")
+if report_job is not None:
+    if report_job.finished:
+        render_report_job(report_job)
+    else:
+        @st.fragment(run_every=1)
+        def poll_report_job():
+            if report_job.finished:
+                st.rerun()
+            render_report_job(report_job)
+        poll_report_job()
+
+last_profile = st.session_state.get("last_profile")
+if last_profile:
+    with st.expander(f"⏱️ Profile of the last run ({last_profile['elapsed']:.1f}s, {last_profile['samples']} samples)"):
+        if not last_profile["path"]:
+            st.caption("The run finished before any samples were taken (e.g. every segment came from the cache).")
+        else:
+            st.caption(f"Saved to `{last_profile['path']}` (open with `python -m pstats` or snakeviz). "
+                       "Times are wall-clock, so waiting on the AI provider shows up as well as CPU work. "
+                       f"{last_profile['waiting_pct']:.0f}% of samples were threads waiting on other threads; "
+                       "they are left out of this table but kept in the saved profile.")
+            st.dataframe(pd.DataFrame(last_profile["top"]), hide_index=True, use_container_width=True)
 
-        if save_to_db and conn:
-            try:
-                c.execute("INSERT INTO analyses (filename, job_role, analysis_time, overall_score, scores_json, feedback_json, recommendations, pros_json, cons_json, raw_response) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                         (record['filename'], record['job_role'], record['analysis_time'], record['overall_score'],
-                          json.dumps(record['scores']), json.dumps(record['feedback']), record['recommendations'],
-                          json.dumps(record['pros']), json.dumps(record['cons']), record['raw_response']))
-                conn.commit()
-            except Exception as e:
-                st.warning(f"DB Save Error: {e}")
+# ---------------------------
+# Job Description Ranking
+# ---------------------------
+st.markdown("---")
+with st.expander("🎯 Rank resume pool against a job description"):
+    st.markdown('<span class="muted">Every analyzed resume (plus any files uploaded above) is kept in a local BM25 index. '
+                'The whole pool is ranked locally; only the top-K candidates are sent to the AI model.</span>', unsafe_allow_html=True)
+    jd_text = st.text_area("Job description", height=200, placeholder="Paste the job description here...")
+    jd_top_k = st.number_input("Critique top-K candidates with the AI model", min_value=0, max_value=100, value=config.JD_TOP_K, step=1)
+    rank_btn = st.button("🎯 Rank Pool")
+
+if rank_btn:
+    if not conn:
+        st.error("Enable 'Save analyses to DB' — the resume index is stored in the database.")
+        st.stop()
+    if not jd_text.strip():
+        st.warning("Please paste a job description.")
+        st.stop()
 
-    progress_bar.progress(100)
-    st.success("Analysis Complete!")
+    # Add newly uploaded resumes to the pool (already-indexed text is skipped)
+    if uploaded_files:
+        pool_files, _ = validators.preflight_file_batch(uploaded_files)
+        for up in pool_files:
+            text = analysis.extract_text_from_uploaded(up)
+            if validators.validate_extracted_text(text)[0]:
+                retrieval.index_resume(conn, validators.sanitize_filename(up.name), text)
+
+    # Resumes analyzed moments ago may still be queued for the index
+    persistence.get_writer().wait_for_pending(lambda item: item.index_text is not None, config.WRITE_FLUSH_TIMEOUT_SECONDS)
+    rank_start = time.perf_counter()
+    ranking = retrieval.rank_resumes(conn, jd_text)
+    rank_ms = (time.perf_counter() - rank_start) * 1000
+
+    jd_records = {}
+    top_hits = ranking[:jd_top_k]
+    if top_hits and not api_key:
+        st.warning(f"Provide a {selected_provider} API Key to critique the top {len(top_hits)} candidate(s). Showing retrieval ranking only.")
+    elif top_hits:
+        ai_client = ai_providers.get_provider(selected_provider, api_key, selected_model)
+        jd_role = f"{target_role or 'See job description'}\nJob description:\n{jd_text[:config.JD_PROMPT_MAX_CHARS]}"
+        jd_progress = st.progress(0)
+        jd_status = st.empty()
+        batch_deadline = deadlines.Deadline(batch_time_limit)
+        for idx, hit in enumerate(top_hits):
+            if batch_deadline.expired:
+                st.warning(f"⏱️ Batch time limit reached; {len(top_hits) - idx} candidate(s) were not critiqued.")
+                break
+            jd_progress.progress(int((idx / len(top_hits)) * 100), text=f"📄 {hit['filename']} ({idx + 1}/{len(top_hits)})")
+            text = retrieval.get_indexed_text(conn, hit["doc_id"])
+            keyword_scan = ats_keywords.scan_keywords(text, target_role)
+            keyword_digest = ats_keywords.format_keyword_digest(keyword_scan)
+            chunks = analysis.iter_chunks([text], size=chunk_chars, overlap=chunk_overlap)
+            segments = analysis.count_chunks(text, size=chunk_chars, overlap=chunk_overlap)
+            resume_deadline = deadlines.Deadline(resume_time_limit, parent=batch_deadline)
+            chunk_results, chunk_errors, _ = run_until_done(
+                lambda: analysis.analyze_chunks(ai_client, chunks, jd_role, keyword_digest, cache_conn=conn, deadline=resume_deadline),
+                resume_deadline, jd_status, f"{hit['filename']}: {segments} segment(s)"
+            )
+            jd_status.empty()
+            for chunk_error in chunk_errors:
+                st.error(f"Error analyzing {hit['filename']}, {chunk_error}")
+            aggregated = analysis.aggregate_chunk_analyses(chunk_results)
+            if aggregated is None:
+                continue
+            partial = len(chunk_results) < segments and resume_deadline.expired
+            record = analysis.build_record(hit["filename"], aggregated, chunk_results, selected_provider, selected_model, target_role, keyword_scan, partial)
+            record["retrieval_score"] = hit["score"]
+            record["blended_score"] = retrieval.blend_scores(record["overall_score"], hit["score"])
+            save_record(record)
+            jd_records[hit["doc_id"]] = record
+        jd_progress.progress(100)
+
+    st.session_state["jd_ranking"] = {
+        "ranking": ranking,
+        "records": jd_records,
+        "rank_ms": rank_ms,
+        "pool_size": retrieval.get_index_size(conn)
+    }
 
-    # Export options
-    if results_records:
-        df = pd.DataFrame([
-            {
-                "Filename": r["filename"],
-                "Score": r["overall_score"],
-                "Recommendations": r["recommendations"],
-                **{f"Score_{k}": v for k, v in r["scores"].items()}
-            }
-            for r in results_records
-        ])
+jd_state = st.session_state.get("jd_ranking")
+if jd_state:
+    render_jd_ranking(jd_state, chart_type)
 
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        csv = df.to_csv(index=False).encode('utf-8')
-        st.download_button("Download CSV Report", csv, f"resume_report_{ts}.csv", "text/csv")
+# ---------------------------
+# Search past analyses
+# ---------------------------
+with st.expander("🔎 Search past analyses"):
+    if not conn:
+        st.info("Enable 'Save analyses to DB' to search stored analyses.")
+    else:
+        search_query = st.text_input("Search feedback", placeholder='e.g., employment gaps, kubernetes, "led team"  (use kube* for prefix search)')
+        f_col1, f_col2, f_col3, f_col4 = st.columns([2, 2, 2, 3])
+        search_fields = f_col1.multiselect("In", list(feedback_search.SEARCH_FIELDS), default=list(feedback_search.SEARCH_FIELDS))
+        search_role = f_col2.text_input("Job role contains")
+        search_scores = f_col3.slider("Overall score", 0.0, 10.0, (0.0, 10.0), step=0.5)
+        search_dates = f_col4.date_input("Analyzed between", value=())
+
+        if search_query.strip():
+            date_from = search_dates[0].isoformat() if len(search_dates) > 0 else None
+            date_to = (search_dates[1] + timedelta(days=1)).isoformat() if len(search_dates) > 1 else None
+            # Analyses still queued (or their detailed feedback) would be missing from the results
+            persistence.get_writer().wait_for_pending(lambda item: item.cache_key is None, config.WRITE_FLUSH_TIMEOUT_SECONDS)
+            search_start = time.perf_counter()
+            try:
+                hits = feedback_search.search_analyses(
+                    conn, search_query,
+                    fields=[feedback_search.SEARCH_FIELDS[f] for f in search_fields] or None,
+                    job_role=search_role.strip() or None,
+                    min_score=search_scores[0], max_score=search_scores[1],
+                    date_from=date_from, date_to=date_to,
+                    limit=config.SEARCH_RESULTS_LIMIT
+                )
+            except sqlite3.OperationalError as e:
+                st.error(f"Search Error: {e}")
+                hits = []
+            st.caption(f"{len(hits)} result(s) in {(time.perf_counter() - search_start) * 1000:.1f} ms")
+            for hit in hits:
+                st.markdown(
+                    f"**{html.escape(hit['filename'] or '')}** · {html.escape(hit['job_role'] or 'No role')} · "
+                    f"{hit['overall_score']}/10 · {(hit['analysis_time'] or '')[:10]}<br>"
+                    f"<span class=\"muted\">{hit['snippet']}</span>",
+                    unsafe_allow_html=True
+                )
 
 # Cleanup
 if conn:
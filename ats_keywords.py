@@ -0,0 +1,370 @@
+"""
+Local ATS keyword engine for Resume Critiquer application.
+Scans resume text against role-specific keyword dictionaries using an
+Aho-Corasick automaton, so keyword coverage is computed deterministically
+in one linear pass instead of being re-derived by the LLM on every chunk.
+"""
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# ---------------------------
+# Keyword dictionaries
+# ---------------------------
+GENERAL_ROLE = "General"
+
+ROLE_KEYWORDS = {
+    GENERAL_ROLE: [
+        "communication", "leadership", "teamwork", "problem solving", "project management",
+        "stakeholder management", "collaboration", "cross-functional", "mentoring", "time management",
+        "analytical", "presentation", "negotiation", "process improvement", "budget"
+    ],
+    "Software Engineer": [
+        "python", "java", "javascript", "typescript", "go", "c++", "sql", "git", "rest api",
+        "microservices", "unit testing", "ci/cd", "docker", "kubernetes", "aws", "agile",
+        "system design", "data structures", "algorithms", "code review", "linux", "debugging"
+    ],
+    "Backend Engineer": [
+        "python", "java", "go", "node.js", "sql", "postgresql", "mysql", "redis", "rest api",
+        "graphql", "microservices", "distributed systems", "message queue", "kafka", "docker",
+        "kubernetes", "aws", "ci/cd", "caching", "scalability", "api design", "unit testing"
+    ],
+    "Frontend Engineer": [
+        "javascript", "typescript", "react", "vue", "angular", "html", "css", "redux",
+        "responsive design", "accessibility", "webpack", "next.js", "unit testing", "jest",
+        "performance optimization", "ui/ux", "rest api", "git", "cross-browser"
+    ],
+    "Data Scientist": [
+        "python", "r", "sql", "machine learning", "deep learning", "statistics", "pandas",
+        "numpy", "scikit-learn", "tensorflow", "pytorch", "a/b testing", "data visualization",
+        "feature engineering", "regression", "classification", "nlp", "hypothesis testing",
+        "tableau", "jupyter"
+    ],
+    "Data Engineer": [
+        "python", "sql", "etl", "data pipeline", "spark", "hadoop", "kafka", "airflow",
+        "data warehouse", "snowflake", "bigquery", "redshift", "dbt", "data modeling",
+        "aws", "gcp", "azure", "streaming", "batch processing", "data quality"
+    ],
+    "DevOps Engineer": [
+        "linux", "docker", "kubernetes", "terraform", "ansible", "ci/cd", "jenkins",
+        "github actions", "aws", "azure", "gcp", "monitoring", "prometheus", "grafana",
+        "infrastructure as code", "bash", "python", "incident response", "sre", "networking"
+    ],
+    "Product Manager": [
+        "product roadmap", "product strategy", "user research", "stakeholder management",
+        "requirements", "user stories", "agile", "scrum", "kpi", "okr", "a/b testing",
+        "go-to-market", "market research", "prioritization", "cross-functional", "analytics",
+        "customer discovery", "product launch"
+    ],
+    "Marketing": [
+        "seo", "sem", "content marketing", "social media", "email marketing", "google analytics",
+        "campaign management", "brand strategy", "marketing automation", "crm", "hubspot",
+        "conversion rate", "lead generation", "market research", "copywriting", "roi", "a/b testing"
+    ],
+    "Finance": [
+        "financial modeling", "forecasting", "budgeting", "variance analysis", "excel",
+        "financial reporting", "gaap", "ifrs", "valuation", "fp&a", "accounts payable",
+        "accounts receivable", "reconciliation", "audit", "erp", "sap", "cash flow", "risk management"
+    ],
+}
+
+# Alternative spellings that count as the canonical keyword
+KEYWORD_ALIASES = {
+    "kubernetes": ["k8s"],
+    "javascript": ["js", "ecmascript"],
+    "typescript": ["ts"],
+    "postgresql": ["postgres"],
+    "node.js": ["nodejs"],
+    "next.js": ["nextjs"],
+    "ci/cd": ["ci cd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "rest api": ["restful api", "rest apis", "restful apis", "restful"],
+    "machine learning": ["ml"],
+    "nlp": ["natural language processing"],
+    "aws": ["amazon web services"],
+    "gcp": ["google cloud"],
+    "a/b testing": ["ab testing", "a/b tests", "split testing"],
+    "unit testing": ["unit tests", "unit test"],
+    "infrastructure as code": ["iac"],
+    "sre": ["site reliability"],
+    "seo": ["search engine optimization"],
+    "fp&a": ["financial planning and analysis", "financial planning & analysis"],
+    "kpi": ["kpis"],
+    "okr": ["okrs"],
+    "ui/ux": ["ux", "ui"],
+}
+
+# Substring of the target role -> keyword dictionary (first match wins)
+ROLE_ALIASES = [
+    ("backend", "Backend Engineer"),
+    ("back-end", "Backend Engineer"),
+    ("back end", "Backend Engineer"),
+    ("frontend", "Frontend Engineer"),
+    ("front-end", "Frontend Engineer"),
+    ("front end", "Frontend Engineer"),
+    ("data scien", "Data Scientist"),
+    ("machine learning", "Data Scientist"),
+    ("ml ", "Data Scientist"),
+    ("data engineer", "Data Engineer"),
+    ("devops", "DevOps Engineer"),
+    ("site reliability", "DevOps Engineer"),
+    ("sre", "DevOps Engineer"),
+    ("platform engineer", "DevOps Engineer"),
+    ("product manager", "Product Manager"),
+    ("product owner", "Product Manager"),
+    ("marketing", "Marketing"),
+    ("financ", "Finance"),
+    ("accountant", "Finance"),
+    ("software", "Software Engineer"),
+    ("developer", "Software Engineer"),
+    ("engineer", "Software Engineer"),
+]
+
+
+def resolve_role(target_role: Optional[str]) -> str:
+    """
+    Map a free-text target role to one of the keyword dictionaries.
+
+    Args:
+        target_role: Target job role entered by the user (optional)
+
+    Returns:
+        Key into ROLE_KEYWORDS (GENERAL_ROLE if nothing matches)
+    """
+    if not target_role:
+        return GENERAL_ROLE
+    role = f" {target_role.lower().strip()} "
+    for needle, role_key in ROLE_ALIASES:
+        if needle in role:
+            return role_key
+    return GENERAL_ROLE
+
+
+# ---------------------------
+# Aho-Corasick automaton
+# ---------------------------
+# Patterns this short ("r", "go", "ml", "ui") also occur as ordinary words or
+# word fragments, so they only count when written with a capital letter and
+# not joined to a neighbouring word ("R&D", "go-to-market", "Node.js")
+SHORT_KEYWORD_MAX_LEN = 2
+WORD_JOINERS = "&'\u2019-+#@."
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over lower-cased patterns.
+
+    Each pattern maps to a canonical keyword so aliases are reported under
+    the keyword they stand for. Matches must sit on word boundaries, so
+    "java" does not match inside "javascript"; short patterns are held to
+    the stricter rule above.
+    """
+
+    __slots__ = ("goto", "fail", "output", "keywords")
+
+    def __init__(self, patterns: Dict[str, str]):
+        """
+        Args:
+            patterns: Mapping of pattern text -> canonical keyword
+        """
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[int, str]]] = [[]]
+        self.keywords = sorted(set(patterns.values()))
+
+        for pattern, keyword in patterns.items():
+            pattern = " ".join(pattern.lower().split())
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = nxt
+            self.output[state].append((len(pattern), keyword))
+
+        # Breadth-first pass to build failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def find_all(self, text: str) -> Dict[str, List[int]]:
+        """
+        Scan text once and return every keyword match.
+
+        Runs of whitespace in the text are treated as a single space so
+        keywords split across line breaks still match.
+
+        Args:
+            text: Resume text
+
+        Returns:
+            Mapping of canonical keyword -> list of character offsets in text
+        """
+        goto, fail, output = self.goto, self.fail, self.output
+        positions: Dict[str, List[int]] = {}
+        lowered = text.lower()
+        # Original offset of each character fed to the automaton
+        offsets: List[int] = []
+        state = 0
+        prev_space = True
+
+        for idx, ch in enumerate(lowered):
+            if ch.isspace():
+                if prev_space:
+                    continue
+                ch = " "
+                prev_space = True
+            else:
+                prev_space = False
+            offsets.append(idx)
+
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            if output[state]:
+                end = idx + 1
+                after = lowered[end] if end < len(lowered) else " "
+                if after.isalnum():
+                    continue
+                for length, keyword in output[state]:
+                    start_norm = len(offsets) - length
+                    start = offsets[start_norm]
+                    if start > 0 and lowered[start - 1].isalnum():
+                        continue
+                    if length <= SHORT_KEYWORD_MAX_LEN and not _is_standalone(text, lowered, start, end):
+                        continue
+                    hits = positions.setdefault(keyword, [])
+                    # Two aliases of one keyword can end at the same place
+                    if not hits or hits[-1] != start:
+                        hits.append(start)
+
+        return positions
+
+
+def _is_standalone(text: str, lowered: str, start: int, end: int) -> bool:
+    """Whether a short match is capitalized and not joined to a neighbouring word."""
+    if text[start:end] == lowered[start:end]:
+        return False
+    if start > 1 and lowered[start - 1] in WORD_JOINERS and lowered[start - 2].isalnum():
+        return False
+    if end + 1 < len(lowered) and lowered[end] in WORD_JOINERS and lowered[end + 1].isalnum():
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def get_automaton(role_key: str) -> KeywordAutomaton:
+    """Compile (once per process) the automaton for a role's keyword dictionary."""
+    patterns = {}
+    for keyword in ROLE_KEYWORDS.get(role_key, ROLE_KEYWORDS[GENERAL_ROLE]):
+        patterns[keyword] = keyword
+        for alias in KEYWORD_ALIASES.get(keyword, []):
+            patterns.setdefault(alias, keyword)
+    return KeywordAutomaton(patterns)
+
+
+# ---------------------------
+# Public API
+# ---------------------------
+def scan_keywords(text: str, target_role: Optional[str] = None) -> dict:
+    """
+    Compute present / missing keywords and coverage for a resume.
+
+    Args:
+        text: Full extracted resume text
+        target_role: Target job role (optional)
+
+    Returns:
+        Dictionary with role, present (keyword -> offsets), missing and coverage (0-1)
+    """
+    role_key = resolve_role(target_role)
+    automaton = get_automaton(role_key)
+    present = automaton.find_all(text or "")
+    missing = [kw for kw in automaton.keywords if kw not in present]
+    coverage = len(present) / len(automaton.keywords) if automaton.keywords else 0.0
+
+    return {
+        "role": role_key,
+        "present": {kw: present[kw] for kw in automaton.keywords if kw in present},
+        "missing": missing,
+        "coverage": coverage
+    }
+
+
+def format_keyword_digest(scan: dict, max_items: int = 25) -> str:
+    """
+    Format a keyword scan as a compact digest for the LLM prompt.
+
+    Args:
+        scan: Result of scan_keywords
+        max_items: Maximum keywords listed per group
+
+    Returns:
+        Short multi-line string
+    """
+    present = [f"{kw} (x{len(pos)})" for kw, pos in scan["present"].items()]
+    return (
+        f"Keyword dictionary: {scan['role']}\n"
+        f"Coverage: {scan['coverage'] * 100:.0f}% ({len(scan['present'])}/{len(scan['present']) + len(scan['missing'])})\n"
+        f"Present: {', '.join(present[:max_items]) or 'none'}\n"
+        f"Missing: {', '.join(scan['missing'][:max_items]) or 'none'}"
+    )
+
+
+def benchmark_throughput(corpus_mb: float = 50.0, role_key: str = "Backend Engineer") -> dict:
+    """
+    Measure scan throughput on a synthetic corpus.
+
+    Args:
+        corpus_mb: Approximate corpus size in megabytes
+        role_key: Keyword dictionary to compile
+
+    Returns:
+        Dictionary with corpus size, build time, scan time and MB/s
+    """
+    sample = (
+        "Senior backend engineer building distributed systems in Python and Go. "
+        "Designed REST APIs and microservices on AWS with Docker and k8s, "
+        "cut p99 latency by 40% using Redis caching and Kafka message queues.\n"
+    )
+    corpus = sample * max(1, int(corpus_mb * 1024 * 1024 / len(sample)))
+
+    get_automaton.cache_clear()
+    start = time.perf_counter()
+    automaton = get_automaton(role_key)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    automaton.find_all(corpus)
+    scan_s = time.perf_counter() - start
+
+    size_mb = len(corpus) / (1024 * 1024)
+    return {
+        "corpus_mb": size_mb,
+        "build_seconds": build_s,
+        "scan_seconds": scan_s,
+        "mb_per_second": size_mb / scan_s if scan_s else float("inf")
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    size = float(sys.argv[1]) if len(sys.argv) > 1 else 50.0
+    stats = benchmark_throughput(size)
+    print(f"Corpus: {stats['corpus_mb']:.1f} MB | build: {stats['build_seconds'] * 1000:.1f} ms | "
+          f"scan: {stats['scan_seconds']:.2f} s | {stats['mb_per_second']:.2f} MB/s")
@@ -0,0 +1,188 @@
+"""
+Bulk ZIP ingestion for Resume Critiquer application.
+Reads an archive of resumes entry by entry: only the central directory and
+the entry being read are decompressed, so a requisition of thousands of
+resumes is never unpacked to memory or disk. Each entry is checked from its
+header (type, size, compression ratio) and again while it is decompressed,
+then handed to a bounded pool of workers that extract and analyze it.
+Entries whose exact content was analyzed before are skipped.
+"""
+import hashlib
+import zipfile
+import zlib
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import Callable, Iterator, List, Optional, Tuple
+from src import config, validators
+
+
+def content_hash(content: bytes) -> str:
+    """Hash of a resume file's raw bytes, used to recognize a resume already analyzed."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_content_hash(fileobj) -> str:
+    """content_hash of a seekable binary file (e.g. a Streamlit upload), hashed in place rather than copied out."""
+    fileobj.seek(0)
+    return hashlib.file_digest(fileobj, "sha256").hexdigest()
+
+
+def is_resume_entry(info: zipfile.ZipInfo) -> bool:
+    """Files worth reporting on; folders, archiver metadata and hidden files are passed over silently."""
+    if info.is_dir() or info.filename.startswith(config.ZIP_SKIPPED_DIRS):
+        return False
+    return not PurePosixPath(info.filename).name.startswith(".")
+
+
+def read_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> bytes:
+    """
+    Decompress one entry, ZIP_READ_CHUNK_BYTES at a time.
+
+    Raises:
+        ValueError: As soon as the data outgrows the size declared in its
+            header or MAX_FILE_SIZE_BYTES (a header that understates a zip bomb)
+    """
+    limit = min(info.file_size, config.MAX_FILE_SIZE_BYTES)
+    content = bytearray()
+    with archive.open(info) as member:
+        while True:
+            piece = member.read(config.ZIP_READ_CHUNK_BYTES)
+            if not piece:
+                break
+            content += piece
+            if len(content) > limit:
+                raise ValueError(f"'{info.filename}' decompresses to more than the {limit} bytes its header declares")
+    return bytes(content)
+
+
+@dataclass
+class IngestEntry:
+    """
+    One resume in the archive and what became of it.
+
+    status is "analyzed", "skipped" (analyzed before), "duplicate" (same
+    content as an earlier entry), "rejected" (failed validation), "failed"
+    (no valid analysis) or "not analyzed" (time limit or stop).
+    """
+    name: str  # Path inside the archive
+    filename: str  # Sanitized, as stored
+    content_hash: str = ""
+    status: str = "pending"
+    message: str = ""
+    record: Optional[dict] = None
+
+
+class ZipIngest:
+    """
+    Streams the resumes in a ZIP through an analysis function.
+
+    Args:
+        fileobj: The archive (any seekable binary file, e.g. a Streamlit upload)
+        workers: Entries extracted and analyzed at once (default ZIP_INGEST_WORKERS)
+        find_analyzed: Content hash -> stored record of an earlier analysis, or None
+
+    Raises:
+        zipfile.BadZipFile: If fileobj is not a ZIP archive
+        ValueError: If the archive holds more than ZIP_MAX_MEMBERS resumes
+    """
+
+    def __init__(self, fileobj, workers: int = None, find_analyzed: Callable[[str], Optional[dict]] = None):
+        self.archive = zipfile.ZipFile(fileobj)
+        self.members = [info for info in self.archive.infolist() if is_resume_entry(info)]
+        if len(self.members) > config.ZIP_MAX_MEMBERS:
+            self.archive.close()
+            raise ValueError(f"Archive holds {len(self.members)} files. Maximum allowed: {config.ZIP_MAX_MEMBERS}")
+        self.total = len(self.members)
+        self.workers = max(1, workers or config.ZIP_INGEST_WORKERS)
+        self.find_analyzed = find_analyzed
+        self.done = 0
+        self.counts = Counter()
+
+    def process(self, analyze: Callable[[IngestEntry, bytes], Tuple[Optional[dict], List[str]]],
+                deadline=None, poll_seconds: float = 0.5) -> Iterator[Optional[IngestEntry]]:
+        """
+        Validate and analyze every entry, yielding each IngestEntry as it finishes.
+
+        `analyze(entry, content)` runs on a worker thread and returns
+        (record or None, error messages). An entry is only read once a worker
+        is free for it, so at most `workers` resumes are held in memory.
+        While workers are busy, None is yielded every poll_seconds so the
+        caller can refresh its progress display. Closing the generator early
+        (e.g. on Stop) cancels `deadline`, so running analyses abandon their calls.
+        """
+        seen = set()
+        members = iter(self.members)
+        running = {}
+        exhausted = False
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="zip-ingest")
+        try:
+            while not exhausted or running:
+                while not exhausted and len(running) < self.workers:
+                    info = next(members, None)
+                    if info is None:
+                        exhausted = True
+                        break
+                    entry = IngestEntry(info.filename, validators.sanitize_filename(PurePosixPath(info.filename).name))
+                    content = self._admit(info, entry, seen, deadline)
+                    if content is None:
+                        yield self._finish(entry)
+                    else:
+                        running[pool.submit(self._analyze, analyze, entry, content)] = entry
+                if not running:
+                    continue
+                finished, _ = wait(running, timeout=poll_seconds, return_when=FIRST_COMPLETED)
+                if not finished:
+                    yield None
+                for future in finished:
+                    yield self._finish(running.pop(future))
+        finally:
+            if running and deadline is not None:
+                deadline.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.archive.close()
+
+    def _admit(self, info: zipfile.ZipInfo, entry: IngestEntry, seen: set, deadline) -> Optional[bytes]:
+        """Read and check one entry; returns its bytes if it should be analyzed, else records why not."""
+        if deadline is not None and deadline.expired:
+            entry.status = "not analyzed"
+            entry.message = "Cancelled" if deadline.cancelled else "Batch time limit reached"
+            return None
+        is_valid, error = validators.validate_zip_member(info)
+        if is_valid:
+            try:
+                content = read_member(self.archive, info)
+            except (ValueError, RuntimeError, EOFError, zipfile.BadZipFile, zlib.error, NotImplementedError) as e:
+                is_valid, error = False, str(e)
+        if is_valid:
+            is_valid, error = validators.validate_file_content(content, entry.filename)
+        if not is_valid:
+            entry.status, entry.message = "rejected", error
+            return None
+
+        entry.content_hash = content_hash(content)
+        if entry.content_hash in seen:
+            entry.status, entry.message = "duplicate", "Same content as an earlier file in the archive"
+            return None
+        seen.add(entry.content_hash)
+        previous = self.find_analyzed(entry.content_hash) if self.find_analyzed else None
+        if previous is not None:
+            entry.status, entry.record = "skipped", previous
+            entry.message = f"Analyzed before as '{previous['filename']}' ({(previous.get('analysis_time') or '')[:10]})"
+            return None
+        return content
+
+    @staticmethod
+    def _analyze(analyze, entry: IngestEntry, content: bytes):
+        try:
+            entry.record, errors = analyze(entry, content)
+        except Exception as e:
+            entry.record, errors = None, [str(e)]
+        entry.status = "analyzed" if entry.record is not None else "failed"
+        entry.message = "; ".join(errors)
+
+    def _finish(self, entry: IngestEntry) -> IngestEntry:
+        self.done += 1
+        self.counts[entry.status] += 1
+        return entry
@@ -0,0 +1,34 @@
+"""
+Score charts for Resume Critiquer application.
+Plotly figures shared by the Streamlit app and the report generator.
+"""
+import pandas as pd
+import plotly.express as px
+
+
+def make_radar_chart(data, title):
+    df = pd.DataFrame(dict(r=list(data.values()), theta=list(data.keys())))
+    fig = px.line_polar(df, r='r', theta='theta', line_close=True, title=title)
+    fig.update_traces(fill='toself')
+    fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 10])))
+    return fig
+
+
+def make_bar_chart(data, title):
+    df = pd.DataFrame(list(data.items()), columns=['Category', 'Score'])
+    fig = px.bar(df, x='Category', y='Score', title=title, range_y=[0, 10])
+    return fig
+
+
+def make_pie_chart(data, title):
+    df = pd.DataFrame(list(data.items()), columns=['Category', 'Score'])
+    fig = px.pie(df, values='Score', names='Category', title=title)
+    return fig
+
+
+def make_score_chart(data, title, kind):
+    if kind == "Radar":
+        return make_radar_chart(data, title)
+    elif kind == "Pie":
+        return make_pie_chart(data, title)
+    return make_bar_chart(data, title)
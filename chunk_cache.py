@@ -0,0 +1,67 @@
+"""
+Chunk-level memoization for Resume Critiquer application.
+Stores the parsed model response of each resume chunk in SQLite, keyed by
+the chunk text plus everything else that shapes the answer (target role,
+provider, model and prompt version). Re-analyzing a lightly edited resume
+only sends the chunks that actually changed to the model.
+"""
+import hashlib
+import json
+import sqlite3
+from datetime import datetime, timezone
+from typing import Optional
+from src import config
+
+
+def ensure_cache_schema(conn: sqlite3.Connection):
+    """Create the chunk cache table if it doesn't exist."""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS chunk_cache (
+        cache_key TEXT PRIMARY KEY,
+        provider TEXT,
+        model TEXT,
+        result_json TEXT,
+        created_time TEXT
+    )""")
+    conn.commit()
+
+
+def make_cache_key(chunk: str, job_role: Optional[str], provider_name: str, model_name: str, triage: bool = False) -> str:
+    """
+    Build the memoization key for one chunk.
+
+    Args:
+        chunk: Chunk text exactly as sent in the prompt
+        job_role: Target job role (optional)
+        provider_name: Provider identifier
+        model_name: Model name
+        triage: Key for the scores-only triage prompt instead of the full critique
+
+    Returns:
+        Hex digest identifying the (chunk, role, provider, model, prompt version) combination
+    """
+    version = f"{config.PROMPT_VERSION}-triage" if triage else config.PROMPT_VERSION
+    parts = [version, provider_name, model_name, (job_role or "").strip().lower(), chunk]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8", errors="ignore")).hexdigest()
+
+
+def get_cached_result(conn: sqlite3.Connection, cache_key: str) -> Optional[dict]:
+    """Return the cached parsed result for a chunk, or None on a miss."""
+    row = conn.execute("SELECT result_json FROM chunk_cache WHERE cache_key = ?", (cache_key,)).fetchone()
+    if not row:
+        return None
+    try:
+        return json.loads(row[0])
+    except (TypeError, ValueError):
+        return None
+
+
+def store_result(conn: sqlite3.Connection, cache_key: str, provider_name: str, model_name: str, result: dict,
+                 commit: bool = True):
+    """Memoize the parsed result of a chunk (commit=False to batch it into the caller's transaction)."""
+    conn.execute(
+        "INSERT OR REPLACE INTO chunk_cache (cache_key, provider, model, result_json, created_time) VALUES (?, ?, ?, ?, ?)",
+        (cache_key, provider_name, model_name, json.dumps(result), datetime.now(timezone.utc).isoformat())
+    )
+    if commit:
+        conn.commit()
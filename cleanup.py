@@ -22,8 +22,8 @@ def get_export_files() -> List[Tuple[Path, float]]:
     if not config.EXPORTS_DIR.exists():
         return export_files
 
-    # Get all CSV, XLSX, and JSON files
-    for pattern in ['*.csv', '*.xlsx', '*.json']:
+    # Get all CSV, XLSX, and JSON files, plus saved run profiles and candidate reports
+    for pattern in ['*.csv', '*.xlsx', '*.json', '*.prof', '*.pdf', '*.html', '*.zip']:
         for file in config.EXPORTS_DIR.glob(pattern):
             if file.is_file():
                 mtime = file.stat().st_mtime
@@ -85,6 +85,8 @@ def get_export_summary() -> dict:
     csv_count = sum(1 for f in export_files if f[0].suffix == '.csv')
     xlsx_count = sum(1 for f in export_files if f[0].suffix == '.xlsx')
     json_count = sum(1 for f in export_files if f[0].suffix == '.json')
+    profile_count = sum(1 for f in export_files if f[0].suffix == '.prof')
+    report_count = sum(1 for f in export_files if f[0].suffix in ('.pdf', '.html', '.zip'))
 
     # Get oldest and newest
     oldest = None
@@ -99,11 +101,42 @@ def get_export_summary() -> dict:
         'csv_count': csv_count,
         'xlsx_count': xlsx_count,
         'json_count': json_count,
+        'profile_count': profile_count,
+        'report_count': report_count,
         'oldest_file': oldest,
         'newest_file': newest
     }
 
 
+def cleanup_chart_cache(max_keep: int = None) -> int:
+    """
+    Remove the least recently used cached chart images beyond max_keep.
+
+    Args:
+        max_keep: Maximum number of images to keep (default CHART_CACHE_MAX_FILES)
+
+    Returns:
+        Number of images deleted
+    """
+    if max_keep is None:
+        max_keep = config.CHART_CACHE_MAX_FILES
+
+    if not config.CHART_CACHE_DIR.exists():
+        return 0
+
+    # Cache hits touch their image, so mtime is the last use
+    images = sorted(config.CHART_CACHE_DIR.glob('*.png'), key=lambda f: f.stat().st_mtime, reverse=True)
+    deleted = 0
+    for file_path in images[max_keep:]:
+        try:
+            file_path.unlink()
+            deleted += 1
+        except Exception as e:
+            print(f"Warning: Could not delete {file_path.name}: {e}")
+
+    return deleted
+
+
 def cleanup_database_on_startup():
     """
     Perform database maintenance tasks on application startup.
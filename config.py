@@ -36,29 +36,73 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 # Provider Constants
 PROVIDER_OPENAI = "OpenAI"
 PROVIDER_GROQ = "Groq"
+PROVIDER_MOCK = "Mock"  # Offline, deterministic; for tests, demos and load testing
+PROVIDER_LOCAL = "Local"  # Any OpenAI-compatible server on our own hosts (llama.cpp, vLLM, ...)
 
 AVAILABLE_PROVIDERS = [PROVIDER_OPENAI, PROVIDER_GROQ]
 
+# Show the mock provider in the UI (always available to the HTTP API and scripts)
+ENABLE_MOCK_PROVIDER = os.getenv("ENABLE_MOCK_PROVIDER", "false").lower() in ("1", "true", "yes")
+if ENABLE_MOCK_PROVIDER:
+    AVAILABLE_PROVIDERS.append(PROVIDER_MOCK)
+MOCK_LATENCY_SECONDS = float(os.getenv("MOCK_LATENCY_SECONDS", "0"))
+
+# Local OpenAI-compatible inference server (shown in the UI when LOCAL_BASE_URL is set)
+LOCAL_BASE_URL = os.getenv("LOCAL_BASE_URL", "")  # e.g. http://gpu-01:8080/v1
+LOCAL_API_KEY = os.getenv("LOCAL_API_KEY", "")  # Only if the server was started with an API key
+LOCAL_MODELS = [m.strip() for m in os.getenv("LOCAL_MODELS", "local-model").split(",") if m.strip()] or ["local-model"]
+LOCAL_SERVER_SLOTS = int(os.getenv("LOCAL_SERVER_SLOTS", "0"))  # Requests the server runs in parallel; 0 = ask it (llama.cpp /props), else 4
+LOCAL_CONSTRAINED_DECODING = os.getenv("LOCAL_CONSTRAINED_DECODING", "json_object")  # "json_schema" (grammar-constrained), "json_object" or "none"
+LOCAL_HTTP2 = os.getenv("LOCAL_HTTP2", "false").lower() in ("1", "true", "yes")  # Needs the h2 package and an https:// server
+LOCAL_KEEPALIVE_SECONDS = 120  # Idle pooled connections to the server are kept this long
+if LOCAL_BASE_URL:
+    AVAILABLE_PROVIDERS.append(PROVIDER_LOCAL)
+
+# Environment variable and loaded key per provider
+PROVIDER_API_KEY_ENV_VARS = {
+    PROVIDER_OPENAI: "OPENAI_API_KEY",
+    PROVIDER_GROQ: "GROQ_API_KEY",
+    PROVIDER_MOCK: "",
+    PROVIDER_LOCAL: "LOCAL_API_KEY"
+}
+PROVIDER_API_KEYS = {
+    PROVIDER_OPENAI: OPENAI_API_KEY,
+    PROVIDER_GROQ: GROQ_API_KEY,
+    PROVIDER_MOCK: "mock",  # No key needed
+    PROVIDER_LOCAL: LOCAL_API_KEY or "local"  # Most local servers don't check keys
+}
+
 # Models per Provider
 PROVIDER_MODELS = {
     PROVIDER_OPENAI: ["gpt-4o-mini", "gpt-4o", "gpt-4-turbo"],
     PROVIDER_GROQ: [
         "llama-3.3-70b-versatile",
         "mixtral-8x7b-32768"
-    ]
+    ],
+    PROVIDER_MOCK: ["mock-critic"],
+    PROVIDER_LOCAL: LOCAL_MODELS
 }
 
 # Default selections
 DEFAULT_PROVIDER = PROVIDER_OPENAI
 DEFAULT_MODELS = {
     PROVIDER_OPENAI: "gpt-4o-mini",
-    PROVIDER_GROQ: "llama-3.3-70b-versatile"
+    PROVIDER_GROQ: "llama-3.3-70b-versatile",
+    PROVIDER_MOCK: "mock-critic",
+    PROVIDER_LOCAL: LOCAL_MODELS[0]
 }
 
 # Model parameters
 DEFAULT_MAX_TOKENS = 2000 # Increased for better analysis depth
 DEFAULT_TEMPERATURE = 0.15
 
+# Time limits (seconds); a resume's deadline is capped by its batch's; callers stop waiting on a call at their own deadline
+AI_REQUEST_TIMEOUT_SECONDS = float(os.getenv("AI_REQUEST_TIMEOUT_SECONDS", "60"))
+AI_REQUEST_MAX_RETRIES = int(os.getenv("AI_REQUEST_MAX_RETRIES", "2"))
+RESUME_DEADLINE_SECONDS = int(os.getenv("RESUME_DEADLINE_SECONDS", "300"))
+BATCH_DEADLINE_SECONDS = int(os.getenv("BATCH_DEADLINE_SECONDS", "1800"))
+STOP_GRACE_SECONDS = 2  # How long Stop waits for finished segments before discarding the rest
+
 # ---------------------------
 # Resume Analysis Categories
 # ---------------------------
@@ -81,6 +125,37 @@ DEFAULT_CHUNK_OVERLAP = 300  # characters
 MIN_CHUNK_SIZE = 1000
 MAX_CHUNK_SIZE = 15000
 
+# Content-defined chunk boundaries (see chunk_text in analysis.py)
+CDC_WINDOW_CHARS = 32  # Trailing characters hashed at each candidate line break
+CDC_BOUNDARY_DIVISOR = 8  # About 1 in 8 line breaks qualifies as a chunk boundary
+
+STREAM_READ_BYTES = 64 * 1024  # Read size when streaming plain-text uploads into the chunker
+
+# Bump whenever build_prompt_for_chunk changes, so cached chunk results are not reused
+PROMPT_VERSION = "1"
+
+# Follow-up prompts asking only for fields a chunk response was missing or got wrong
+SCHEMA_REASK_ATTEMPTS = int(os.getenv("SCHEMA_REASK_ATTEMPTS", "1"))
+
+# Triage mode: scores, overall score and short pros/cons only; the detailed
+# critique is generated when a resume's Detailed Feedback is first opened
+TRIAGE_MODE = os.getenv("TRIAGE_MODE", "false").lower() == "true"
+TRIAGE_MAX_TOKENS = 400
+TRIAGE_MAX_LIST_ITEMS = 3  # Pros and cons per segment
+
+# ---------------------------
+# Job Description Ranking (BM25)
+# ---------------------------
+BM25_K1 = 1.5  # Term frequency saturation
+BM25_B = 0.75  # Document length normalization
+JD_TOP_K = int(os.getenv("JD_TOP_K", "10"))  # Candidates sent to the LLM after retrieval
+JD_LLM_WEIGHT = 0.7  # Blended score = weight * LLM score + (1 - weight) * retrieval score
+JD_PROMPT_MAX_CHARS = 2000  # Job description excerpt included in the critique prompt
+
+# Full-text search over stored analyses
+SEARCH_RESULTS_LIMIT = 50
+SEARCH_RANK_WINDOW = 2000  # Newest matching analyses ranked per query; bounds the cost of very common terms
+
 # ---------------------------
 # File Upload Limits
 # ---------------------------
@@ -98,6 +173,37 @@ MAX_RESUME_TEXT_LENGTH = 100000  # Maximum characters (increased for larger cont
 # Allowed file types
 ALLOWED_FILE_TYPES = ["pdf", "txt"]
 
+# Pre-flight checks (run on raw bytes before any PDF parsing)
+MIN_FILE_SIZE_BYTES = 100  # Resumes shouldn't be empty or tiny
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "20"))  # Resumes longer than this are almost certainly not resumes
+PDF_MAGIC_BYTES = b"%PDF-"
+PDF_EOF_SCAN_BYTES = 2048  # How far from the end to look for the %%EOF marker
+
+# Bulk ZIP ingestion (bulk_ingest.py); entries are read one at a time, never unpacked up front
+ZIP_MAX_ARCHIVE_MB = int(os.getenv("ZIP_MAX_ARCHIVE_MB", "200"))  # Streamlit's own upload limit (server.maxUploadSize) defaults to 200MB too
+ZIP_MAX_ARCHIVE_BYTES = ZIP_MAX_ARCHIVE_MB * 1024 * 1024
+ZIP_MAX_MEMBERS = int(os.getenv("ZIP_MAX_MEMBERS", "5000"))
+ZIP_MAX_COMPRESSION_RATIO = 100  # Entries expanding more than this are treated as zip bombs
+ZIP_READ_CHUNK_BYTES = 64 * 1024  # Decompressed per read, so an oversized entry is caught early
+ZIP_INGEST_WORKERS = int(os.getenv("ZIP_INGEST_WORKERS", "4"))  # Resumes extracted and analyzed at once
+ZIP_SKIPPED_DIRS = ("__MACOSX/",)  # Archiver metadata, not resumes
+
+# ---------------------------
+# HTTP API (api.py)
+# ---------------------------
+API_DEFAULT_PROVIDER = os.getenv("API_DEFAULT_PROVIDER", DEFAULT_PROVIDER)
+API_MAX_CONCURRENT_CALLS = int(os.getenv("API_MAX_CONCURRENT_CALLS", "8"))  # LLM calls in flight across all jobs
+API_MAX_CONCURRENT_JOBS = int(os.getenv("API_MAX_CONCURRENT_JOBS", "4"))  # Jobs extracting/analyzing at once; the rest wait queued
+API_UPLOAD_SPOOL_BYTES = 1024 * 1024  # Queued uploads larger than this wait in a temp file, not in memory
+API_MAX_TRACKED_JOBS = int(os.getenv("API_MAX_TRACKED_JOBS", "1000"))  # Finished jobs kept in memory for status lookups
+API_WEBHOOK_URL = os.getenv("API_WEBHOOK_URL", "")  # Default callback when a request doesn't set one
+API_WEBHOOK_SECRET = os.getenv("API_WEBHOOK_SECRET", "")  # Signs callback bodies (HMAC-SHA256) when set
+# Hosts a request's callback_url may point at (".example.com" also allows subdomains).
+# Empty: any host that resolves only to public addresses.
+API_WEBHOOK_ALLOWED_HOSTS = [h.strip().lower() for h in os.getenv("API_WEBHOOK_ALLOWED_HOSTS", "").split(",") if h.strip()]
+API_WEBHOOK_TIMEOUT_SECONDS = 10
+API_WEBHOOK_RETRIES = 3
+
 # ---------------------------
 # Export & Cleanup Configuration
 # ---------------------------
@@ -107,16 +213,45 @@ MAX_EXPORTS_TO_KEEP = int(os.getenv("MAX_EXPORTS_TO_KEEP", "10"))
 # Export file naming pattern
 EXPORT_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
 
+# Candidate reports (reports.py); a batch is written as one ZIP of per-resume reports
+REPORT_FORMATS = ["PDF", "HTML"]
+REPORT_RENDER_WORKERS = int(os.getenv("REPORT_RENDER_WORKERS", "2"))  # Processes rendering chart images (kaleido)
+REPORT_RENDER_TIMEOUT_SECONDS = 60  # Longest wait for one chart image
+REPORT_CHART_WIDTH = 700
+REPORT_CHART_HEIGHT = 450
+CHART_CACHE_DIR = EXPORTS_DIR / "chart_cache"  # Rendered charts, keyed by chart type and score vector
+CHART_CACHE_MAX_FILES = 500  # Least recently used images beyond this are removed by cleanup
+
 # ---------------------------
 # Chart Configuration
 # ---------------------------
 CHART_TYPES = ["Bar", "Radar", "Pie"]
 DEFAULT_CHART_TYPE = "Bar"
 
+# Batch results view
+RESULTS_PAGE_SIZE = 10  # Leaderboard rows (and heatmap rows) per page
+
 # Score color thresholds
 SCORE_HIGH_THRESHOLD = 7.5
 SCORE_MEDIUM_THRESHOLD = 5
 
+# ---------------------------
+# Write-behind persistence (persistence.py)
+# ---------------------------
+WRITE_BATCH_SIZE = 50  # Most analysis records written in one transaction
+WRITE_BATCH_WAIT_SECONDS = 0.2  # How long the writer waits to fill a batch
+WRITE_MAX_RETRIES = int(os.getenv("WRITE_MAX_RETRIES", "8"))  # Retries while the database is locked
+WRITE_RETRY_BACKOFF_SECONDS = 0.1  # Doubled after every retry (capped at 5s)
+WRITE_FLUSH_TIMEOUT_SECONDS = 10  # Longest wait for pending writes at shutdown or before a search
+WRITE_SPILL_PATH = DATA_DIR / "unsaved_analyses.jsonl"  # Records that could not be stored end up here
+
+# ---------------------------
+# Profiling (profiling.py)
+# ---------------------------
+PROFILE_ANALYSIS = os.getenv("PROFILE_ANALYSIS", "false").lower() in ("1", "true", "yes")  # Default for the sidebar toggle
+PROFILE_SAMPLE_INTERVAL_SECONDS = 0.005
+PROFILE_TOP_FUNCTIONS = 25  # Rows shown in the profile expander
+
 # ---------------------------
 # UI Configuration
 # ---------------------------
@@ -0,0 +1,122 @@
+"""
+SQLite persistence for Resume Critiquer application.
+Creates and migrates the schema and stores analysis records; shared by the
+Streamlit app and the HTTP API.
+"""
+import json
+import sqlite3
+from typing import Optional
+from src import config, retrieval, feedback_search, chunk_cache
+
+
+def get_connection() -> sqlite3.Connection:
+    """Open a connection to the configured database."""
+    return sqlite3.connect(**config.get_db_connection_params())
+
+
+def init_db(conn: sqlite3.Connection):
+    """Create (or migrate) the analyses table and every auxiliary table."""
+    c = conn.cursor()
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS analyses (
+        id INTEGER PRIMARY KEY,
+        filename TEXT,
+        job_role TEXT,
+        analysis_time TEXT,
+        overall_score REAL,
+        scores_json TEXT,
+        feedback_json TEXT,
+        recommendations TEXT,
+        pros_json TEXT,
+        cons_json TEXT,
+        raw_response TEXT,
+        provider TEXT,
+        model TEXT,
+        partial INTEGER DEFAULT 0,
+        detail_pending INTEGER DEFAULT 0,
+        content_hash TEXT
+    )""")
+    # Databases created before model tagging / time limits / triage mode / ZIP ingestion lack these columns
+    existing_cols = {row[1] for row in c.execute("PRAGMA table_info(analyses)")}
+    for col, col_type in (("provider", "TEXT"), ("model", "TEXT"), ("partial", "INTEGER DEFAULT 0"),
+                          ("detail_pending", "INTEGER DEFAULT 0"), ("content_hash", "TEXT")):
+        if col not in existing_cols:
+            c.execute(f"ALTER TABLE analyses ADD COLUMN {col} {col_type}")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_analyses_content_hash ON analyses (content_hash)")
+    conn.commit()
+    retrieval.ensure_index_schema(conn)
+    feedback_search.ensure_search_schema(conn)
+    chunk_cache.ensure_cache_schema(conn)
+
+
+def insert_analysis(conn: sqlite3.Connection, record: dict, commit: bool = True) -> int:
+    """
+    Store one analysis record (see analysis.build_record).
+    Pass commit=False to batch several inserts in one transaction.
+
+    Returns:
+        Row id of the new analysis
+    """
+    cur = conn.execute(
+        "INSERT INTO analyses (filename, job_role, analysis_time, overall_score, scores_json, feedback_json, recommendations, pros_json, cons_json, raw_response, provider, model, partial, detail_pending, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (record['filename'], record['job_role'], record['analysis_time'], record['overall_score'],
+         json.dumps(record['scores']), json.dumps(record['feedback']), record['recommendations'],
+         json.dumps(record['pros']), json.dumps(record['cons']), record['raw_response'],
+         record['provider'], record['model'], int(record.get('partial', False)), int(record.get('detail_pending', False)),
+         record.get('content_hash')))
+    if commit:
+        conn.commit()
+    return cur.lastrowid
+
+
+def update_analysis_detail(conn: sqlite3.Connection, analysis_id: int, record: dict, commit: bool = True):
+    """
+    Store the detailed feedback generated later for a triage analysis.
+    Scores are left as triaged, so rankings don't shift when feedback is opened.
+    """
+    conn.execute(
+        "UPDATE analyses SET feedback_json = ?, recommendations = ?, pros_json = ?, cons_json = ?, detail_pending = ? WHERE id = ?",
+        (json.dumps(record['feedback']), record['recommendations'], json.dumps(record['pros']),
+         json.dumps(record['cons']), int(record.get('detail_pending', False)), analysis_id))
+    if commit:
+        conn.commit()
+
+
+def find_analysis_by_hash(conn: sqlite3.Connection, content_hash: str, job_role, provider_name: str, model_name: str,
+                          include_pending: bool = False) -> Optional[dict]:
+    """
+    Latest complete analysis of the same resume file (by content hash) for the
+    same role and model, as a record (see analysis.build_record), or None.
+    Partial analyses don't count, so an interrupted resume is analyzed again.
+    Triage rows still waiting for their detailed feedback only count with
+    include_pending; otherwise the resume is analyzed again in full.
+    """
+    row = conn.execute(
+        "SELECT id, filename, job_role, analysis_time, overall_score, scores_json, feedback_json, recommendations, pros_json, cons_json, raw_response, provider, model, detail_pending "
+        "FROM analyses WHERE content_hash = ? AND job_role IS ? AND provider = ? AND model = ? AND partial = 0 "
+        f"{'' if include_pending else 'AND detail_pending = 0 '}"
+        "ORDER BY id DESC LIMIT 1",
+        (content_hash, job_role, provider_name, model_name)).fetchone()
+    if row is None:
+        return None
+    return {
+        "analysis_id": row[0],
+        "filename": row[1],
+        "job_role": row[2],
+        "analysis_time": row[3],
+        "overall_score": row[4],
+        "scores": json.loads(row[5] or "{}"),
+        "feedback": json.loads(row[6] or "{}"),
+        "recommendations": row[7] or "",
+        "pros": json.loads(row[8] or "[]"),
+        "cons": json.loads(row[9] or "[]"),
+        "raw_response": row[10],
+        "provider": row[11],
+        "model": row[12],
+        "keywords": None,
+        "partial": False,
+        "triage": bool(row[13]),
+        "detail_pending": bool(row[13]),
+        "segments_analyzed": len(json.loads(row[10] or "[]")),
+        "content_hash": content_hash
+    }
@@ -0,0 +1,89 @@
+"""
+Time limits and cancellation for Resume Critiquer application.
+A Deadline bounds a batch or a single resume and can be cancelled (the
+Stop button). Deadlines nest: a resume's deadline never outlasts its batch,
+and a caller stops waiting on an AI call once its own deadline passes.
+"""
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call is abandoned because its deadline passed or it was cancelled."""
+
+
+class Deadline:
+    """
+    Wall-clock time limit with cooperative cancellation.
+
+    Args:
+        seconds: Time allowed from now (None or <= 0 for no limit)
+        parent: Enclosing deadline; expiring or cancelling it expires this one too
+    """
+
+    def __init__(self, seconds: Optional[float] = None, parent: "Deadline" = None):
+        self._expires_at = time.monotonic() + seconds if seconds and seconds > 0 else None
+        self._cancelled = threading.Event()
+        self.parent = parent
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None if neither this deadline nor a parent has a limit."""
+        limits = []
+        if self._expires_at is not None:
+            limits.append(max(0.0, self._expires_at - time.monotonic()))
+        if self.parent is not None:
+            parent_remaining = self.parent.remaining()
+            if parent_remaining is not None:
+                limits.append(parent_remaining)
+        return min(limits) if limits else None
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return self.cancelled or (remaining is not None and remaining <= 0)
+
+    def check(self):
+        """Raise DeadlineExceeded if the deadline has passed or was cancelled."""
+        if self.cancelled:
+            raise DeadlineExceeded("Cancelled")
+        if self.expired:
+            raise DeadlineExceeded("Time limit reached")
+
+
+def call_with_deadline(fn: Callable[[], Any], deadline: Optional[Deadline], poll_seconds: float = 0.1) -> Any:
+    """
+    Run a blocking call, giving up as soon as the deadline passes or is cancelled.
+
+    The call runs in a daemon thread so the caller is never held by a request
+    that hangs; an abandoned call finishes (or times out) in the background
+    and its result is discarded.
+    """
+    if deadline is None:
+        return fn()
+    deadline.check()
+
+    outcome = {}
+    done = threading.Event()
+
+    def run():
+        try:
+            outcome["result"] = fn()
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=run, daemon=True, name="deadline-call").start()
+    while not done.wait(poll_seconds):
+        deadline.check()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
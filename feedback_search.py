@@ -0,0 +1,244 @@
+"""
+Full-text search over stored analyses for Resume Critiquer application.
+Keeps an SQLite FTS5 index of feedback, pros, cons and recommendations in
+sync with the analyses table via triggers, so queries such as "cons that
+mention employment gaps" don't need a LIKE scan over every row.
+"""
+import html
+import json
+import random
+import sqlite3
+import statistics
+import time
+from typing import List, Optional
+from src import config
+
+# Searchable analyses columns (label -> column name)
+SEARCH_FIELDS = {
+    "Feedback": "feedback_json",
+    "Pros": "pros_json",
+    "Cons": "cons_json",
+    "Recommendations": "recommendations"
+}
+
+# Control characters used as snippet markers, so highlighting survives HTML escaping
+_MARK_OPEN = "\x02"
+_MARK_CLOSE = "\x03"
+
+
+def ensure_search_schema(conn: sqlite3.Connection):
+    """
+    Create the FTS5 index and its sync triggers if they don't exist.
+    Existing analyses are indexed once when the index is first created.
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'analyses_fts'").fetchone()
+    conn.executescript("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts USING fts5(
+        filename, job_role, feedback_json, pros_json, cons_json, recommendations,
+        content='analyses', content_rowid='id'
+    );
+    CREATE TRIGGER IF NOT EXISTS analyses_fts_ai AFTER INSERT ON analyses BEGIN
+        INSERT INTO analyses_fts(rowid, filename, job_role, feedback_json, pros_json, cons_json, recommendations)
+        VALUES (new.id, new.filename, new.job_role, new.feedback_json, new.pros_json, new.cons_json, new.recommendations);
+    END;
+    CREATE TRIGGER IF NOT EXISTS analyses_fts_ad AFTER DELETE ON analyses BEGIN
+        INSERT INTO analyses_fts(analyses_fts, rowid, filename, job_role, feedback_json, pros_json, cons_json, recommendations)
+        VALUES ('delete', old.id, old.filename, old.job_role, old.feedback_json, old.pros_json, old.cons_json, old.recommendations);
+    END;
+    CREATE TRIGGER IF NOT EXISTS analyses_fts_au AFTER UPDATE ON analyses BEGIN
+        INSERT INTO analyses_fts(analyses_fts, rowid, filename, job_role, feedback_json, pros_json, cons_json, recommendations)
+        VALUES ('delete', old.id, old.filename, old.job_role, old.feedback_json, old.pros_json, old.cons_json, old.recommendations);
+        INSERT INTO analyses_fts(rowid, filename, job_role, feedback_json, pros_json, cons_json, recommendations)
+        VALUES (new.id, new.filename, new.job_role, new.feedback_json, new.pros_json, new.cons_json, new.recommendations);
+    END;
+    CREATE INDEX IF NOT EXISTS idx_analyses_time ON analyses(analysis_time);
+    """)
+    if not exists:
+        conn.execute("INSERT INTO analyses_fts(analyses_fts) VALUES ('rebuild')")
+    conn.commit()
+
+
+def build_match_query(query: str, fields: Optional[List[str]] = None) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Every word is quoted so punctuation can't break the query syntax; a
+    trailing * keeps prefix search ("kube*"). All words must match.
+
+    Args:
+        query: Text typed by the user
+        fields: Column names to restrict the search to (default: all text fields)
+
+    Returns:
+        FTS5 query string, or empty string if there is nothing to search
+    """
+    terms = []
+    for word in query.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    if not terms:
+        return ""
+    columns = fields or list(SEARCH_FIELDS.values())
+    return "{" + " ".join(columns) + "} : (" + " AND ".join(terms) + ")"
+
+
+def search_analyses(conn: sqlite3.Connection, query: str, fields: Optional[List[str]] = None,
+                    job_role: Optional[str] = None, min_score: Optional[float] = None,
+                    max_score: Optional[float] = None, date_from: Optional[str] = None,
+                    date_to: Optional[str] = None, limit: int = 50, window: Optional[int] = None) -> List[dict]:
+    """
+    Search stored analyses, best matches first.
+
+    Ranking (bm25) costs time per matching row, so only the newest `window`
+    matches that pass the filters are ranked, and snippets are only built
+    for the rows returned.
+
+    Args:
+        conn: SQLite connection with the search schema
+        query: Free-text query
+        fields: Column names to search (see SEARCH_FIELDS)
+        job_role: Only analyses for this job role (case-insensitive substring)
+        min_score: Minimum overall score
+        max_score: Maximum overall score
+        date_from: ISO date/time lower bound on analysis_time (inclusive)
+        date_to: ISO date/time upper bound on analysis_time (exclusive)
+        limit: Maximum number of results
+        window: Newest matches ranked (default SEARCH_RANK_WINDOW)
+
+    Returns:
+        List of dicts with id, filename, job_role, analysis_time, overall_score,
+        rank and snippet (HTML-escaped, matches wrapped in <mark>)
+    """
+    match = build_match_query(query, fields)
+    if not match:
+        return []
+
+    sql = ["""
+        SELECT id, filename, job_role, analysis_time, overall_score, rank FROM (
+            SELECT a.id, a.filename, a.job_role, a.analysis_time, a.overall_score, analyses_fts.rank
+            FROM analyses_fts JOIN analyses a ON a.id = analyses_fts.rowid
+            WHERE analyses_fts MATCH ?"""]
+    params: list = [match]
+    if job_role:
+        sql.append("AND a.job_role LIKE ?")
+        params.append(f"%{job_role}%")
+    if min_score is not None:
+        sql.append("AND a.overall_score >= ?")
+        params.append(min_score)
+    if max_score is not None:
+        sql.append("AND a.overall_score <= ?")
+        params.append(max_score)
+    if date_from:
+        sql.append("AND a.analysis_time >= ?")
+        params.append(date_from)
+    if date_to:
+        sql.append("AND a.analysis_time < ?")
+        params.append(date_to)
+    # FTS5 yields matches newest first without sorting, so rank is only computed inside the window
+    sql.append("ORDER BY analyses_fts.rowid DESC LIMIT ?) ORDER BY rank, id DESC LIMIT ?")
+    params += [window or config.SEARCH_RANK_WINDOW, limit]
+    rows = conn.execute(" ".join(sql), params).fetchall()
+    if not rows:
+        return []
+
+    # FTS5 scans only the rowid range; the IN list (hidden from FTS5 by the +, which would
+    # otherwise re-run the MATCH once per id) keeps snippet() to the returned rows
+    ids = [row[0] for row in rows]
+    snippets = dict(conn.execute(
+        f"""SELECT rowid, snippet(analyses_fts, -1, '{_MARK_OPEN}', '{_MARK_CLOSE}', '…', 16) FROM analyses_fts
+        WHERE analyses_fts MATCH ? AND rowid BETWEEN ? AND ? AND +rowid IN ({", ".join("?" * len(ids))})""",
+        [match, min(ids), max(ids)] + ids))
+
+    results = []
+    for row in rows:
+        snippet = html.escape(snippets.get(row[0]) or "").replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+        results.append({
+            "id": row[0],
+            "filename": row[1],
+            "job_role": row[2],
+            "analysis_time": row[3],
+            "overall_score": row[4],
+            "rank": row[5],
+            "snippet": snippet
+        })
+    return results
+
+
+BENCHMARK_QUERIES = [
+    ("term17 term42", None),  # Two filler words: a selective query
+    ("employment gap", ["cons_json"]),
+    ("kube*", None),
+    ("leadership", None),
+    ("quantify achievements", ["recommendations"]),
+]
+
+
+def benchmark_search(rows: int = 200_000, repeats: int = 20, seed: int = 0) -> dict:
+    """
+    Measure search latency on a synthetic in-memory database.
+
+    Rows are built from random filler words plus a small pool of common
+    feedback phrases, each of which ends up in roughly a quarter of the rows.
+
+    Args:
+        rows: Number of analyses to generate
+        repeats: Times each query in BENCHMARK_QUERIES is run
+        seed: Random seed for the generated rows
+
+    Returns:
+        Dictionary with row count, build time, and per-query median/p95 latency in ms
+    """
+    from src import database
+
+    rnd = random.Random(seed)
+    phrases = [
+        "explain the employment gap", "strong leadership of small teams", "quantify achievements with numbers",
+        "kubernetes and docker experience", "kubeflow pipelines", "summary is too long", "good use of action verbs",
+        "missing certifications", "tailor keywords to the role", "inconsistent date formats", "clear project outcomes",
+    ]
+    vocab = [f"term{i}" for i in range(5000)]
+
+    def text(n):
+        return " ".join(rnd.choice(phrases) if rnd.random() < 0.03 else rnd.choice(vocab) for _ in range(n))
+
+    conn = sqlite3.connect(":memory:")
+    database.init_db(conn)
+    start = time.perf_counter()
+    conn.executemany(
+        "INSERT INTO analyses (filename, job_role, analysis_time, overall_score, scores_json, feedback_json, recommendations, pros_json, cons_json, raw_response) VALUES (?, ?, ?, ?, '{}', ?, ?, ?, ?, '[]')",
+        ((f"resume_{i}.pdf", rnd.choice(["Backend Engineer", "Data Scientist", "Product Manager"]),
+          f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T12:00:00", rnd.randint(1, 10),
+          json.dumps({cat: text(12) for cat in config.ANALYSIS_CATEGORIES}), text(15),
+          json.dumps([text(6) for _ in range(3)]), json.dumps([text(6) for _ in range(3)]))
+         for i in range(rows)))
+    conn.commit()
+    build_s = time.perf_counter() - start
+
+    latencies = {}
+    for query, fields in BENCHMARK_QUERIES:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            search_analyses(conn, query, fields, limit=config.SEARCH_RESULTS_LIMIT)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        latencies[query] = {
+            "matches": conn.execute("SELECT count(*) FROM analyses_fts WHERE analyses_fts MATCH ?",
+                                    (build_match_query(query, fields),)).fetchone()[0],
+            "median_ms": statistics.median(timings),
+            "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        }
+    conn.close()
+    return {"rows": rows, "build_seconds": build_s, "queries": latencies}
+
+
+if __name__ == "__main__":
+    import sys
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    stats = benchmark_search(count)
+    print(f"Rows: {stats['rows']} | build: {stats['build_seconds']:.1f} s")
+    for query, q in stats["queries"].items():
+        print(f"  {query!r:26} {q['matches']:>7} matches | median {q['median_ms']:.2f} ms | p95 {q['p95_ms']:.2f} ms")
@@ -0,0 +1,435 @@
+"""
+Load test for Resume Critiquer application.
+Drives concurrent simulated recruiter sessions through app.py with
+Streamlit's AppTest, the offline mock provider and a generated PDF corpus,
+then reports throughput, time per resume, CPU and memory per session and
+SQLite write waits. Runs locally with no network. Results are saved as
+JSON so runs from different releases can be compared.
+
+Usage:
+    python -m src.loadtest --sessions 8 --resumes 5 --label v0.1.0 --out load_v0.1.0.json
+    python -m src.loadtest --sessions 8 --resumes 5 --baseline load_v0.1.0.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from typing import List, Optional
+from unittest import mock
+
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.util import patch_config_options
+
+from src import config, database, analysis, persistence
+
+try:
+    import resource  # Unix only; memory is reported as None elsewhere
+except ImportError:
+    resource = None
+
+RESULTS_SCHEMA = 1
+APP_FILE = Path(__file__).with_name("app.py")
+SLOW_WRITE_SECONDS = 0.05  # SQLite writes slower than this were almost always waiting on a lock
+_UPLOAD_KEY = "_loadtest_upload"
+_WRITE_VERBS = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER", "BEGIN")
+
+# Resume corpus vocabulary
+_TITLES = ["Backend Engineer", "Data Scientist", "Product Manager", "DevOps Engineer", "Frontend Developer", "ML Engineer"]
+_COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Stark Industries", "Wayne Enterprises"]
+_VERBS = ["Built", "Led", "Designed", "Migrated", "Automated", "Scaled", "Launched", "Optimized"]
+_THINGS = ["payment services", "data pipelines", "a recommendation engine", "CI/CD pipelines",
+           "the customer dashboard", "an internal analytics platform", "search infrastructure"]
+_SKILLS = ["Python", "Java", "Go", "React", "Kubernetes", "Docker", "AWS", "PostgreSQL", "Kafka", "Spark", "Terraform"]
+_METRICS = ["latency", "costs", "churn", "build times", "error rates", "onboarding time"]
+
+
+def generate_resume(seed: int, pages: int = 2) -> bytes:
+    """Resume-like PDF whose text is unique per seed (so uploads miss the chunk cache, like real ones)."""
+    rng = random.Random(seed)
+    year = rng.randint(2010, 2020)
+    lines = [f"{rng.choice(_TITLES)}, {rng.choice(_COMPANIES)} {year}-{year + rng.randint(1, 5)}"]
+    for _ in range(39):
+        lines.append(f"{rng.choice(_VERBS)} {rng.choice(_THINGS)} with {rng.choice(_SKILLS)} and {rng.choice(_SKILLS)}, "
+                     f"cutting {rng.choice(_METRICS)} by {rng.randint(5, 60)}%")
+    return analysis._synthetic_pdf(pages, lines)
+
+
+class _Upload(BytesIO):
+    """Stand-in for Streamlit's UploadedFile (which is also a BytesIO)."""
+
+    def __init__(self, name: str, data: bytes):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+        self.type = "application/pdf"
+
+
+def _fake_file_uploader(label, *args, **kwargs):
+    # Each session's driver puts its next upload in its own session state
+    if not kwargs.get("accept_multiple_files"):
+        return None
+    return st.session_state.get(_UPLOAD_KEY) or []
+
+
+# AppTest is written for one app at a time: each run installs a mock Runtime
+# and sets the global.appTest option, and undoes both when it ends. With
+# concurrent sessions one session's cleanup would pull them out from under
+# another session's script, so the load test keeps the last runtime and
+# holds the option for its whole duration.
+_runtime = {}
+
+
+def _runtime_instance(cls):
+    if cls._instance is not None:
+        _runtime["last"] = cls._instance
+    if "last" not in _runtime:
+        raise RuntimeError("Runtime hasn't been created!")
+    return _runtime["last"]
+
+
+def _runtime_exists(cls):
+    return cls._instance is not None or "last" in _runtime
+
+
+# ---------------------------
+# SQLite write timing
+# ---------------------------
+class _WriteTimer:
+    """Durations of every SQLite write statement and commit made during the run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: List[float] = []
+        self.lock_errors = 0
+
+    def measure(self, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e) or "busy" in str(e):
+                with self._lock:
+                    self.lock_errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.durations.append(elapsed)
+
+
+_timer = _WriteTimer()
+
+
+def _timed(method):
+    def wrapper(self, sql, *args, **kwargs):
+        if not sql.lstrip().upper().startswith(_WRITE_VERBS):
+            return method(self, sql, *args, **kwargs)
+        return _timer.measure(method, self, sql, *args, **kwargs)
+    return wrapper
+
+
+class _TimedCursor(sqlite3.Cursor):
+    execute = _timed(sqlite3.Cursor.execute)
+    executemany = _timed(sqlite3.Cursor.executemany)
+
+
+class _TimedConnection(sqlite3.Connection):
+    execute = _timed(sqlite3.Connection.execute)
+    executemany = _timed(sqlite3.Connection.executemany)
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or _TimedCursor)
+
+    def commit(self):
+        # Committing with nothing pending is free; counting it would dilute the percentiles
+        if not self.in_transaction:
+            return super().commit()
+        return _timer.measure(super().commit)
+
+
+def _timed_connection() -> sqlite3.Connection:
+    return sqlite3.connect(factory=_TimedConnection, **config.get_db_connection_params())
+
+
+# ---------------------------
+# Measurement helpers
+# ---------------------------
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    """Linear-interpolated percentile (pct in 0-100), or None without values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * pct / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def _distribution(values: List[float]) -> dict:
+    def rounded(value):
+        return None if value is None else round(value, 4)
+    return {
+        "count": len(values),
+        "mean": rounded(sum(values) / len(values) if values else None),
+        "p50": rounded(_percentile(values, 50)),
+        "p95": rounded(_percentile(values, 95)),
+        "p99": rounded(_percentile(values, 99)),
+        "max": rounded(max(values) if values else None)
+    }
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _project_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version("resume-critiquer")
+    except Exception:
+        return "unknown"
+
+
+# ---------------------------
+# Sessions
+# ---------------------------
+def _run_session(index: int, resumes: int, pages: int, timeout: float, start_barrier: threading.Barrier, out: dict):
+    """One simulated recruiter: open the app, pick the mock provider, then analyze `resumes` resumes one at a time."""
+    try:
+        at = AppTest.from_file(str(APP_FILE), default_timeout=timeout)
+        for step in range(2):
+            start = time.perf_counter()
+            if step == 0:
+                at.run()
+            else:
+                next(s for s in at.selectbox if s.label == "Select AI Provider").select(config.PROVIDER_MOCK).run()
+            out["rerun_seconds"].append(time.perf_counter() - start)
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+    except Exception as e:
+        out["errors"].append(f"session {index} setup: {e}")
+        at = None
+    finally:
+        # Every session starts analyzing at the same moment
+        try:
+            start_barrier.wait(timeout)
+        except threading.BrokenBarrierError:
+            pass
+    if at is None:
+        out["failed"] += resumes
+        return
+
+    for i in range(resumes):
+        name = f"session{index:03d}_resume{i:03d}.pdf"
+        at.session_state[_UPLOAD_KEY] = [_Upload(name, generate_resume(index * 100_000 + i, pages))]
+        start = time.perf_counter()
+        try:
+            next(b for b in at.button if b.label.startswith("🔍")).click().run()
+            elapsed = time.perf_counter() - start
+            errors = [e.message for e in at.exception] + [e.value for e in at.error]
+            records = at.session_state["results_records"] if "results_records" in at.session_state else []
+            if errors or len(records) != 1:
+                raise RuntimeError(errors[0] if errors else "no result recorded")
+            out["resume_seconds"].append(elapsed)
+        except Exception as e:
+            out["failed"] += 1
+            out["errors"].append(f"{name}: {e}")
+
+
+def run_load_test(sessions: int = 8, resumes: int = 5, pages: int = 2, mock_latency: float = 0.2,
+                  db_path: str = None, timeout: float = 300, label: str = None) -> dict:
+    """
+    Run concurrent sessions against app.py and collect the results.
+
+    Args:
+        sessions: Concurrent simulated sessions
+        resumes: Resumes each session analyzes, one per run
+        pages: Pages per generated resume
+        mock_latency: Simulated seconds per AI call (MOCK_LATENCY_SECONDS)
+        db_path: Database to use (default: a fresh temporary database, so runs are comparable)
+        timeout: Seconds allowed for any single app run
+        label: Free-form name for the run (e.g. release tag)
+
+    Returns:
+        JSON-serializable results (see RESULTS_SCHEMA)
+    """
+    # The app runs in this process, so configuring the shared config module configures every session
+    if config.PROVIDER_MOCK not in config.AVAILABLE_PROVIDERS:
+        config.AVAILABLE_PROVIDERS.append(config.PROVIDER_MOCK)
+    config.MOCK_LATENCY_SECONDS = mock_latency
+    config.DB_PATH = db_path or os.path.join(tempfile.mkdtemp(prefix="loadtest_"), "loadtest.db")
+
+    out = {"rerun_seconds": [], "resume_seconds": [], "failed": 0, "errors": []}
+    outs = [dict(out, rerun_seconds=[], resume_seconds=[], errors=[]) for _ in range(sessions)]
+    phase = {}
+    start_barrier = threading.Barrier(sessions, action=lambda: phase.update(start=time.perf_counter(), cpu=time.process_time()))
+
+    with mock.patch.object(database, "get_connection", _timed_connection), \
+            mock.patch("streamlit.file_uploader", _fake_file_uploader), \
+            mock.patch.object(Runtime, "instance", classmethod(_runtime_instance)), \
+            mock.patch.object(Runtime, "exists", classmethod(_runtime_exists)), \
+            patch_config_options({"global.appTest": True}):
+        # Warm-up run: imports and caches the app's modules, so they don't count as per-session memory
+        AppTest.from_file(str(APP_FILE), default_timeout=timeout).run()
+        rss_before = _peak_rss_mb()
+        threads = [threading.Thread(target=_run_session, args=(i, resumes, pages, timeout, start_barrier, outs[i]),
+                                    name=f"loadtest-session-{i}") for i in range(sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - phase.get("start", time.perf_counter())
+        cpu = time.process_time() - phase.get("cpu", time.process_time())
+        persistence.get_writer().flush(config.WRITE_FLUSH_TIMEOUT_SECONDS)
+        rss_after = _peak_rss_mb()
+
+    for session_out in outs:
+        out["rerun_seconds"] += session_out["rerun_seconds"]
+        out["resume_seconds"] += session_out["resume_seconds"]
+        out["failed"] += session_out["failed"]
+        out["errors"] += session_out["errors"]
+
+    completed = len(out["resume_seconds"])
+    writes = _timer.durations
+    return {
+        "schema": RESULTS_SCHEMA,
+        "label": label,
+        "version": _project_version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "params": {
+            "sessions": sessions,
+            "resumes_per_session": resumes,
+            "pages_per_resume": pages,
+            "mock_latency_seconds": mock_latency,
+            "chunk_size": config.DEFAULT_CHUNK_SIZE,
+            "chunk_overlap": config.DEFAULT_CHUNK_OVERLAP
+        },
+        "results": {
+            "resumes_completed": completed,
+            "resumes_failed": out["failed"],
+            "wall_seconds": round(wall, 3),
+            "throughput_per_minute": round(60 * completed / wall, 2) if wall > 0 else None,
+            "seconds_per_resume": _distribution(out["resume_seconds"]),
+            "seconds_per_rerun": _distribution(out["rerun_seconds"]),
+            "cpu_seconds_per_session": round(cpu / sessions, 3),
+            "peak_rss_mb": None if rss_after is None else round(rss_after, 1),
+            "rss_mb_per_session": None if rss_after is None else round((rss_after - rss_before) / sessions, 2),
+            "sqlite": {
+                "writes": len(writes),
+                "write_seconds": round(sum(writes), 3),
+                "write_p99_ms": None if not writes else round(_percentile(writes, 99) * 1000, 2),
+                "slow_writes": sum(1 for d in writes if d >= SLOW_WRITE_SECONDS),
+                "lock_errors": _timer.lock_errors
+            },
+            "writer": persistence.get_writer().stats()
+        },
+        "errors": out["errors"][:20]
+    }
+
+
+# ---------------------------
+# Reporting
+# ---------------------------
+# (metric path, True if higher is better)
+COMPARED_METRICS = [
+    ("throughput_per_minute", True),
+    ("seconds_per_resume.p50", False),
+    ("seconds_per_resume.p95", False),
+    ("seconds_per_resume.p99", False),
+    ("seconds_per_rerun.p95", False),
+    ("cpu_seconds_per_session", False),
+    ("rss_mb_per_session", False),
+    ("sqlite.write_p99_ms", False),
+    ("sqlite.slow_writes", False),
+    ("resumes_failed", False)
+]
+
+
+def _metric(results: dict, path: str):
+    value = results
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def format_report(result: dict) -> str:
+    r = result["results"]
+    p = result["params"]
+
+    def dist(d):
+        if not d["count"]:
+            return "n/a"
+        return f"p50 {d['p50']:.2f}s · p95 {d['p95']:.2f}s · p99 {d['p99']:.2f}s · max {d['max']:.2f}s"
+
+    memory = "n/a" if r["rss_mb_per_session"] is None else f"{r['rss_mb_per_session']:.1f} MB/session (peak RSS {r['peak_rss_mb']:.0f} MB)"
+    lines = [
+        f"Load test {result['label'] or ''} (version {result['version']}, {result['timestamp']})".replace("  ", " "),
+        f"{p['sessions']} sessions x {p['resumes_per_session']} resumes ({p['pages_per_resume']} pages, mock latency {p['mock_latency_seconds']}s)",
+        f"Completed:  {r['resumes_completed']} ok, {r['resumes_failed']} failed in {r['wall_seconds']:.1f}s "
+        f"-> {r['throughput_per_minute']} resumes/min",
+        f"Per resume: {dist(r['seconds_per_resume'])}",
+        f"Per rerun:  {dist(r['seconds_per_rerun'])}",
+        f"CPU:        {r['cpu_seconds_per_session']:.2f}s/session",
+        f"Memory:     {memory}",
+        f"SQLite:     {r['sqlite']['writes']} writes, {r['sqlite']['write_seconds']:.2f}s total, p99 {r['sqlite']['write_p99_ms']} ms, "
+        f"{r['sqlite']['slow_writes']} slower than {SLOW_WRITE_SECONDS * 1000:.0f} ms, {r['sqlite']['lock_errors']} lock errors, "
+        f"{r['writer']['retries']} writer retries"
+    ]
+    lines += [f"  error: {e}" for e in result["errors"][:5]]
+    return "\n".join(lines)
+
+
+def compare_results(result: dict, baseline: dict) -> str:
+    """Side-by-side table of the key metrics, with the change relative to the baseline."""
+    lines = [f"{'metric':<26}{'baseline':>12}{'current':>12}{'change':>12}"]
+    if baseline.get("params") != result.get("params"):
+        lines.insert(0, "Warning: the runs used different parameters; changes may not be comparable.")
+    for path, higher_is_better in COMPARED_METRICS:
+        before = _metric(baseline["results"], path)
+        after = _metric(result["results"], path)
+        change = ""
+        if isinstance(before, (int, float)) and isinstance(after, (int, float)) and before:
+            delta = (after - before) / before * 100
+            better = delta > 0 if higher_is_better else delta < 0
+            change = f"{delta:+.1f}%{' ✓' if better else ' ✗' if delta else ''}"
+        lines.append(f"{path:<26}{str(before):>12}{str(after):>12}{change:>12}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the Streamlit app (offline, mock provider).")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent sessions")
+    parser.add_argument("--resumes", type=int, default=5, help="Resumes analyzed per session")
+    parser.add_argument("--pages", type=int, default=2, help="Pages per generated resume")
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated seconds per AI call")
+    parser.add_argument("--db", help="Database path (default: fresh temporary database)")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds allowed for one app run")
+    parser.add_argument("--label", help="Name for this run, e.g. a release tag")
+    parser.add_argument("--out", help="Write the JSON results here")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    result = run_load_test(args.sessions, args.resumes, args.pages, args.latency, args.db, args.timeout, args.label)
+    print(format_report(result))
+    if args.out:
+        Path(args.out).write_text(json.dumps(result, indent=2), encoding="utf-8")
+        print(f"Results written to {args.out}")
+    if args.baseline:
+        print()
+        print(compare_results(result, json.loads(Path(args.baseline).read_text(encoding="utf-8"))))
@@ -0,0 +1,323 @@
+"""
+Write-behind persistence for Resume Critiquer application.
+Analysis records (and chunk cache entries) are handed to a queue and written
+by a dedicated writer thread in batched transactions, so the Streamlit script
+thread (and the API event loop) never wait on SQLite locks. Writes that hit a locked database are
+retried with backoff; records that still can't be stored are spilled to a
+JSONL file instead of being lost. Pending writes are flushed on shutdown.
+
+Storage goes through the AnalysisStore interface, so a server-backed store
+can replace SQLite without touching the callers.
+"""
+import atexit
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from src import config, database, retrieval, chunk_cache
+
+logger = logging.getLogger(__name__)
+
+
+class StoreBusyError(Exception):
+    """The store is temporarily unavailable (e.g. database locked); the batch should be retried."""
+
+
+@dataclass
+class PendingWrite:
+    """
+    One queued analysis record, plus the resume text to index with it (optional).
+    With analysis_id, the record's detailed feedback updates that stored analysis instead.
+    With cache_key, the record is a chunk cache entry (see WriteBehindQueue.submit_chunk_result).
+    """
+    record: dict
+    index_text: Optional[str] = None
+    analysis_id: Optional[int] = None
+    cache_key: Optional[str] = None
+    future: Future = field(default_factory=Future)
+
+
+class AnalysisStore(ABC):
+    """Destination for analysis records."""
+
+    @abstractmethod
+    def write_batch(self, items: List[PendingWrite]) -> List[int]:
+        """
+        Persist every item atomically.
+
+        Returns:
+            Analysis ids, in item order (None for chunk cache entries)
+
+        Raises:
+            StoreBusyError: If the store is temporarily locked (nothing was written)
+        """
+
+    def close(self):
+        pass
+
+
+class SQLiteAnalysisStore(AnalysisStore):
+    """Writes records (and resume index entries) to the configured SQLite database."""
+
+    def __init__(self):
+        self.conn = database.get_connection()
+        database.init_db(self.conn)
+
+    def write_batch(self, items: List[PendingWrite]) -> List[int]:
+        try:
+            ids = []
+            for item in items:
+                if item.cache_key is not None:
+                    chunk_cache.store_result(self.conn, item.cache_key, item.record["provider"], item.record["model"],
+                                             item.record["result"], commit=False)
+                    ids.append(None)
+                    continue
+                if item.analysis_id is not None:
+                    database.update_analysis_detail(self.conn, item.analysis_id, item.record, commit=False)
+                    ids.append(item.analysis_id)
+                    continue
+                ids.append(database.insert_analysis(self.conn, item.record, commit=False))
+                if item.index_text:
+                    retrieval.index_resume(self.conn, item.record["filename"], item.index_text, commit=False)
+            self.conn.commit()
+            return ids
+        except sqlite3.OperationalError as e:
+            self.conn.rollback()
+            if "locked" in str(e) or "busy" in str(e):
+                raise StoreBusyError(str(e)) from e
+            raise
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def close(self):
+        self.conn.close()
+
+
+class InMemoryAnalysisStore(AnalysisStore):
+    """Local stand-in for a server-backed store: keeps records in a list."""
+
+    def __init__(self):
+        self.records: List[dict] = []
+        self.indexed: List[str] = []
+        self.chunk_results: Dict[str, dict] = {}
+
+    def write_batch(self, items: List[PendingWrite]) -> List[int]:
+        ids = []
+        for item in items:
+            if item.cache_key is not None:
+                self.chunk_results[item.cache_key] = item.record["result"]
+                ids.append(None)
+                continue
+            if item.analysis_id is not None:
+                self.records[item.analysis_id - 1] = item.record
+                ids.append(item.analysis_id)
+                continue
+            self.records.append(item.record)
+            ids.append(len(self.records))
+            if item.index_text:
+                self.indexed.append(item.record["filename"])
+        return ids
+
+
+_STOP = object()
+
+
+def _settle(future: Future, result=None, error: Optional[BaseException] = None):
+    """Resolve a write's future, unless its caller has cancelled it (e.g. a cancelled API job)."""
+    if not future.set_running_or_notify_cancel():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class WriteBehindQueue:
+    """
+    Queue plus writer thread in front of an AnalysisStore.
+
+    Args:
+        store_factory: Creates the store; called on the writer thread, which owns it.
+            If it fails, the batch at hand fails with its error and the next batch tries again
+        batch_size: Most records written in one transaction
+        batch_wait: Seconds the writer waits for more records before writing a partial batch
+    """
+
+    def __init__(self, store_factory: Callable[[], AnalysisStore],
+                 batch_size: int = None, batch_wait: float = None):
+        self._store_factory = store_factory
+        self._batch_size = batch_size or config.WRITE_BATCH_SIZE
+        self._batch_wait = config.WRITE_BATCH_WAIT_SECONDS if batch_wait is None else batch_wait
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._store: Optional[AnalysisStore] = None
+        self._closed = False
+        self._submitted = 0
+        self._done = 0
+        self._pending: Dict[int, PendingWrite] = {}  # Queued or being written, by id()
+        self._stats = {"written": 0, "batches": 0, "retries": 0, "failed": 0, "cached_chunks": 0}
+
+    def submit(self, record: dict, index_text: Optional[str] = None, analysis_id: Optional[int] = None) -> Future:
+        """
+        Queue a record for writing; never blocks on the database.
+        Pass analysis_id to store generated detailed feedback on an existing analysis.
+
+        Returns:
+            Future resolving to the analysis id once the record is stored.
+            Cancelling it only stops the wait; the record is still written.
+        """
+        return self._enqueue(PendingWrite(record, index_text, analysis_id))
+
+    def submit_chunk_result(self, cache_key: str, provider_name: str, model_name: str, result: dict) -> Future:
+        """
+        Queue a parsed chunk result for the chunk cache (see chunk_cache.store_result).
+        An entry that can't be stored is dropped rather than spilled; the chunk
+        is simply sent to the model again next time.
+        """
+        return self._enqueue(PendingWrite({"provider": provider_name, "model": model_name, "result": result}, cache_key=cache_key))
+
+    def _enqueue(self, item: PendingWrite) -> Future:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Writer is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="analysis-writer")
+                self._thread.start()
+            self._submitted += 1
+            self._pending[id(item)] = item
+        self._queue.put(item)
+        return item.future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every record submitted so far has been written (or spilled). Returns False on timeout."""
+        with self._lock:
+            target = self._submitted
+            return self._lock.wait_for(lambda: self._done >= target, timeout)
+
+    def wait_for_pending(self, match: Callable[[PendingWrite], bool], timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the queued writes `match` picks out have been written (or spilled).
+        Returns at once if none are queued, so a reader only waits for what it is
+        about to read. Returns False on timeout.
+        """
+        with self._lock:
+            waiting = [item for item in self._pending.values() if match(item)]
+            return self._lock.wait_for(lambda: not any(id(item) in self._pending for item in waiting), timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Flush pending records and stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return True
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            return True
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, pending=self._submitted - self._done)
+
+    def _run(self):
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                fill_until = time.monotonic() + self._batch_wait
+                while len(batch) < self._batch_size:
+                    try:
+                        item = self._queue.get(timeout=max(0.0, fill_until - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._write(batch)
+        finally:
+            if self._store is not None:
+                self._store.close()
+
+    def _write(self, batch: List[PendingWrite]):
+        error = None
+        for attempt in range(config.WRITE_MAX_RETRIES + 1):
+            try:
+                if self._store is None:
+                    self._store = self._store_factory()
+                ids = self._store.write_batch(batch)
+            except StoreBusyError as e:
+                error = e
+                with self._lock:
+                    self._stats["retries"] += 1
+                time.sleep(min(config.WRITE_RETRY_BACKOFF_SECONDS * 2 ** attempt, 5.0))
+            except Exception as e:
+                if len(batch) > 1 and self._store is not None:
+                    # Don't let one bad record take the rest of the batch down with it
+                    for item in batch:
+                        self._write([item])
+                    return
+                error = e
+                break
+            else:
+                for item, analysis_id in zip(batch, ids):
+                    _settle(item.future, result=analysis_id)
+                self._finish(batch, written=True)
+                return
+
+        records = [item for item in batch if item.cache_key is None]
+        if records:
+            logger.error(f"Could not store {len(records)} analysis record(s): {error}; spilling to {config.WRITE_SPILL_PATH}")
+            self._spill(records)
+        if len(records) < len(batch):
+            logger.warning(f"Could not cache {len(batch) - len(records)} chunk result(s): {error}")
+        for item in batch:
+            _settle(item.future, error=error)
+        self._finish(batch, written=False)
+
+    def _spill(self, batch: List[PendingWrite]):
+        try:
+            with open(config.WRITE_SPILL_PATH, "a", encoding="utf-8") as f:
+                for item in batch:
+                    f.write(json.dumps(item.record, default=str) + "\n")
+        except OSError as e:
+            logger.error(f"Could not spill analysis records: {e}")
+
+    def _finish(self, batch: List[PendingWrite], written: bool):
+        records = sum(1 for item in batch if item.cache_key is None)
+        with self._lock:
+            self._stats["written" if written else "failed"] += records
+            if written:
+                self._stats["cached_chunks"] += len(batch) - records
+            self._stats["batches"] += 1
+            self._done += len(batch)
+            for item in batch:
+                self._pending.pop(id(item), None)
+            self._lock.notify_all()
+
+
+_writer: Optional[WriteBehindQueue] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> WriteBehindQueue:
+    """Process-wide writer for the configured SQLite database, shared by all sessions."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindQueue(SQLiteAnalysisStore)
+            atexit.register(_writer.close, config.WRITE_FLUSH_TIMEOUT_SECONDS)
+        return _writer
@@ -0,0 +1,154 @@
+"""
+Run profiling for Resume Critiquer application.
+An opt-in sampling profiler for one analysis run. It samples the thread
+that starts it plus every thread started while it runs (analysis workers,
+AI calls), so work done off the Streamlit script thread is included.
+Profiles are saved in pstats format in EXPORTS_DIR, next to the exports.
+"""
+import itertools
+import marshal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from src import config
+
+# A thread whose innermost frame is in one of these is waiting on another thread
+_WAIT_FILES = ("/threading.py", "/queue.py", "/selectors.py", "/concurrent/futures/_base.py")
+
+
+def _is_waiting(func: tuple) -> bool:
+    return func[0].replace("\\", "/").endswith(_WAIT_FILES)
+
+
+def _label(func: tuple) -> str:
+    filename, line, name = func
+    return f"{name} ({Path(filename).name}:{line})"
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler.
+
+    Times are wall-clock, so threads blocked on the AI provider or on locks
+    show up too; that is usually what makes a batch slow.
+
+    Args:
+        interval: Seconds between samples (default PROFILE_SAMPLE_INTERVAL_SECONDS)
+    """
+
+    def __init__(self, interval: float = None):
+        self.interval = interval or config.PROFILE_SAMPLE_INTERVAL_SECONDS
+        self.samples = 0  # Stacks recorded (one per sampled thread per tick)
+        self.waiting = 0  # Of which the thread was blocked waiting on another thread
+        self.ticks = 0
+        self.elapsed = 0.0
+        self._self = Counter()  # function -> samples with it at the top of the stack
+        self._cum = Counter()  # function -> samples with it anywhere on the stack
+        self._edges = Counter()  # (caller, callee) -> samples
+        self._ignore = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def start(self) -> "SamplingProfiler":
+        # Threads already running belong to the server, not to this run
+        self._ignore = {t.ident for t in threading.enumerate()} - {threading.get_ident()}
+        self._thread = threading.Thread(target=self._sample_loop, daemon=True, name="run-profiler")
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.elapsed = time.perf_counter() - self._started
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.ticks += 1
+            for ident, frame in sys._current_frames().items():
+                if ident != own and ident not in self._ignore:
+                    self._record(frame)
+
+    def _record(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        self.samples += 1
+        self._self[stack[0]] += 1
+        if _is_waiting(stack[0]):
+            self.waiting += 1
+        # Recursive functions count once per sample
+        self._cum.update(set(stack))
+        self._edges.update(set(zip(stack[1:], stack[:-1])))
+
+    def _seconds_per_sample(self) -> float:
+        return self.elapsed / self.ticks if self.ticks else self.interval
+
+    def stats_dict(self) -> dict:
+        """
+        Samples in the pstats layout {function: (cc, nc, tottime, cumtime, callers)}.
+        Call counts are sample counts; a sampler can't count calls.
+        """
+        scale = self._seconds_per_sample()
+        callers = {}
+        for (caller, callee), n in self._edges.items():
+            callers.setdefault(callee, {})[caller] = (n, n, 0.0, n * scale)
+        return {func: (n, n, self._self[func] * scale, n * scale, callers.get(func, {}))
+                for func, n in self._cum.items()}
+
+    def save(self, path: Path = None) -> Path:
+        """Write the profile (readable with `python -m pstats` or snakeviz). Defaults to a timestamped file in EXPORTS_DIR."""
+        if path is None:
+            config.EXPORTS_DIR.mkdir(exist_ok=True)
+            path = config.EXPORTS_DIR / f"profile_{datetime.now().strftime(config.EXPORT_TIMESTAMP_FORMAT)}.prof"
+        with open(path, "wb") as f:
+            marshal.dump(self.stats_dict(), f)
+        return path
+
+    def top_functions(self, limit: int = None) -> List[dict]:
+        """
+        Hottest functions by self time (time spent in the function itself, not its callees).
+        Threads parked waiting on other threads are left out; the saved profile keeps them.
+        """
+        limit = limit or config.PROFILE_TOP_FUNCTIONS
+        scale = self._seconds_per_sample()
+        total = self.samples or 1
+        busy = ((func, n) for func, n in self._self.most_common() if not _is_waiting(func))
+        return [
+            {
+                "Function": _label(func),
+                "Self (s)": round(n * scale, 3),
+                "Self %": round(100 * n / total, 1),
+                "Cumulative (s)": round(self._cum[func] * scale, 3)
+            }
+            for func, n in itertools.islice(busy, limit)
+        ]
+
+    def finish(self) -> dict:
+        """Stop, save the profile (unless nothing was sampled) and summarize it for display."""
+        self.stop()
+        path = self.save() if self.samples else None
+        return {
+            "path": str(path) if path else None,
+            "elapsed": self.elapsed,
+            "samples": self.samples,
+            "waiting_pct": 100 * self.waiting / self.samples if self.samples else 0.0,
+            "top": self.top_functions()
+        }
@@ -0,0 +1,353 @@
+"""
+Candidate reports for Resume Critiquer application.
+Writes a shareable PDF or HTML report for every analyzed resume. Score
+charts are rendered to PNG by kaleido in a process pool (each render takes
+hundreds of milliseconds) and cached in CHART_CACHE_DIR, keyed by a hash of
+the chart type and score vector, so resumes with the same scores share one
+image. A batch is written on a background thread (ReportJob) into one ZIP in
+EXPORTS_DIR, so the UI stays usable and cleanup manages it like any export.
+"""
+import atexit
+import base64
+import hashlib
+import html
+import io
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from src import config, charts
+
+logger = logging.getLogger(__name__)
+
+CHART_TITLE = "Skills Assessment"
+
+
+# ---------------------------
+# Chart images
+# ---------------------------
+def chart_cache_key(scores: dict, kind: str) -> str:
+    """Hash of the chart type and every category score, in category order."""
+    vector = [kind] + [scores.get(cat, 0) for cat in config.ANALYSIS_CATEGORIES]
+    return hashlib.sha256(json.dumps(vector).encode("utf-8")).hexdigest()[:32]
+
+
+def chart_cache_path(scores: dict, kind: str) -> Path:
+    return config.CHART_CACHE_DIR / f"{chart_cache_key(scores, kind)}.png"
+
+
+def _render_chart(scores: dict, kind: str, path: str) -> str:
+    """Pool task: render one chart to PNG. Written under a temp name so readers never see half a file."""
+    fig = charts.make_score_chart({cat: scores.get(cat, 0) for cat in config.ANALYSIS_CATEGORIES}, CHART_TITLE, kind)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fig.write_image(tmp_path, format="png", width=config.REPORT_CHART_WIDTH, height=config.REPORT_CHART_HEIGHT)
+    os.replace(tmp_path, path)
+    return path
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_inflight: Dict[str, Future] = {}
+
+
+def _wait_for_siblings(barrier):
+    """Pool initializer: no worker takes a task until every worker has started."""
+    barrier.wait()
+
+
+def start_render_pool() -> ProcessPoolExecutor:
+    """
+    Start the process-wide chart render pool, with all of its workers.
+
+    Call once at startup, before Streamlit runs app.py (run.py does this):
+    a spawned worker re-runs the parent's __main__, and during a script run
+    that is the app script. The pool never spawns workers after this.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the server process runs many threads
+            context = multiprocessing.get_context("spawn")
+            workers = max(1, config.REPORT_RENDER_WORKERS)
+            barrier = context.Barrier(workers, timeout=config.REPORT_RENDER_TIMEOUT_SECONDS)
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                       initializer=_wait_for_siblings, initargs=(barrier,))
+            # While no worker is idle each submit spawns one, and none is idle before all have started
+            for future in [pool.submit(os.getpid) for _ in range(workers)]:
+                future.result()
+            atexit.register(pool.shutdown, wait=False, cancel_futures=True)
+            _pool = pool
+        return _pool
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """The chart render pool shared by all sessions (see start_render_pool)."""
+    if _pool is None:
+        raise RuntimeError("Chart rendering is off: the render pool was not started (run the app with `python run.py`)")
+    return _pool
+
+
+def _forget(name: str, future: Future):
+    with _pool_lock:
+        if _inflight.get(name) is future:
+            del _inflight[name]
+
+
+def request_chart(scores: dict, kind: str) -> Future:
+    """
+    Future resolving to the path of a chart's cached PNG, rendered in the
+    pool on a miss. Requests for a chart already being rendered share that render.
+    """
+    path = chart_cache_path(scores, kind)
+    with _pool_lock:
+        future = _inflight.get(path.name)
+        if future is not None:
+            return future
+    if path.exists():
+        # Touched so cleanup removes the least recently used images first
+        os.utime(path)
+        future = Future()
+        future.set_result(str(path))
+        return future
+    config.CHART_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    pool = get_render_pool()
+    with _pool_lock:
+        future = _inflight.get(path.name)
+        if future is None:
+            future = pool.submit(_render_chart, dict(scores), kind, str(path))
+            _inflight[path.name] = future
+            future.add_done_callback(lambda f, name=path.name: _forget(name, f))
+    return future
+
+
+# ---------------------------
+# Report documents
+# ---------------------------
+def _meta_line(record: dict) -> str:
+    parts = [record.get("job_role") or "No target role",
+             f"{record.get('provider')} / {record.get('model')}",
+             (record.get("analysis_time") or "")[:10]]
+    if record.get("partial"):
+        parts.append(f"partial ({record.get('segments_analyzed', 0)} segment(s))")
+    return " · ".join(p for p in parts if p)
+
+
+def _detail_note(record: dict) -> Optional[str]:
+    if record.get("detail_pending"):
+        return "Scores are from a triage pass; detailed feedback had not been generated when this report was written."
+    return None
+
+
+def render_pdf(record: dict, chart_png: Optional[bytes] = None) -> bytes:
+    """One candidate's report as PDF bytes (reportlab)."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Image, ListFlowable, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    esc = html.escape
+
+    def para(text, style="BodyText"):
+        return Paragraph(esc(str(text)), styles[style])
+
+    def bullets(items):
+        return ListFlowable([para(item) for item in items], bulletType="bullet", leftIndent=12)
+
+    story = [para(record["filename"], "Title"), para(_meta_line(record), "Italic"), Spacer(1, 0.3 * cm),
+             para(f"Overall score: {record.get('overall_score', 0)}/10", "Heading2")]
+
+    scores = record.get("scores", {})
+    table = Table([["Category", "Score"]] + [[cat, scores.get(cat, 0)] for cat in config.ANALYSIS_CATEGORIES],
+                  colWidths=[11 * cm, 3 * cm])
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("ALIGN", (1, 0), (1, -1), "CENTER")
+    ]))
+    story += [table, Spacer(1, 0.4 * cm)]
+    if chart_png:
+        width = 16 * cm
+        story.append(Image(io.BytesIO(chart_png), width=width, height=width * config.REPORT_CHART_HEIGHT / config.REPORT_CHART_WIDTH))
+
+    keywords = record.get("keywords")
+    if keywords:
+        story += [para(f"ATS keywords ({keywords['role']}, {keywords['coverage'] * 100:.0f}% coverage)", "Heading3"),
+                  para(f"Present: {', '.join(keywords['present']) or 'none'}"),
+                  para(f"Missing: {', '.join(keywords['missing']) or 'none'}")]
+
+    if record.get("recommendations"):
+        story += [para("Recommendations", "Heading3"), para(record["recommendations"])]
+    if record.get("pros"):
+        story += [para("Pros", "Heading3"), bullets(record["pros"])]
+    if record.get("cons"):
+        story += [para("Cons", "Heading3"), bullets(record["cons"])]
+
+    story.append(para("Detailed feedback", "Heading3"))
+    note = _detail_note(record)
+    if note:
+        story.append(para(note, "Italic"))
+    else:
+        for cat, text in record.get("feedback", {}).items():
+            if text:
+                story.append(Paragraph(f"<b>{esc(cat)}</b>: {esc(text)}", styles["BodyText"]))
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4, title=f"Resume report - {record['filename']}",
+                      leftMargin=2 * cm, rightMargin=2 * cm, topMargin=2 * cm, bottomMargin=2 * cm).build(story)
+    return buffer.getvalue()
+
+
+def render_html(record: dict, chart_png: Optional[bytes] = None, kind: str = None) -> str:
+    """
+    One candidate's report as a standalone HTML page. Without a rendered
+    image the chart is embedded as an interactive Plotly chart (loaded from the CDN).
+    """
+    esc = html.escape
+    scores = record.get("scores", {})
+    rows = "".join(f"<tr><td>{esc(cat)}</td><td>{scores.get(cat, 0)}</td></tr>" for cat in config.ANALYSIS_CATEGORIES)
+    if chart_png:
+        chart = f'<img alt="{CHART_TITLE}" src="data:image/png;base64,{base64.b64encode(chart_png).decode("ascii")}">'
+    else:
+        chart = charts.make_score_chart({cat: scores.get(cat, 0) for cat in config.ANALYSIS_CATEGORIES}, CHART_TITLE,
+                                        kind or config.DEFAULT_CHART_TYPE).to_html(full_html=False, include_plotlyjs="cdn")
+
+    sections = []
+    keywords = record.get("keywords")
+    if keywords:
+        sections.append(f"<h3>ATS keywords ({esc(keywords['role'])}, {keywords['coverage'] * 100:.0f}% coverage)</h3>"
+                        f"<p><b>Present:</b> {esc(', '.join(keywords['present']) or 'none')}</p>"
+                        f"<p><b>Missing:</b> {esc(', '.join(keywords['missing']) or 'none')}</p>")
+    if record.get("recommendations"):
+        sections.append(f"<h3>Recommendations</h3><p>{esc(record['recommendations'])}</p>")
+    for title, items in (("Pros", record.get("pros")), ("Cons", record.get("cons"))):
+        if items:
+            sections.append(f"<h3>{title}</h3><ul>" + "".join(f"<li>{esc(item)}</li>" for item in items) + "</ul>")
+    note = _detail_note(record)
+    if note:
+        sections.append(f"<h3>Detailed feedback</h3><p><i>{esc(note)}</i></p>")
+    else:
+        sections.append("<h3>Detailed feedback</h3>" + "".join(
+            f"<p><b>{esc(cat)}</b>: {esc(text)}</p>" for cat, text in record.get("feedback", {}).items() if text))
+
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Resume report - {esc(record['filename'])}</title>
+<style>
+body {{ font-family: sans-serif; max-width: 860px; margin: 2em auto; color: #222; }}
+table {{ border-collapse: collapse; }} td, th {{ border: 1px solid #ccc; padding: 4px 10px; }}
+img {{ max-width: 100%; }} .muted {{ color: #666; }}
+</style></head>
+<body>
+<h1>{esc(record['filename'])}</h1>
+<p class="muted">{esc(_meta_line(record))}</p>
+<h2>Overall score: {record.get('overall_score', 0)}/10</h2>
+<table><tr><th>Category</th><th>Score</th></tr>{rows}</table>
+{chart}
+{''.join(sections)}
+</body></html>
+"""
+
+
+# ---------------------------
+# Background batches
+# ---------------------------
+class ReportJob:
+    """
+    Writes one report per record into a ZIP in EXPORTS_DIR on a background thread.
+
+    Charts for the whole batch are requested up front, so the pool renders
+    them in parallel while reports are written in order. If charts can't be
+    rendered (e.g. kaleido finds no Chrome), the reports are still written,
+    without images, and `chart_error` says why.
+
+    Args:
+        records: Analysis records (see analysis.build_record); copied, so later edits don't race the writer
+        fmt: "PDF" or "HTML"
+        kind: Chart type (one of CHART_TYPES)
+    """
+
+    def __init__(self, records: List[dict], fmt: str = "PDF", kind: str = None):
+        self.records = [dict(r) for r in records]
+        self.fmt = fmt
+        self.kind = kind or config.DEFAULT_CHART_TYPE
+        self.total = len(self.records)
+        self.done = 0
+        self.path: Optional[Path] = None
+        self.error: Optional[str] = None
+        self.chart_error: Optional[str] = None
+        self.elapsed = 0.0
+        self._charts: Dict[str, Optional[Future]] = {}
+        self._thread = threading.Thread(target=self._run, daemon=True, name="report-writer")
+
+    def start(self) -> "ReportJob":
+        self._thread.start()
+        return self
+
+    @property
+    def finished(self) -> bool:
+        return self._thread.ident is not None and not self._thread.is_alive()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        self._thread.join(timeout)
+        return self.finished
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            for record in self.records:
+                key = chart_cache_key(record.get("scores", {}), self.kind)
+                if key not in self._charts:
+                    self._charts[key] = self._request(record.get("scores", {}))
+
+            config.EXPORTS_DIR.mkdir(exist_ok=True)
+            path = config.EXPORTS_DIR / f"reports_{datetime.now().strftime(config.EXPORT_TIMESTAMP_FORMAT)}_{self.fmt.lower()}.zip"
+            # Not matched by the cleanup patterns until it is complete
+            tmp_path = path.with_name(path.name + ".part")
+            extension = "pdf" if self.fmt == "PDF" else "html"
+            with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                for i, record in enumerate(self.records):
+                    image = self._chart_image(self._charts[chart_cache_key(record.get("scores", {}), self.kind)])
+                    name = f"{i + 1:03d}_{Path(record['filename']).stem}.{extension}"
+                    if self.fmt == "PDF":
+                        archive.writestr(name, render_pdf(record, image))
+                    else:
+                        archive.writestr(name, render_html(record, image, self.kind))
+                    self.done += 1
+            os.replace(tmp_path, path)
+            self.path = path
+        except Exception as e:
+            logger.error(f"Report generation failed: {e}")
+            self.error = str(e)
+        finally:
+            self.elapsed = time.perf_counter() - started
+
+    def _request(self, scores: dict) -> Optional[Future]:
+        if self.chart_error:
+            return None
+        try:
+            return request_chart(scores, self.kind)
+        except Exception as e:
+            self.chart_error = str(e)
+            return None
+
+    def _chart_image(self, future: Optional[Future]) -> Optional[bytes]:
+        if future is None or self.chart_error:
+            return None
+        try:
+            return Path(future.result(timeout=config.REPORT_RENDER_TIMEOUT_SECONDS)).read_bytes()
+        except Exception as e:
+            # One failure usually means every render will fail; don't wait on the rest
+            logger.warning(f"Chart rendering failed, writing reports without charts: {e}")
+            self.chart_error = (str(e).strip().splitlines() or [type(e).__name__])[0]
+            for pending in self._charts.values():
+                if pending is not None:
+                    pending.cancel()
+            return None
@@ -0,0 +1,221 @@
+"""
+Typed model responses for Resume Critiquer application.
+Decodes the JSON a provider returns for one resume chunk into a compact
+ChunkAnalysis record with strict validation. Fields that are missing or
+invalid are reported by name, so the caller can re-ask the model for just
+those fields instead of re-running the whole critique.
+"""
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Tuple
+from src import config
+
+SCORE_MIN = 0
+SCORE_MAX = 10
+
+
+@dataclass(slots=True)
+class ChunkAnalysis:
+    """Validated critique of one resume chunk."""
+    scores: Dict[str, int] = field(default_factory=dict)
+    overall_score: Optional[int] = None
+    feedback: Dict[str, str] = field(default_factory=dict)
+    recommendations: str = ""
+    pros: List[str] = field(default_factory=list)
+    cons: List[str] = field(default_factory=list)
+
+    def missing_fields(self, triage: bool = False) -> List[str]:
+        """
+        Field paths still missing, e.g. 'scores.Tailoring' or 'overall_score'.
+        A triage answer only needs the scores.
+        """
+        missing = [f"scores.{cat}" for cat in config.ANALYSIS_CATEGORIES if cat not in self.scores]
+        if self.overall_score is None:
+            missing.append("overall_score")
+        if not triage:
+            missing.extend(f"feedback.{cat}" for cat in config.ANALYSIS_CATEGORIES if cat not in self.feedback)
+        return missing
+
+    @property
+    def is_complete(self) -> bool:
+        return not self.missing_fields()
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def chunk_json_schema(triage: bool = False) -> dict:
+    """
+    JSON schema of a complete chunk response, for providers that support
+    schema-constrained decoding (llama.cpp turns it into a grammar).
+    With triage, only scores and a few short pros/cons.
+    """
+    score = {"type": "integer", "minimum": SCORE_MIN, "maximum": SCORE_MAX}
+    categories = list(config.ANALYSIS_CATEGORIES)
+    if triage:
+        short_list = {"type": "array", "items": {"type": "string"}, "maxItems": config.TRIAGE_MAX_LIST_ITEMS}
+        return {
+            "type": "object",
+            "properties": {
+                "scores": {"type": "object", "properties": {cat: score for cat in categories},
+                           "required": categories, "additionalProperties": False},
+                "overall_score": score,
+                "pros": short_list,
+                "cons": short_list
+            },
+            "required": ["scores", "overall_score", "pros", "cons"],
+            "additionalProperties": False
+        }
+    return {
+        "type": "object",
+        "properties": {
+            "scores": {"type": "object", "properties": {cat: score for cat in categories},
+                       "required": categories, "additionalProperties": False},
+            "overall_score": score,
+            "feedback": {"type": "object", "properties": {cat: {"type": "string"} for cat in categories},
+                         "required": categories, "additionalProperties": False},
+            "recommendations": {"type": "string"},
+            "pros": {"type": "array", "items": {"type": "string"}},
+            "cons": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": ["scores", "overall_score", "feedback", "recommendations", "pros", "cons"],
+        "additionalProperties": False
+    }
+
+
+def reask_json_schema(missing: List[str]) -> dict:
+    """
+    JSON schema of a re-ask answer: only the fields in `missing`, the same
+    ones build_reask_prompt asks for.
+    """
+    score = {"type": "integer", "minimum": SCORE_MIN, "maximum": SCORE_MAX}
+    score_cats, feedback_cats = _split_missing(missing)
+    properties = {}
+    if score_cats:
+        properties["scores"] = {"type": "object", "properties": {cat: score for cat in score_cats},
+                                "required": score_cats, "additionalProperties": False}
+    if "overall_score" in missing:
+        properties["overall_score"] = score
+    if feedback_cats:
+        properties["feedback"] = {"type": "object", "properties": {cat: {"type": "string"} for cat in feedback_cats},
+                                  "required": feedback_cats, "additionalProperties": False}
+    return {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+
+
+def _split_missing(missing: List[str]) -> Tuple[List[str], List[str]]:
+    """Categories missing a score and categories missing feedback."""
+    score_cats = [path.split(".", 1)[1] for path in missing if path.startswith("scores.")]
+    feedback_cats = [path.split(".", 1)[1] for path in missing if path.startswith("feedback.")]
+    return score_cats, feedback_cats
+
+
+def _coerce_score(value) -> Optional[int]:
+    """Return the value as an int in range, or None if it isn't a usable score."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        # Models occasionally answer "7" or "7/10"
+        value = value.strip().split("/")[0].strip()
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+    if not isinstance(value, (int, float)) or value != value:
+        return None
+    if not SCORE_MIN <= value <= SCORE_MAX:
+        return None
+    return int(round(value))
+
+
+def _coerce_text(value) -> Optional[str]:
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    return None
+
+
+def _coerce_text_list(value) -> List[str]:
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [item.strip() for item in value if isinstance(item, str) and item.strip()]
+
+
+def decode_fields(data: dict, into: Optional[ChunkAnalysis] = None) -> ChunkAnalysis:
+    """
+    Copy every valid field of a parsed response into a ChunkAnalysis.
+
+    Invalid values are dropped rather than guessed, so they show up in
+    missing_fields(). With `into`, fields already set there are kept and
+    only missing ones are filled, which is how re-ask answers are merged.
+    """
+    result = into if into is not None else ChunkAnalysis()
+    if not isinstance(data, dict):
+        return result
+
+    scores = data.get("scores")
+    if isinstance(scores, dict):
+        for cat in config.ANALYSIS_CATEGORIES:
+            if cat not in result.scores:
+                score = _coerce_score(scores.get(cat))
+                if score is not None:
+                    result.scores[cat] = score
+
+    if result.overall_score is None:
+        result.overall_score = _coerce_score(data.get("overall_score"))
+
+    feedback = data.get("feedback")
+    if isinstance(feedback, dict):
+        for cat in config.ANALYSIS_CATEGORIES:
+            if cat not in result.feedback:
+                text = _coerce_text(feedback.get(cat))
+                if text is not None:
+                    result.feedback[cat] = text
+
+    if not result.recommendations:
+        result.recommendations = _coerce_text(data.get("recommendations")) or ""
+    if not result.pros:
+        result.pros = _coerce_text_list(data.get("pros"))
+    if not result.cons:
+        result.cons = _coerce_text_list(data.get("cons"))
+    return result
+
+
+def decode_chunk_analysis(data, triage: bool = False) -> Tuple[ChunkAnalysis, List[str]]:
+    """
+    Decode a parsed model response (a triage answer when `triage` is set).
+
+    Returns:
+        Tuple of (ChunkAnalysis with every valid field, list of missing field paths)
+
+    Raises:
+        ValueError: If the response is not an object or is the model's error answer
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Model response is not a JSON object.")
+    if "error" in data and "scores" not in data:
+        raise ValueError(str(data.get("error") or "Model reported an error."))
+    result = decode_fields(data)
+    return result, result.missing_fields(triage)
+
+
+def build_reask_prompt(resume_chunk: str, missing: List[str], job_role: Optional[str] = None) -> str:
+    """
+    Short follow-up prompt asking only for the fields that were missing or invalid.
+    """
+    score_cats, feedback_cats = _split_missing(missing)
+    structure = []
+    if score_cats:
+        structure.append('"scores": {' + ", ".join(f'"{cat}": <int 0-10>' for cat in score_cats) + "}")
+    if "overall_score" in missing:
+        structure.append('"overall_score": <int 0-10>')
+    if feedback_cats:
+        structure.append('"feedback": {' + ", ".join(f'"{cat}": "<text>"' for cat in feedback_cats) + "}")
+    role_snip = f"Target role: {job_role}\n" if job_role else ""
+    return f"""
+    Your previous review of this resume chunk was missing some fields or had invalid values.
+    Return ONLY a JSON object with exactly these fields (scores are integers from 0 to 10):
+    {{{", ".join(structure)}}}
+
+    {role_snip}Resume chunk:
+    {resume_chunk}
+    """
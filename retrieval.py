@@ -0,0 +1,193 @@
+"""
+Job-description retrieval for Resume Critiquer application.
+Maintains a BM25 inverted index over extracted resume text in SQLite so a
+pasted job description can rank the whole resume pool locally, before any
+LLM calls are made.
+"""
+import hashlib
+import math
+import re
+import sqlite3
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from src import config
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being but by can could did do does
+doing for from had has have having he her his how i if in into is it its just may me more most
+my no not of on once only or other our out over own same she should so some such than that the
+their them then there these they this those through to too under until up very was we were what
+when where which while who whom why will with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lower-case index terms.
+
+    Keeps tech tokens such as "c++", "c#" and "node.js" intact and drops
+    common English stopwords.
+
+    Args:
+        text: Resume or job description text
+
+    Returns:
+        List of terms in document order
+    """
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of extracted text, used to avoid indexing the same resume twice."""
+    return hashlib.sha256((text or "").encode("utf-8", errors="ignore")).hexdigest()
+
+
+def ensure_index_schema(conn: sqlite3.Connection):
+    """Create the index tables if they don't exist."""
+    conn.executescript("""
+    CREATE TABLE IF NOT EXISTS resume_docs (
+        id INTEGER PRIMARY KEY,
+        filename TEXT,
+        content_hash TEXT UNIQUE,
+        text TEXT,
+        length INTEGER,
+        indexed_time TEXT
+    );
+    CREATE TABLE IF NOT EXISTS resume_postings (
+        term TEXT,
+        doc_id INTEGER,
+        tf INTEGER,
+        PRIMARY KEY (term, doc_id)
+    ) WITHOUT ROWID;
+    """)
+    conn.commit()
+
+
+def index_resume(conn: sqlite3.Connection, filename: str, text: str, commit: bool = True) -> Tuple[int, bool]:
+    """
+    Add a resume to the index (incremental; existing documents are untouched).
+
+    Args:
+        conn: SQLite connection with the index schema
+        filename: Sanitized filename
+        text: Extracted resume text
+        commit: Commit immediately (False when the caller batches writes in one transaction)
+
+    Returns:
+        Tuple of (doc_id, newly_indexed). Re-indexing identical text returns
+        the existing doc_id with newly_indexed=False.
+    """
+    digest = content_hash(text)
+    row = conn.execute("SELECT id FROM resume_docs WHERE content_hash = ?", (digest,)).fetchone()
+    if row:
+        return row[0], False
+
+    terms = tokenize(text)
+    cur = conn.execute(
+        "INSERT INTO resume_docs (filename, content_hash, text, length, indexed_time) VALUES (?, ?, ?, ?, ?)",
+        (filename, digest, text, len(terms), datetime.now(timezone.utc).isoformat())
+    )
+    doc_id = cur.lastrowid
+    conn.executemany(
+        "INSERT INTO resume_postings (term, doc_id, tf) VALUES (?, ?, ?)",
+        [(term, doc_id, tf) for term, tf in Counter(terms).items()]
+    )
+    if commit:
+        conn.commit()
+    return doc_id, True
+
+
+def get_indexed_text(conn: sqlite3.Connection, doc_id: int) -> Optional[str]:
+    """Return the stored text of an indexed resume."""
+    row = conn.execute("SELECT text FROM resume_docs WHERE id = ?", (doc_id,)).fetchone()
+    return row[0] if row else None
+
+
+def get_index_size(conn: sqlite3.Connection) -> int:
+    """Number of resumes in the index."""
+    return conn.execute("SELECT COUNT(*) FROM resume_docs").fetchone()[0]
+
+
+def rank_resumes(conn: sqlite3.Connection, query_text: str, top_k: Optional[int] = None,
+                 doc_ids: Optional[List[int]] = None) -> List[dict]:
+    """
+    Rank indexed resumes against a job description with Okapi BM25.
+
+    Args:
+        conn: SQLite connection with the index schema
+        query_text: Job description text
+        top_k: Only return the best top_k resumes (default: all matches)
+        doc_ids: Restrict ranking to these documents (default: whole pool)
+
+    Returns:
+        List of dicts (doc_id, filename, bm25, score) sorted best first, where
+        score is bm25 normalized to 0-10 relative to the best match
+    """
+    query_tf = Counter(tokenize(query_text))
+    if not query_tf:
+        return []
+
+    doc_count, total_length = conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM resume_docs").fetchone()
+    if doc_count == 0:
+        return []
+    avgdl = total_length / doc_count or 1.0
+
+    terms = list(query_tf)
+    placeholders = ",".join("?" * len(terms))
+    doc_freq = dict(conn.execute(
+        f"SELECT term, COUNT(*) FROM resume_postings WHERE term IN ({placeholders}) GROUP BY term", terms
+    ).fetchall())
+
+    k1, b = config.BM25_K1, config.BM25_B
+    idf = {t: math.log(1 + (doc_count - df + 0.5) / (df + 0.5)) for t, df in doc_freq.items()}
+
+    sql = (f"SELECT p.doc_id, p.term, p.tf, d.length, d.filename FROM resume_postings p "
+           f"JOIN resume_docs d ON d.id = p.doc_id WHERE p.term IN ({placeholders})")
+    params = list(terms)
+    if doc_ids is not None:
+        if not doc_ids:
+            return []
+        sql += f" AND p.doc_id IN ({','.join('?' * len(doc_ids))})"
+        params.extend(doc_ids)
+
+    scores: Dict[int, float] = {}
+    filenames: Dict[int, str] = {}
+    for doc_id, term, tf, length, filename in conn.execute(sql, params):
+        norm = tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avgdl))
+        scores[doc_id] = scores.get(doc_id, 0.0) + idf[term] * norm * query_tf[term]
+        filenames[doc_id] = filename
+
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    if top_k is not None:
+        ranked = ranked[:top_k]
+    best = ranked[0][1] if ranked else 0.0
+
+    return [
+        {
+            "doc_id": doc_id,
+            "filename": filenames[doc_id],
+            "bm25": bm25,
+            "score": round(10 * bm25 / best, 2) if best > 0 else 0.0
+        }
+        for doc_id, bm25 in ranked
+    ]
+
+
+def blend_scores(llm_score: float, retrieval_score: float, llm_weight: Optional[float] = None) -> float:
+    """
+    Combine the LLM overall score with the retrieval score (both 0-10).
+
+    Args:
+        llm_score: Overall score from the critique pipeline
+        retrieval_score: Normalized BM25 score from rank_resumes
+        llm_weight: Weight of the LLM score (default from config)
+
+    Returns:
+        Blended score, 0-10
+    """
+    if llm_weight is None:
+        llm_weight = config.JD_LLM_WEIGHT
+    return round(llm_weight * llm_score + (1 - llm_weight) * retrieval_score, 2)
@@ -9,6 +9,12 @@ import subprocess
 import sys
 from pathlib import Path
 
+# Starts the chart render pool before Streamlit runs app.py as __main__ (see reports.start_render_pool)
+LAUNCHER = (
+    "from src import reports; reports.start_render_pool(); "
+    "from streamlit.web.cli import main; main(prog_name='streamlit')"
+)
+
 if __name__ == "__main__":
     # Get the src directory
     src_dir = Path(__file__).parent / "src"
@@ -23,6 +29,6 @@ if __name__ == "__main__":
 
     # Run Streamlit with the app.py file
     subprocess.run([
-        sys.executable, "-m", "streamlit", "run",
+        sys.executable, "-c", LAUNCHER, "run",
         str(app_file)
     ])
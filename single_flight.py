@@ -0,0 +1,166 @@
+"""
+In-flight request coalescing for Resume Critiquer application.
+When several sessions send the identical prompt to the same model at the
+same time, only the first (the leader) calls the provider; the others wait
+for and share its parsed result.
+"""
+import asyncio
+import copy
+import hashlib
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+
+def make_key(provider_name: str, model_name: str, temperature: float, prompt: str, system_instruction: str = None) -> str:
+    """Hash everything that determines a model response."""
+    parts = [provider_name, model_name, repr(temperature), system_instruction or "", prompt]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8", errors="ignore")).hexdigest()
+
+
+class _FlightStats:
+    """Counters shared by the sync and async coalescers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def record(self, coalesced: bool):
+        with self._lock:
+            if coalesced:
+                self.coalesced += 1
+            else:
+                self.calls += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            requests = self.calls + self.coalesced
+            return {
+                "requests": requests,
+                "provider_calls": self.calls,
+                "coalesced": self.coalesced,
+                "coalescing_rate": self.coalesced / requests if requests else 0.0
+            }
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "cancelled")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.cancelled = False
+
+
+class SingleFlight:
+    """
+    Thread-based coalescer (Streamlit sessions run as threads of one process).
+
+    Errors raised by the leader's call are re-raised in every waiter. If the
+    leader is interrupted instead (Streamlit stopping its script raises a
+    BaseException such as StopException), waiters are not failed: one of
+    them retries as the new leader.
+    """
+
+    def __init__(self, stats: _FlightStats):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._stats = stats
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = _Call()
+                    self._calls[key] = call
+
+            if leader:
+                self._stats.record(coalesced=False)
+                try:
+                    call.result = fn()
+                except Exception as e:
+                    call.error = e
+                except BaseException:
+                    call.cancelled = True
+                    raise
+                finally:
+                    with self._lock:
+                        self._calls.pop(key, None)
+                    call.done.set()
+                if call.error is not None:
+                    raise call.error
+                return call.result
+
+            call.done.wait()
+            if call.cancelled:
+                continue
+            self._stats.record(coalesced=True)
+            if call.error is not None:
+                raise call.error
+            # Waiters get their own copy so one session can't mutate another's result
+            return copy.deepcopy(call.result)
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    Event-loop coalescer. The shared call runs as its own task and every
+    caller awaits it through asyncio.shield, so cancelling one caller never
+    cancels the call the others are waiting on. Callers are counted: when
+    the last one is cancelled (or times out), nobody needs the result any
+    more, so the call itself is cancelled and frees its provider slot.
+    """
+
+    def __init__(self, stats: _FlightStats):
+        self._flights: Dict[str, _Flight] = {}
+        self._stats = stats
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def _finished(self, key: str, flight: _Flight):
+        self._forget(key, flight)
+        # Every caller may have stopped waiting (timed out); mark the error as seen
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        coalesced = flight is not None and not flight.task.done()
+        if not coalesced:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda t: self._finished(key, flight))
+        self._stats.record(coalesced=coalesced)
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Callers arriving from now on start a fresh call rather than join one being cancelled
+                self._forget(key, flight)
+                flight.task.cancel()
+        return copy.deepcopy(result) if coalesced else result
+
+
+# Process-wide instances
+stats = _FlightStats()
+shared = SingleFlight(stats)
+shared_async = AsyncSingleFlight(stats)
+
+
+def get_stats() -> dict:
+    """Coalescing counters for this process (requests, provider calls, coalesced, rate)."""
+    return stats.snapshot()
@@ -0,0 +1,13 @@
+"""
+Shared test setup. config reads the environment when it is first imported,
+so the test database and the Mock provider are configured here, before any
+test module imports `src`.
+"""
+import os
+import tempfile
+
+_TEST_DATA_DIR = tempfile.mkdtemp(prefix="resume-critiquer-tests-")
+os.environ["DB_PATH"] = os.path.join(_TEST_DATA_DIR, "resume_analysis.db")
+os.environ["ENABLE_MOCK_PROVIDER"] = "true"
+os.environ["API_DEFAULT_PROVIDER"] = "Mock"
+os.environ["MOCK_LATENCY_SECONDS"] = "0"
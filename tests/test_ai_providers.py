@@ -0,0 +1,249 @@
+"""Tests for the AI providers (src/ai_providers.py); LocalProvider runs against a stub OpenAI-compatible server."""
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src import ai_providers, analysis, config, response_schema
+
+
+class StubServer:
+    """
+    llama.cpp-like server: GET /props reports `slots` (unless None) and
+    POST /v1/chat/completions answers with a chunk analysis after `latency`
+    (the queued `answers` first, if any).
+    Records each request body, the connections completions arrived on and
+    the most requests handled at once.
+    """
+
+    def __init__(self, slots=None, latency=0.05, props_delay=0.0, answers=None):
+        self.slots = slots
+        self.latency = latency
+        self.props_delay = props_delay
+        self.answers = list(answers or [])
+        self.requests = []
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}/v1"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                time.sleep(stub.props_delay)
+                if self.path == "/props" and stub.slots is not None:
+                    self._send(200, {"total_slots": stub.slots})
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.requests.append(request)
+                    stub.connections.add(self.client_address)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                time.sleep(stub.latency)
+                with stub.lock:
+                    stub.in_flight -= 1
+                    content = json.dumps(stub.answers.pop(0) if stub.answers else full_answer())
+                self._send(200, {
+                    "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": request["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+                })
+
+        return Handler
+
+
+def full_answer():
+    return {
+        "scores": {category: 6 for category in config.ANALYSIS_CATEGORIES},
+        "overall_score": 6,
+        "feedback": {category: "Solid." for category in config.ANALYSIS_CATEGORIES},
+        "recommendations": "Quantify achievements.",
+        "pros": ["Clear"],
+        "cons": ["Vague"]
+    }
+
+
+@pytest.fixture(autouse=True)
+def fresh_servers(monkeypatch):
+    """Each test talks to its own stub, discovering slots unless it sets LOCAL_SERVER_SLOTS."""
+    monkeypatch.setattr(config, "LOCAL_SERVER_SLOTS", 0)
+    monkeypatch.setattr(ai_providers, "_local_servers", {})
+    stubs = []
+    yield stubs
+    for stub in stubs:
+        stub.close()
+
+
+@pytest.fixture
+def make_stub(fresh_servers):
+    def make(**kwargs):
+        stub = StubServer(**kwargs)
+        fresh_servers.append(stub)
+        return stub
+    return make
+
+
+def provider_for(stub):
+    return ai_providers.LocalProvider("", "local-model", base_url=stub.base_url)
+
+
+def test_slots_are_discovered_from_props(make_stub):
+    assert provider_for(make_stub(slots=3)).max_concurrency == 3
+
+
+def test_slots_default_without_props(make_stub):
+    assert provider_for(make_stub(slots=None)).max_concurrency == 4
+
+
+def test_configured_slots_skip_discovery(make_stub, monkeypatch):
+    monkeypatch.setattr(config, "LOCAL_SERVER_SLOTS", 2)
+    assert provider_for(make_stub(slots=6)).max_concurrency == 2
+
+
+def test_calls_reuse_keep_alive_connection(make_stub):
+    stub = make_stub(slots=2)
+    provider = provider_for(stub)
+    for _ in range(5):
+        assert json.loads(provider.generate_critique("Resume text"))["overall_score"] == 6
+    assert len(stub.requests) == 5
+    assert len(stub.connections) == 1
+    assert provider.token_usage["total_tokens"] == 75
+
+
+def test_providers_of_one_server_share_its_pool(make_stub):
+    stub = make_stub(slots=2)
+    first, second = provider_for(stub), provider_for(stub)
+    first.generate_critique("one")
+    second.generate_critique("two")
+    assert first._server() is second._server()
+    assert len(stub.connections) == 1
+
+
+def test_slot_gate_caps_concurrent_calls(make_stub):
+    stub = make_stub(slots=2, latency=0.1)
+    provider = provider_for(stub)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: provider.generate_critique(f"chunk {i}"), range(8)))
+    assert len(stub.requests) == 8
+    assert stub.max_in_flight == 2
+    assert len(stub.connections) <= 2
+    # Usage from every worker thread is counted
+    assert provider.token_usage == {"prompt_tokens": 80, "completion_tokens": 40, "total_tokens": 120}
+
+
+def test_token_usage_is_counted_across_threads():
+    provider = ai_providers.MockProvider("", "mock-model")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: provider.generate_critique(f"chunk {i % 10}"), range(400)))
+    single = ai_providers.MockProvider("", "mock-model")
+    for i in range(10):
+        single.generate_critique(f"chunk {i}")
+    assert provider.token_usage == {key: 40 * count for key, count in single.token_usage.items()}
+
+
+def test_async_calls_are_capped_by_slots(make_stub):
+    stub = make_stub(slots=2, latency=0.1)
+    provider = provider_for(stub)
+
+    async def scenario():
+        await asyncio.gather(*(provider.agenerate_critique(f"chunk {i}") for i in range(6)))
+
+    asyncio.run(scenario())
+    assert len(stub.requests) == 6
+    assert stub.max_in_flight == 2
+
+
+def test_slot_discovery_does_not_block_the_event_loop(make_stub):
+    stub = make_stub(slots=2, props_delay=0.5)
+    provider = provider_for(stub)
+    chunks = analysis.chunk_text("Built Python services.\n" * 400, size=1000, overlap=100)
+
+    async def scenario():
+        gaps = []
+
+        async def tick():
+            last = time.monotonic()
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.monotonic()
+                gaps.append(now - last)
+                last = now
+
+        ticker = asyncio.create_task(tick())
+        await asyncio.sleep(0.05)  # Let the ticker start before the analysis does
+        chunk_results, errors, _ = await analysis.analyze_chunks_async(provider, chunks)
+        ticker.cancel()
+        return chunk_results, errors, gaps
+
+    chunk_results, errors, gaps = asyncio.run(scenario())
+    assert not errors and len(chunk_results) == len(chunks)
+    assert max(gaps) < 0.3  # The 0.5s /props request never held the loop
+    assert stub.max_in_flight <= 2
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ("json_schema", {"type": "json_object"}),  # No schema given
+    ("json_object", {"type": "json_object"}),
+    ("none", None),
+])
+def test_response_format_payload(make_stub, monkeypatch, mode, expected):
+    monkeypatch.setattr(config, "LOCAL_CONSTRAINED_DECODING", mode)
+    stub = make_stub(slots=1)
+    provider_for(stub).generate_critique("Resume text", system_instruction="Be strict", max_tokens=256)
+    request = stub.requests[0]
+    assert request.get("response_format") == expected
+    assert request["model"] == "local-model"
+    assert request["max_tokens"] == 256
+    assert request["messages"][0] == {"role": "system", "content": "Be strict"}
+
+
+def test_triage_schema_is_sent_when_given(make_stub, monkeypatch):
+    monkeypatch.setattr(config, "LOCAL_CONSTRAINED_DECODING", "json_schema")
+    stub = make_stub(slots=1)
+    schema = response_schema.chunk_json_schema(triage=True)
+    provider_for(stub).generate_critique("Resume text", schema=schema)
+    assert stub.requests[0]["response_format"]["json_schema"]["schema"] == schema
+
+
+def test_reask_constrains_only_the_missing_fields(make_stub, monkeypatch):
+    monkeypatch.setattr(config, "LOCAL_CONSTRAINED_DECODING", "json_schema")
+    partial = full_answer()
+    del partial["feedback"]
+    stub = make_stub(slots=1, answers=[partial])
+    result = analysis.critique_chunk(provider_for(stub), "Chunk whose first answer has no feedback")
+    first, reask = (request["response_format"]["json_schema"]["schema"] for request in stub.requests)
+    assert first == response_schema.chunk_json_schema()
+    assert reask == response_schema.reask_json_schema([f"feedback.{cat}" for cat in config.ANALYSIS_CATEGORIES])
+    assert list(reask["properties"]) == ["feedback"]
+    assert result.is_complete
@@ -0,0 +1,198 @@
+"""Tests for the streaming chunker and chunk analysis (src/analysis.py)."""
+import asyncio
+import contextlib
+import json
+import random
+import sqlite3
+
+import pytest
+
+from src import analysis, config, database, persistence
+from src.ai_providers import MockProvider
+
+WORDS = ["python", "led", "team\n", "built", "kubernetes\n", "x" * 50, "\n\n", "é", "latency", "revenue"]
+
+
+def random_resume(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+@pytest.mark.parametrize("size, overlap", [(3000, 200), (500, 50), (200, 500), (120, 0), (0, 200)])
+def test_streamed_chunks_match_chunk_text(size, overlap):
+    rng = random.Random(size)
+    for _ in range(50):
+        text = random_resume(rng, rng.randint(0, 1500))
+        # Split into uneven pieces, as PDF pages would arrive
+        cuts = sorted(rng.sample(range(len(text) + 1), min(5, len(text) + 1)))
+        pieces = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        assert list(analysis.iter_chunks(pieces, size, overlap)) == analysis.chunk_text(text, size, overlap)
+
+
+@pytest.mark.parametrize("size, overlap", [(3000, 200), (500, 50), (200, 500), (120, 0), (0, 200), (-1, 0)])
+def test_count_chunks_matches_chunk_text(size, overlap):
+    rng = random.Random(size)
+    for _ in range(50):
+        text = random_resume(rng, rng.randint(0, 1500))
+        assert analysis.count_chunks(text, size, overlap) == len(analysis.chunk_text(text, size, overlap))
+
+
+class LockedConnection:
+    """Cache connection whose database another writer always holds locked."""
+
+    def execute(self, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+
+@pytest.mark.parametrize("run_async", [False, True])
+def test_locked_cache_counts_as_a_miss(run_async):
+    client = MockProvider("", "mock-model")
+    chunks = [f"Chunk {n} analyzed while the cache is locked (async={run_async})" for n in (1, 2)]
+    if run_async:
+        results, errors, hits = asyncio.run(analysis.analyze_chunks_async(client, chunks, cache_conn=LockedConnection()))
+    else:
+        results, errors, hits = analysis.analyze_chunks(client, chunks, cache_conn=LockedConnection())
+    assert len(results) == 2 and not errors and hits == 0
+
+    # The results were still cached, by the write-behind writer
+    assert persistence.get_writer().flush(timeout=5)
+    with contextlib.closing(database.get_connection()) as conn:
+        _, errors, hits = analysis.analyze_chunks(client, chunks, cache_conn=conn)
+    assert not errors and hits == 2
+
+
+class ScriptedProvider(MockProvider):
+    """Answers with the given raw texts in order, recording each prompt and schema."""
+
+    def __init__(self, answers):
+        super().__init__("", "scripted-model")
+        self.answers = list(answers)
+        self.prompts = []
+        self.schemas = []
+
+    def generate_critique(self, prompt, system_instruction=None, timeout=None, max_tokens=None, schema=None):
+        self.prompts.append(prompt)
+        self.schemas.append(schema)
+        return self.answers.pop(0)
+
+    async def agenerate_critique(self, prompt, system_instruction=None, timeout=None, max_tokens=None, schema=None):
+        return self.generate_critique(prompt, system_instruction, timeout, max_tokens, schema)
+
+
+def full_answer():
+    return {
+        "scores": {cat: 6 for cat in config.ANALYSIS_CATEGORIES},
+        "overall_score": 6,
+        "feedback": {cat: f"Feedback on {cat}, in detail." for cat in config.ANALYSIS_CATEGORIES},
+        "recommendations": "Quantify achievements.",
+        "pros": ["Clear"],
+        "cons": ["Vague"]
+    }
+
+
+def test_truncated_answer_reasks_only_the_missing_fields():
+    text = json.dumps(full_answer())
+    # Cut off mid-way through the Tailoring feedback, as at max_tokens
+    truncated = text[:text.index('"Tailoring": "Feedback') + 20]
+    later = config.ANALYSIS_CATEGORIES[config.ANALYSIS_CATEGORIES.index("Tailoring"):]
+    reask = {"feedback": {cat: "Re-asked." for cat in later}, "scores": {"Tailoring": 1}}
+    provider = ScriptedProvider([truncated, json.dumps(reask)])
+
+    result = analysis.critique_chunk(provider, "Chunk whose answer was truncated")
+    assert len(provider.prompts) == 2
+    reask_prompt = provider.prompts[1]
+    assert all(f'"{cat}": "<text>"' in reask_prompt for cat in later)
+    assert '"scores"' not in reask_prompt and "Skills Presentation" not in reask_prompt
+    assert list(provider.schemas[1]["properties"]) == ["feedback"]
+    # Merged: the re-asked feedback fills the gaps, the first answer's scores stand
+    assert result.is_complete
+    assert result.scores["Tailoring"] == 6
+    assert result.feedback["Skills Presentation"] == "Feedback on Skills Presentation, in detail."
+    assert result.feedback["Tailoring"] == "Re-asked."
+
+
+def test_partially_invalid_answer_is_repaired_async():
+    answer = full_answer()
+    answer["scores"]["ATS & Keywords"] = "N/A"
+    answer["overall_score"] = 42
+    reask = {"scores": {"ATS & Keywords": "7/10"}, "overall_score": 7}
+    provider = ScriptedProvider([json.dumps(answer), "Sure! " + json.dumps(reask)])
+
+    result = asyncio.run(analysis.acritique_chunk(provider, "Chunk with invalid scores"))
+    assert '"scores": {"ATS & Keywords": <int 0-10>}' in provider.prompts[1]
+    assert '"overall_score": <int 0-10>' in provider.prompts[1] and '"feedback"' not in provider.prompts[1]
+    assert result.scores["ATS & Keywords"] == 7 and result.overall_score == 7
+    assert result.is_complete
+
+
+def test_fields_still_missing_after_reasking_are_left_out(monkeypatch):
+    monkeypatch.setattr(config, "SCHEMA_REASK_ATTEMPTS", 1)
+    answer = full_answer()
+    del answer["scores"]["Tailoring"]
+    provider = ScriptedProvider([json.dumps(answer), "{}"])
+    result = analysis.critique_chunk(provider, "Chunk the model never scores for tailoring")
+    assert len(provider.prompts) == 2
+    assert result.missing_fields() == ["scores.Tailoring"]
+
+
+def cached_run(client, chunks, **kwargs):
+    """analyze_chunks with the test database's chunk cache; its cache stores are written before returning."""
+    with contextlib.closing(database.get_connection()) as conn:
+        outcome = analysis.analyze_chunks(client, chunks, cache_conn=conn, **kwargs)
+    assert persistence.get_writer().flush(timeout=5)
+    return outcome
+
+
+def test_cached_full_critique_serves_triage():
+    client = MockProvider("", "mock-model")
+    chunks = ["Chunk critiqued in full before it is triaged"]
+    full, _, hits = cached_run(client, chunks)
+    assert hits == 0
+    triaged, errors, hits = cached_run(client, chunks, triage=True)
+    assert not errors and hits == 1
+    assert triaged[0].to_dict() == full[0].to_dict()
+
+
+def test_cached_triage_does_not_serve_a_full_critique():
+    client = MockProvider("", "mock-model")
+    chunks = ["Chunk triaged before its full critique"]
+    triaged, _, _ = cached_run(client, chunks, triage=True)
+    assert not triaged[0].feedback
+    full, _, hits = cached_run(client, chunks)
+    assert hits == 0 and full[0].is_complete
+
+
+def test_detail_is_generated_for_a_pending_triage_record():
+    client = MockProvider("", "mock-model")
+    chunks = ["First chunk of a triaged resume", "Second chunk of a triaged resume"]
+    triaged, _, _ = cached_run(client, chunks, triage=True)
+    record = analysis.build_record("pending.pdf", analysis.aggregate_chunk_analyses(triaged), triaged,
+                                   client.provider_name, client.model_name, triage=True)
+    record["content_hash"] = "pending-detail-test"
+    writer = persistence.get_writer()
+    analysis_id = writer.submit(record).result(timeout=5)
+
+    def stored(**kwargs):
+        with contextlib.closing(database.get_connection()) as conn:
+            return database.find_analysis_by_hash(conn, "pending-detail-test", None, client.provider_name, client.model_name, **kwargs)
+
+    assert stored() is None and stored(include_pending=True)["detail_pending"]
+
+    with contextlib.closing(database.get_connection()) as conn:
+        detail, errors = analysis.generate_detail(client, iter(chunks), cache_conn=conn)
+    assert not errors
+    assert set(detail) == {"feedback", "recommendations", "pros", "cons"}
+    assert all(detail["feedback"].get(cat) for cat in config.ANALYSIS_CATEGORIES)
+
+    triage_scores = dict(record["scores"])
+    record.update(detail, detail_pending=False)
+    assert writer.submit(record, analysis_id=analysis_id).result(timeout=5) == analysis_id
+    found = stored()
+    assert found["analysis_id"] == analysis_id and not found["detail_pending"]
+    assert found["feedback"] == detail["feedback"]
+    assert found["scores"] == triage_scores  # Opening the detail doesn't re-score
+
+
+def test_detail_is_none_when_no_chunk_can_be_critiqued():
+    provider = ScriptedProvider(['{"error": "Resume could not be analyzed"}'])
+    detail, errors = analysis.generate_detail(provider, ["Chunk the model refuses"])
+    assert detail is None and len(errors) == 1
@@ -0,0 +1,229 @@
+"""Tests for the headless API (src/api.py), run end to end against the Mock provider."""
+import asyncio
+import hashlib
+import hmac
+import json
+import queue
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import api, config
+
+RESUME = "\n".join(
+    f"Line {i}: built Python and Kubernetes services for the payments team, cutting p99 latency by {i}%"
+    for i in range(120)
+).encode()
+WEBHOOK_SECRET = "test-secret"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(config, "MOCK_LATENCY_SECONDS", 0)
+    with TestClient(api.app) as client:
+        yield client
+    api.JOBS.clear()
+
+
+@pytest.fixture
+def slow_client(monkeypatch):
+    """One job at a time, each Mock call taking a while, so jobs can be caught queued or running."""
+    monkeypatch.setattr(config, "MOCK_LATENCY_SECONDS", 0.5)
+    monkeypatch.setattr(config, "API_MAX_CONCURRENT_JOBS", 1)
+    with TestClient(api.app) as client:
+        yield client
+    api.JOBS.clear()
+
+
+@pytest.fixture
+def webhook_receiver(monkeypatch):
+    """A local HTTP server recording each callback as (signature header, raw body)."""
+    monkeypatch.setattr(config, "API_WEBHOOK_SECRET", WEBHOOK_SECRET)
+    monkeypatch.setattr(config, "API_WEBHOOK_ALLOWED_HOSTS", ["127.0.0.1"])
+    received = queue.Queue()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            received.put((self.headers.get("X-Resume-Critiquer-Signature"), body))
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield SimpleNamespace(url=f"http://127.0.0.1:{server.server_port}/hook", received=received)
+    server.shutdown()
+    server.server_close()
+
+
+def unique_resume(tag):
+    """RESUME with its own content, so none of its segments are served from the chunk cache."""
+    return RESUME.replace(b"payments team", f"{tag} team".encode())
+
+
+def submit(client, content=RESUME, filename="resume.txt", **form):
+    form.setdefault("provider", config.PROVIDER_MOCK)
+    return client.post("/v1/analyses", files={"file": (filename, content, "text/plain")}, data=form)
+
+
+def wait_for(client, job_id, statuses=("completed", "failed", "cancelled"), timeout=15):
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get(f"/v1/analyses/{job_id}").json()
+        if status["status"] in statuses:
+            return status
+        assert time.monotonic() < deadline, f"job still {status['status']}"
+        time.sleep(0.02)
+
+
+def next_webhook(receiver, timeout=10):
+    signature, body = receiver.received.get(timeout=timeout)
+    expected = hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    assert signature == f"sha256={expected}"
+    return json.loads(body)
+
+
+def test_submit_status_result(client):
+    response = submit(client, target_role="Backend Engineer")
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.json()["status_url"] == f"/v1/analyses/{job_id}"
+
+    status = wait_for(client, job_id)
+    assert status["status"] == "completed"
+    assert status["provider"] == config.PROVIDER_MOCK
+    assert status["job_role"] == "Backend Engineer"
+
+    result = client.get(f"/v1/analyses/{job_id}/result")
+    assert result.status_code == 200
+    body = result.json()
+    assert body["analysis_id"] == status["analysis_id"]
+    assert body["filename"] == "resume.txt"
+    assert body["segments"] >= 1
+    assert body["overall_score"] is not None
+    assert "raw_response" not in body
+
+
+def test_resubmitted_resume_is_served_from_chunk_cache(client):
+    first = wait_for(client, submit(client, target_role="Data Engineer").json()["id"])
+    second = wait_for(client, submit(client, target_role="Data Engineer").json()["id"])
+    assert first["status"] == second["status"] == "completed"
+    result = client.get(f"/v1/analyses/{second['id']}/result").json()
+    assert result["segments_from_cache"] == result["segments"]
+
+
+def test_result_before_completion_is_409(slow_client):
+    job_id = submit(slow_client, content=unique_resume("early-result")).json()["id"]
+    assert slow_client.get(f"/v1/analyses/{job_id}/result").status_code == 409
+    wait_for(slow_client, job_id)
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/v1/analyses/nope").status_code == 404
+    assert client.get("/v1/analyses/nope/result").status_code == 404
+    assert client.post("/v1/analyses/nope/cancel").status_code == 404
+
+
+@pytest.mark.parametrize("form, content, filename", [
+    ({"provider": "Nope"}, RESUME, "resume.txt"),
+    ({"model": "no-such-model"}, RESUME, "resume.txt"),
+    ({"chunk_size": "100", "chunk_overlap": "200"}, RESUME, "resume.txt"),
+    ({}, b"not a pdf" * 50, "resume.pdf"),
+    ({}, b"", "resume.txt"),
+    ({"callback_url": "ftp://example.com/hook"}, RESUME, "resume.txt"),
+    ({"callback_url": "http://127.0.0.1:8000/admin"}, RESUME, "resume.txt"),
+    ({"callback_url": "http://169.254.169.254/latest/meta-data"}, RESUME, "resume.txt"),
+], ids=["unknown-provider", "unknown-model", "overlap-exceeds-size", "not-a-pdf", "empty-file",
+        "callback-not-http", "callback-loopback", "callback-metadata"])
+def test_invalid_submission_is_422(client, form, content, filename):
+    response = submit(client, content=content, filename=filename, **form)
+    assert response.status_code == 422
+    assert response.json()["detail"]
+    assert not api.JOBS
+
+
+def test_missing_file_is_422(client):
+    assert client.post("/v1/analyses", data={"provider": config.PROVIDER_MOCK}).status_code == 422
+
+
+def test_cancel_running_job(slow_client):
+    job_id = submit(slow_client, content=unique_resume("cancel-running")).json()["id"]
+    wait_for(slow_client, job_id, statuses=("running",))
+    assert slow_client.post(f"/v1/analyses/{job_id}/cancel").status_code == 200
+    status = wait_for(slow_client, job_id)
+    assert status["status"] == "cancelled"
+    assert slow_client.get(f"/v1/analyses/{job_id}/result").status_code == 422
+
+
+def test_cancel_queued_job_sends_webhook(slow_client, webhook_receiver):
+    running = submit(slow_client, content=unique_resume("cancel-queued"), callback_url=webhook_receiver.url).json()["id"]
+    queued = submit(slow_client, content=unique_resume("queued"), callback_url=webhook_receiver.url).json()["id"]
+    assert slow_client.get(f"/v1/analyses/{queued}").json()["status"] == "queued"
+
+    response = slow_client.post(f"/v1/analyses/{queued}/cancel").json()
+    assert response["status"] == "cancelled"
+    payload = next_webhook(webhook_receiver)
+    assert payload["id"] == queued
+    assert payload["status"] == "cancelled"
+
+    assert wait_for(slow_client, running)["status"] == "completed"
+    assert next_webhook(webhook_receiver)["id"] == running
+
+
+def test_webhook_is_signed(client, webhook_receiver):
+    job_id = submit(client, callback_url=webhook_receiver.url).json()["id"]
+    payload = next_webhook(webhook_receiver)
+    assert payload["id"] == job_id
+    assert payload["status"] == "completed"
+    assert payload["result"]["analysis_id"] == payload["analysis_id"]
+
+
+def test_callback_host_must_be_allowed(client, webhook_receiver, monkeypatch):
+    response = submit(client, callback_url="http://localhost:8000/hook")  # Loopback, but not on the list
+    assert response.status_code == 422
+    assert "not allowed" in response.json()["detail"]
+
+    # The host is checked again when the webhook is sent
+    monkeypatch.setattr(config, "API_WEBHOOK_ALLOWED_HOSTS", [])
+    assert not asyncio.run(api.send_webhook(webhook_receiver.url, {"id": "job"}))
+    assert webhook_receiver.received.empty()
+
+
+def test_job_cancelled_before_it_starts_is_cleaned_up(monkeypatch):
+    sent = []
+
+    async def record_webhook(url, payload):
+        sent.append((url, payload))
+        return True
+
+    monkeypatch.setattr(api, "send_webhook", record_webhook)
+
+    async def scenario():
+        upload = tempfile.SpooledTemporaryFile()
+        upload.write(RESUME)
+        job = {"id": "queued-job", "status": "queued", "filename": "resume.txt", "provider": config.PROVIDER_MOCK,
+               "model": config.DEFAULT_MODELS[config.PROVIDER_MOCK], "job_role": None, "created_time": "",
+               "finished_time": None, "analysis_id": None, "error": None, "result": None,
+               "callback_url": "http://receiver.invalid/hook"}
+        task = asyncio.create_task(api.run_job(job, upload, config.DEFAULT_CHUNK_SIZE, config.DEFAULT_CHUNK_OVERLAP))
+        task.add_done_callback(lambda t: api._cancelled_before_start(job, upload, t))
+        task.cancel()  # Before run_job has taken a step
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        while api._state.tasks:
+            await asyncio.gather(*api._state.tasks)
+        return job, upload
+
+    job, upload = asyncio.run(scenario())
+    assert upload.closed
+    assert job["status"] == "cancelled"
+    assert job["finished_time"]
+    assert sent == [("http://receiver.invalid/hook", {**api._job_status(job), "result": None})]
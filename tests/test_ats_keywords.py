@@ -0,0 +1,52 @@
+"""Tests for the keyword automaton (src/ats_keywords.py)."""
+import pytest
+
+from src import ats_keywords
+
+
+def found(text, role="Data Scientist"):
+    return sorted(ats_keywords.get_automaton(role).find_all(text))
+
+
+def test_matches_sit_on_word_boundaries():
+    assert found("Java and JavaScript", "Software Engineer") == ["java", "javascript"]
+    assert found("javascripting", "Software Engineer") == []
+    assert found("pythonic code") == []
+
+
+@pytest.mark.parametrize("text", [
+    "Happy to go the extra mile",  # Prose, not the language
+    "Ready to Go-live on day one",
+    "Go-to-market launches",
+])
+def test_go_in_prose_is_not_a_keyword(text):
+    assert "go" not in found(text, "Backend Engineer")
+
+
+@pytest.mark.parametrize("text", ["Led R&D for the analytics group", "Director of r and d", "Shipped ML-based R&D tools"])
+def test_r_inside_words_is_not_a_keyword(text):
+    assert "r" not in found(text)
+
+
+@pytest.mark.parametrize("text, role, keyword", [
+    ("Services in Go, Python and Java.", "Backend Engineer", "go"),
+    ("Languages: Python, R, SQL", "Data Scientist", "r"),
+    ("Modelling in R.", "Data Scientist", "r"),
+    ("R/Python notebooks", "Data Scientist", "r"),
+    ("Built ML models", "Data Scientist", "machine learning"),
+    ("JS and TS on the frontend", "Frontend Engineer", "typescript"),
+])
+def test_short_keywords_still_match_when_standalone(text, role, keyword):
+    assert keyword in found(text, role)
+
+
+def test_alias_joined_to_a_word_does_not_count():
+    # "js" of Node.js is not JavaScript experience
+    assert found("Built Node.js services", "Frontend Engineer") == []
+
+
+def test_offsets_and_whitespace_runs():
+    text = "Machine\n  learning with Go,\nthen more machine learning"
+    positions = ats_keywords.get_automaton("Data Scientist").find_all(text)
+    assert positions["machine learning"] == [0, text.index("machine learning")]
+    assert ats_keywords.get_automaton("Backend Engineer").find_all(text)["go"] == [text.index("Go")]
@@ -0,0 +1,61 @@
+"""Tests for the analyses table helpers (src/database.py)."""
+import sqlite3
+
+import pytest
+
+from src import database
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    database.init_db(conn)
+    yield conn
+    conn.close()
+
+
+def make_record(**overrides):
+    record = {
+        "filename": "resume.pdf", "job_role": "Data Engineer", "analysis_time": "2026-01-01T00:00:00",
+        "overall_score": 7.0, "scores": {"Tailoring": 7}, "feedback": {"Tailoring": "Good."},
+        "recommendations": "Quantify.", "pros": ["Clear"], "cons": ["Long"], "raw_response": "[]",
+        "provider": "Mock", "model": "mock-critic", "partial": False, "detail_pending": False, "content_hash": "abc"
+    }
+    record.update(overrides)
+    return record
+
+
+def find(conn, content_hash="abc", **kwargs):
+    return database.find_analysis_by_hash(conn, content_hash, "Data Engineer", "Mock", "mock-critic", **kwargs)
+
+
+def test_finds_latest_complete_analysis(conn):
+    database.insert_analysis(conn, make_record(filename="old.pdf"))
+    latest = database.insert_analysis(conn, make_record(filename="new.pdf"))
+    found = find(conn)
+    assert found["analysis_id"] == latest
+    assert found["filename"] == "new.pdf"
+    assert found["feedback"] == {"Tailoring": "Good."}
+    assert not found["detail_pending"]
+
+
+@pytest.mark.parametrize("overrides", [
+    {"content_hash": "other"}, {"job_role": None}, {"model": "other-model"}, {"partial": True}
+])
+def test_other_analyses_do_not_match(conn, overrides):
+    database.insert_analysis(conn, make_record(**overrides))
+    assert find(conn) is None
+
+
+def test_scores_only_triage_rows_need_include_pending(conn):
+    pending = database.insert_analysis(conn, make_record(feedback={}, detail_pending=True))
+    assert find(conn) is None
+    found = find(conn, include_pending=True)
+    assert found["analysis_id"] == pending
+    assert found["triage"] and found["detail_pending"]
+
+
+def test_triage_row_counts_once_its_detail_is_stored(conn):
+    analysis_id = database.insert_analysis(conn, make_record(feedback={}, detail_pending=True))
+    database.update_analysis_detail(conn, analysis_id, make_record())
+    assert find(conn)["analysis_id"] == analysis_id
@@ -0,0 +1,100 @@
+"""Tests for full-text search over stored analyses (src/feedback_search.py)."""
+import sqlite3
+
+import pytest
+
+from src import database, feedback_search
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    database.init_db(conn)
+    yield conn
+    conn.close()
+
+
+def make_record(filename, cons=(), feedback=None, recommendations="", **overrides):
+    record = {
+        "filename": filename, "job_role": "Data Engineer", "analysis_time": "2026-01-01T00:00:00",
+        "overall_score": 7.0, "scores": {"Tailoring": 7}, "feedback": feedback or {}, "recommendations": recommendations,
+        "pros": ["Clear layout"], "cons": list(cons), "raw_response": "[]", "provider": "Mock", "model": "mock-critic"
+    }
+    record.update(overrides)
+    return record
+
+
+def search(conn, query, **kwargs):
+    return [hit["filename"] for hit in feedback_search.search_analyses(conn, query, **kwargs)]
+
+
+def test_inserted_analyses_are_searchable(conn):
+    database.insert_analysis(conn, make_record("gap.pdf", cons=["Explain the employment gap in 2021"]))
+    database.insert_analysis(conn, make_record("other.pdf", cons=["Summary is too long"]))
+    assert search(conn, "employment gap") == ["gap.pdf"]
+    assert search(conn, "employment summary") == []  # Every word must match
+
+
+def test_updated_detail_replaces_the_indexed_text(conn):
+    analysis_id = database.insert_analysis(conn, make_record("triage.pdf", detail_pending=True))
+    assert search(conn, "kubernetes") == []
+    database.update_analysis_detail(conn, analysis_id, make_record("triage.pdf", feedback={"Tailoring": "Add Kubernetes work"}))
+    assert search(conn, "kubernetes") == ["triage.pdf"]
+    database.update_analysis_detail(conn, analysis_id, make_record("triage.pdf", feedback={"Tailoring": "Add Terraform work"}))
+    assert search(conn, "kubernetes") == []
+    assert search(conn, "terraform") == ["triage.pdf"]
+
+
+def test_deleted_analyses_leave_the_index(conn):
+    gone = database.insert_analysis(conn, make_record("gone.pdf", cons=["Missing certifications"]))
+    database.insert_analysis(conn, make_record("kept.pdf", cons=["Missing certifications"]))
+    conn.execute("DELETE FROM analyses WHERE id = ?", (gone,))
+    conn.commit()
+    assert search(conn, "certifications") == ["kept.pdf"]
+    assert conn.execute("SELECT count(*) FROM analyses_fts WHERE analyses_fts MATCH 'certifications'").fetchone()[0] == 1
+
+
+def test_existing_analyses_are_indexed_when_search_is_added():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE analyses (id INTEGER PRIMARY KEY, filename TEXT, job_role TEXT, analysis_time TEXT, "
+                 "overall_score REAL, scores_json TEXT, feedback_json TEXT, recommendations TEXT, pros_json TEXT, "
+                 "cons_json TEXT, raw_response TEXT)")
+    conn.execute("INSERT INTO analyses (filename, cons_json) VALUES ('legacy.pdf', '[\"Inconsistent date formats\"]')")
+    database.init_db(conn)
+    assert search(conn, "inconsistent date*") == ["legacy.pdf"]
+    conn.close()
+
+
+def test_better_matches_rank_first(conn):
+    database.insert_analysis(conn, make_record("once.pdf", cons=["Leadership is vague; " + "filler " * 30]))
+    database.insert_analysis(conn, make_record("twice.pdf", cons=["Leadership claims lack leadership examples"]))
+    assert search(conn, "leadership") == ["twice.pdf", "once.pdf"]
+
+
+def test_fields_and_filters(conn):
+    database.insert_analysis(conn, make_record("pro.pdf", overall_score=9.0, analysis_time="2026-03-01T00:00:00"))
+    database.insert_analysis(conn, make_record("con.pdf", cons=["No clear layout"], job_role="Product Manager",
+                                               overall_score=4.0, analysis_time="2026-01-15T00:00:00"))
+    assert sorted(search(conn, "layout")) == ["con.pdf", "pro.pdf"]
+    assert search(conn, "layout", fields=["cons_json"]) == ["con.pdf"]
+    assert search(conn, "layout", job_role="product") == ["con.pdf"]
+    assert search(conn, "layout", min_score=8) == ["pro.pdf"]
+    assert search(conn, "layout", max_score=5) == ["con.pdf"]
+    assert search(conn, "layout", date_from="2026-02-01") == ["pro.pdf"]
+    assert search(conn, "layout", date_to="2026-02-01") == ["con.pdf"]
+
+
+def test_only_the_newest_window_is_ranked(conn):
+    for i in range(5):
+        database.insert_analysis(conn, make_record(f"r{i}.pdf", cons=["Quantify achievements"]))
+    assert search(conn, "quantify", window=2, limit=10) == ["r4.pdf", "r3.pdf"]
+
+
+def test_query_syntax_is_escaped_and_snippets_highlighted(conn):
+    database.insert_analysis(conn, make_record("x.pdf", cons=["Uses <b>bold</b> C++ claims"]))
+    # Quotes and operators are searched for as words, never parsed as FTS5 syntax
+    assert search(conn, 'C++ "claims') == ["x.pdf"]
+    assert search(conn, "claims OR missing") == []  # "or" must appear too
+    assert search(conn, "*") == []
+    snippet = feedback_search.search_analyses(conn, "bold")[0]["snippet"]
+    assert "<mark>bold</mark>" in snippet and "&lt;b&gt;" in snippet
@@ -0,0 +1,172 @@
+"""Tests for the write-behind queue (src/persistence.py), against InMemoryAnalysisStore."""
+import json
+import threading
+
+import pytest
+
+from src import config
+from src.persistence import InMemoryAnalysisStore, StoreBusyError, WriteBehindQueue
+
+
+@pytest.fixture(autouse=True)
+def spill_path(tmp_path, monkeypatch):
+    path = tmp_path / "spill.jsonl"
+    monkeypatch.setattr(config, "WRITE_SPILL_PATH", path)
+    monkeypatch.setattr(config, "WRITE_RETRY_BACKOFF_SECONDS", 0)
+    return path
+
+
+@pytest.fixture
+def store():
+    return InMemoryAnalysisStore()
+
+
+def record(name):
+    return {"filename": name, "overall_score": 7}
+
+
+def test_records_are_written_and_ids_resolved(store):
+    writer = WriteBehindQueue(lambda: store, batch_size=3, batch_wait=0.05)
+    futures = [writer.submit(record(f"r{i}.pdf"), index_text="python" if i % 2 else None) for i in range(7)]
+    assert [f.result(timeout=5) for f in futures] == list(range(1, 8))
+    assert [r["filename"] for r in store.records] == [f"r{i}.pdf" for i in range(7)]
+    assert store.indexed == ["r1.pdf", "r3.pdf", "r5.pdf"]
+    assert writer.flush(timeout=5)
+    stats = writer.stats()
+    assert stats["written"] == 7 and stats["failed"] == 0 and stats["pending"] == 0
+    assert stats["batches"] >= 3  # No batch holds more than batch_size records
+    assert writer.close(timeout=5)
+
+
+def test_update_by_analysis_id(store):
+    writer = WriteBehindQueue(lambda: store, batch_wait=0)
+    analysis_id = writer.submit(record("a.pdf")).result(timeout=5)
+    detailed = dict(record("a.pdf"), detail="More feedback")
+    assert writer.submit(detailed, analysis_id=analysis_id).result(timeout=5) == analysis_id
+    assert store.records == [detailed]
+    writer.close(timeout=5)
+
+
+def test_busy_store_is_retried(store, monkeypatch):
+    monkeypatch.setattr(config, "WRITE_MAX_RETRIES", 3)
+    busy = iter([True, True, False])
+
+    class BusyStore(InMemoryAnalysisStore):
+        def write_batch(self, items):
+            if next(busy):
+                raise StoreBusyError("database is locked")
+            return super().write_batch(items)
+
+    writer = WriteBehindQueue(BusyStore, batch_wait=0)
+    assert writer.submit(record("a.pdf")).result(timeout=5) == 1
+    assert writer.stats()["retries"] == 2
+    writer.close(timeout=5)
+
+
+def test_bad_record_does_not_fail_its_batch(spill_path):
+    class PickyStore(InMemoryAnalysisStore):
+        def write_batch(self, items):
+            if any(item.record["filename"] == "bad.pdf" for item in items):
+                raise ValueError("bad record")
+            return super().write_batch(items)
+
+    writer = WriteBehindQueue(PickyStore, batch_size=10, batch_wait=0.2)
+    futures = {name: writer.submit(record(name)) for name in ("a.pdf", "bad.pdf", "b.pdf")}
+    assert futures["a.pdf"].result(timeout=5) and futures["b.pdf"].result(timeout=5)
+    with pytest.raises(ValueError):
+        futures["bad.pdf"].result(timeout=5)
+    assert writer.flush(timeout=5)
+    assert [json.loads(line)["filename"] for line in spill_path.read_text().splitlines()] == ["bad.pdf"]
+    writer.close(timeout=5)
+
+
+def test_store_that_cannot_open_fails_the_batch_and_is_retried(store, spill_path):
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("database unavailable")
+        return store
+
+    writer = WriteBehindQueue(factory, batch_wait=0)
+    with pytest.raises(OSError):
+        writer.submit(record("a.pdf")).result(timeout=5)
+    assert writer.flush(timeout=5)
+    assert json.loads(spill_path.read_text())["filename"] == "a.pdf"
+
+    # The writer thread survived and opens the store for the next batch
+    assert writer.submit(record("b.pdf")).result(timeout=5) == 1
+    assert writer.stats()["failed"] == 1
+    writer.close(timeout=5)
+
+
+def test_cancelled_future_is_still_written(store):
+    release = threading.Event()
+
+    class SlowStore(InMemoryAnalysisStore):
+        def write_batch(self, items):
+            release.wait(5)
+            return super().write_batch(items)
+
+    slow = SlowStore()
+    writer = WriteBehindQueue(lambda: slow, batch_wait=0)
+    future = writer.submit(record("a.pdf"))
+    future.cancel()  # The caller stopped waiting, e.g. its API job was cancelled
+    release.set()
+    assert writer.flush(timeout=5)
+    assert [r["filename"] for r in slow.records] == ["a.pdf"]
+    assert writer.submit(record("b.pdf")).result(timeout=5) == 2
+    writer.close(timeout=5)
+
+
+def test_closed_writer_rejects_records(store):
+    writer = WriteBehindQueue(lambda: store, batch_wait=0)
+    writer.submit(record("a.pdf"))
+    assert writer.close(timeout=5)
+    assert len(store.records) == 1
+    with pytest.raises(RuntimeError):
+        writer.submit(record("b.pdf"))
+
+
+def test_chunk_results_share_batches_with_records(store):
+    writer = WriteBehindQueue(lambda: store, batch_size=10, batch_wait=0.05)
+    cached = writer.submit_chunk_result("key-1", "Mock", "mock-model", {"overall_score": 6})
+    analysis_id = writer.submit(record("a.pdf"))
+    assert cached.result(timeout=5) is None and analysis_id.result(timeout=5) == 1
+    assert store.chunk_results == {"key-1": {"overall_score": 6}}
+    stats = writer.stats()
+    assert stats["written"] == 1 and stats["cached_chunks"] == 1
+    writer.close(timeout=5)
+
+
+def test_chunk_result_that_cannot_be_stored_is_not_spilled(spill_path):
+    def factory():
+        raise OSError("database unavailable")
+
+    writer = WriteBehindQueue(factory, batch_wait=0)
+    with pytest.raises(OSError):
+        writer.submit_chunk_result("key-1", "Mock", "mock-model", {"overall_score": 6}).result(timeout=5)
+    assert writer.flush(timeout=5)
+    assert not spill_path.exists()
+    assert writer.stats()["failed"] == 0  # Only analysis records count as lost
+    writer.close(timeout=5)
+
+
+def test_wait_for_pending_only_waits_for_matching_writes():
+    release = threading.Event()
+
+    class SlowStore(InMemoryAnalysisStore):
+        def write_batch(self, items):
+            release.wait(5)
+            return super().write_batch(items)
+
+    writer = WriteBehindQueue(SlowStore, batch_wait=0)
+    future = writer.submit(record("a.pdf"))
+    # Nothing queued for b.pdf, so there is nothing to wait for
+    assert writer.wait_for_pending(lambda item: item.record["filename"] == "b.pdf", timeout=0)
+    assert not writer.wait_for_pending(lambda item: item.record["filename"] == "a.pdf", timeout=0.05)
+    release.set()
+    assert writer.wait_for_pending(lambda item: item.record["filename"] == "a.pdf", timeout=5)
+    assert future.done()
+    writer.close(timeout=5)
@@ -0,0 +1,86 @@
+"""Tests for decoding model answers and re-asking for missing fields (src/response_schema.py)."""
+import pytest
+
+from src import config, response_schema
+from src.response_schema import ChunkAnalysis
+
+CATEGORIES = config.ANALYSIS_CATEGORIES
+
+
+def complete_answer(score=6):
+    return {
+        "scores": {cat: score for cat in CATEGORIES},
+        "overall_score": score,
+        "feedback": {cat: f"Feedback on {cat}." for cat in CATEGORIES},
+        "recommendations": "Quantify achievements.",
+        "pros": ["Clear"],
+        "cons": ["Vague"]
+    }
+
+
+def test_complete_answer_decodes():
+    result, missing = response_schema.decode_chunk_analysis(complete_answer())
+    assert missing == [] and result.is_complete
+    assert result.scores == {cat: 6 for cat in CATEGORIES}
+
+
+@pytest.mark.parametrize("value, expected", [
+    (7, 7), (7.6, 8), ("8", 8), ("7/10", 7), (" 9 / 10 ", 9),
+    ("N/A", None), (11, None), (-1, None), (True, None), (None, None), (float("nan"), None),
+])
+def test_scores_are_coerced_or_dropped(value, expected):
+    answer = complete_answer()
+    answer["scores"]["Tailoring"] = value
+    result, missing = response_schema.decode_chunk_analysis(answer)
+    assert result.scores.get("Tailoring") == expected
+    assert ("scores.Tailoring" in missing) == (expected is None)
+
+
+def test_partially_invalid_answer_reports_each_bad_field():
+    answer = complete_answer()
+    answer["scores"]["ATS & Keywords"] = "high"
+    del answer["scores"]["Tailoring"]
+    answer["overall_score"] = "?"
+    answer["feedback"]["Tailoring"] = "   "
+    answer["pros"] = "Clear"  # A bare string is still a one-item list
+    result, missing = response_schema.decode_chunk_analysis(answer)
+    assert missing == ["scores.Tailoring", "scores.ATS & Keywords", "overall_score", "feedback.Tailoring"]
+    assert result.pros == ["Clear"]
+    # A triage answer only needs scores
+    assert response_schema.decode_chunk_analysis(answer, triage=True)[1] == missing[:3]
+
+
+@pytest.mark.parametrize("answer", [["not", "an", "object"], {"error": "Resume could not be analyzed"}])
+def test_unusable_answers_raise(answer):
+    with pytest.raises(ValueError):
+        response_schema.decode_chunk_analysis(answer)
+
+
+def test_reask_asks_only_for_missing_fields():
+    missing = ["scores.Tailoring", "overall_score", "feedback.ATS & Keywords"]
+    prompt = response_schema.build_reask_prompt("Led a team of five", missing, "Data Engineer")
+    assert '"scores": {"Tailoring": <int 0-10>}' in prompt
+    assert '"overall_score": <int 0-10>' in prompt
+    assert '"feedback": {"ATS & Keywords": "<text>"}' in prompt
+    assert "Skills Presentation" not in prompt and "recommendations" not in prompt
+    assert "Target role: Data Engineer" in prompt and "Led a team of five" in prompt
+
+    schema = response_schema.reask_json_schema(missing)
+    assert schema["required"] == ["scores", "overall_score", "feedback"]
+    assert schema["properties"]["scores"]["required"] == ["Tailoring"]
+    assert schema["properties"]["feedback"]["required"] == ["ATS & Keywords"]
+    assert list(response_schema.reask_json_schema(["overall_score"])["properties"]) == ["overall_score"]
+
+
+def test_reask_answer_fills_gaps_without_overwriting():
+    result = ChunkAnalysis(scores={cat: 6 for cat in CATEGORIES if cat != "Tailoring"}, overall_score=6,
+                           recommendations="Keep it short.")
+    reask = {
+        "scores": {"Tailoring": 9, "Skills Presentation": 1},  # Already known: ignored
+        "feedback": {cat: "Better." for cat in CATEGORIES},
+        "recommendations": "Something else."
+    }
+    response_schema.decode_fields(reask, into=result)
+    assert result.scores["Tailoring"] == 9 and result.scores["Skills Presentation"] == 6
+    assert result.recommendations == "Keep it short."
+    assert result.is_complete
@@ -0,0 +1,91 @@
+"""Tests for the BM25 resume index (src/retrieval.py)."""
+import contextlib
+import sqlite3
+
+import pytest
+
+from src import database, persistence, retrieval
+
+JD = "Backend engineer: Python, Kafka and PostgreSQL for distributed systems"
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    database.init_db(conn)
+    yield conn
+    conn.close()
+
+
+def ranked_files(conn, query=JD, **kwargs):
+    return [hit["filename"] for hit in retrieval.rank_resumes(conn, query, **kwargs)]
+
+
+def test_tokenize_keeps_tech_terms_and_drops_stopwords():
+    assert retrieval.tokenize("Built C++ and C# services with Node.js for the team") == [
+        "built", "c++", "c#", "services", "node.js", "team"
+    ]
+
+
+def test_identical_text_is_indexed_once(conn):
+    doc_id, new = retrieval.index_resume(conn, "a.pdf", "Python developer")
+    assert new
+    assert retrieval.index_resume(conn, "copy_of_a.pdf", "Python developer") == (doc_id, False)
+    assert retrieval.get_index_size(conn) == 1
+    assert retrieval.get_indexed_text(conn, doc_id) == "Python developer"
+
+
+def test_best_match_ranks_first(conn):
+    retrieval.index_resume(conn, "backend.pdf", "Python and Kafka on PostgreSQL; built distributed systems")
+    retrieval.index_resume(conn, "partial.pdf", "Python scripts for reporting")
+    retrieval.index_resume(conn, "designer.pdf", "Figma prototypes and user interviews")
+    ranking = retrieval.rank_resumes(conn, JD)
+    assert [hit["filename"] for hit in ranking] == ["backend.pdf", "partial.pdf"]  # No shared terms, not ranked
+    assert ranking[0]["score"] == 10 and 0 < ranking[1]["score"] < 10
+
+
+def test_rare_terms_outweigh_common_ones(conn):
+    for i in range(5):
+        retrieval.index_resume(conn, f"python_{i}.pdf", f"Python developer number {i}")
+    retrieval.index_resume(conn, "kafka.pdf", "Kafka developer")
+    assert ranked_files(conn, "python kafka")[0] == "kafka.pdf"
+
+
+def test_shorter_resume_wins_at_equal_term_frequency(conn):
+    retrieval.index_resume(conn, "long.pdf", "Kafka " + " ".join(f"filler{i}" for i in range(50)))
+    retrieval.index_resume(conn, "short.pdf", "Kafka streaming")
+    assert ranked_files(conn, "kafka") == ["short.pdf", "long.pdf"]
+
+
+def test_top_k_and_doc_ids(conn):
+    ids = {name: retrieval.index_resume(conn, name, f"Python Kafka {name}")[0] for name in ("a.pdf", "b.pdf", "c.pdf")}
+    assert len(ranked_files(conn, top_k=2)) == 2
+    assert ranked_files(conn, doc_ids=[ids["b.pdf"]]) == ["b.pdf"]
+    assert ranked_files(conn, doc_ids=[]) == []
+
+
+def test_nothing_to_rank(conn):
+    assert ranked_files(conn) == []  # Empty index
+    retrieval.index_resume(conn, "a.pdf", "Python developer")
+    assert ranked_files(conn, "the and of") == []  # Only stopwords
+
+
+def test_ranking_follows_new_resumes(conn):
+    retrieval.index_resume(conn, "first.pdf", "Python developer")
+    assert ranked_files(conn) == ["first.pdf"]
+    retrieval.index_resume(conn, "second.pdf", "Python Kafka PostgreSQL distributed systems")
+    assert ranked_files(conn) == ["second.pdf", "first.pdf"]
+
+
+def test_resumes_saved_with_their_analysis_are_ranked():
+    writer = persistence.WriteBehindQueue(persistence.SQLiteAnalysisStore, batch_wait=0)
+    text = "Rustacean building Tokio services and Kafka consumers"
+    record = {
+        "filename": "rust.pdf", "job_role": None, "analysis_time": "2026-01-01T00:00:00", "overall_score": 7.0,
+        "scores": {}, "feedback": {}, "recommendations": "", "pros": [], "cons": [], "raw_response": "[]",
+        "provider": "Mock", "model": "mock-critic"
+    }
+    writer.submit(record, index_text=text).result(timeout=5)
+    writer.close(timeout=5)
+    with contextlib.closing(database.get_connection()) as db:
+        assert ranked_files(db, "tokio rustacean") == ["rust.pdf"]
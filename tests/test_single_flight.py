@@ -0,0 +1,165 @@
+"""Tests for request coalescing (src/single_flight.py) and deadlines on shared calls."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src import analysis, config, deadlines, single_flight
+from src.ai_providers import MockProvider
+
+
+def make_flight():
+    return single_flight.AsyncSingleFlight(single_flight._FlightStats())
+
+
+class SlowCall:
+    """A provider call that holds a semaphore slot until released."""
+
+    def __init__(self, semaphore):
+        self.semaphore = semaphore
+        self.release = asyncio.Event()
+        self.started = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        self.started += 1
+        async with self.semaphore:
+            try:
+                await self.release.wait()
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+        return {"score": 7}
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight = make_flight()
+        call = SlowCall(asyncio.Semaphore(1))
+        callers = [asyncio.create_task(flight.do("key", call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        call.release.set()
+        results = await asyncio.gather(*callers)
+        assert call.started == 1
+        assert results == [{"score": 7}] * 3
+        # Waiters get their own copies
+        assert results[0] is not results[1]
+        assert flight._stats.snapshot()["coalesced"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_one_waiter_keeps_the_call_for_the_others():
+    async def scenario():
+        flight = make_flight()
+        call = SlowCall(asyncio.Semaphore(1))
+        first = asyncio.create_task(flight.do("key", call))
+        second = asyncio.create_task(flight.do("key", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        call.release.set()
+        assert await second == {"score": 7}
+        assert call.cancelled == 0
+
+    asyncio.run(scenario())
+
+
+def test_call_is_cancelled_when_its_last_waiter_goes_away():
+    async def scenario():
+        flight = make_flight()
+        semaphore = asyncio.Semaphore(1)
+        call = SlowCall(semaphore)
+        callers = [asyncio.create_task(flight.do("key", call)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert semaphore.locked()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert call.cancelled == 1
+        assert not semaphore.locked()  # The slot is free for other jobs
+
+        # A later caller starts a fresh call instead of joining the cancelled one
+        retry = asyncio.create_task(flight.do("key", call))
+        await asyncio.sleep(0)
+        call.release.set()
+        assert await retry == {"score": 7}
+        assert call.started == 2
+
+    asyncio.run(scenario())
+
+
+def test_timed_out_waiter_cancels_the_call():
+    async def scenario():
+        flight = make_flight()
+        semaphore = asyncio.Semaphore(1)
+        call = SlowCall(semaphore)
+        try:
+            await asyncio.wait_for(flight.do("key", call), 0.01)
+        except TimeoutError:
+            pass
+        await asyncio.sleep(0)
+        assert call.cancelled == 1
+        assert not semaphore.locked()
+
+    asyncio.run(scenario())
+
+
+def test_errors_reach_every_waiter():
+    async def scenario():
+        flight = make_flight()
+        release = asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise ValueError("bad response")
+
+        callers = [asyncio.create_task(flight.do("key", failing)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+
+    asyncio.run(scenario())
+
+
+def test_short_deadline_caller_does_not_cut_the_shared_call_short(monkeypatch):
+    monkeypatch.setattr(config, "MOCK_LATENCY_SECONDS", 0.4)
+    client = MockProvider("", "mock-model")
+    prompt = "sync deadline regression"
+    outcomes = {}
+
+    def caller(name, seconds):
+        try:
+            outcomes[name] = analysis.request_critique(client, prompt, deadlines.Deadline(seconds))
+        except deadlines.DeadlineExceeded as e:
+            outcomes[name] = e
+
+    # The short-deadline caller starts (and so owns) the shared call
+    short = threading.Thread(target=caller, args=("short", 0.1))
+    short.start()
+    time.sleep(0.02)
+    long = threading.Thread(target=caller, args=("long", 5))
+    long.start()
+    short.join()
+    long.join()
+    assert isinstance(outcomes["short"], deadlines.DeadlineExceeded)
+    assert outcomes["long"]["scores"]
+
+
+def test_short_deadline_waiter_does_not_cut_the_shared_async_call_short(monkeypatch):
+    monkeypatch.setattr(config, "MOCK_LATENCY_SECONDS", 0.2)
+    client = MockProvider("", "mock-model")
+    prompt = "async deadline regression"
+
+    async def scenario():
+        short = asyncio.create_task(analysis.arequest_critique(client, prompt, deadline=deadlines.Deadline(0.05)))
+        await asyncio.sleep(0)
+        long = asyncio.create_task(analysis.arequest_critique(client, prompt, deadline=deadlines.Deadline(5)))
+        with pytest.raises(deadlines.DeadlineExceeded):
+            await short
+        assert (await long)["scores"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,133 @@
+"""Tests for the pre-flight checks on raw uploads (src/validators.py)."""
+import io
+
+import pytest
+from reportlab.pdfgen import canvas
+
+from src import config, validators
+
+TEXT_PAGE = b"<< /Type /Page /Parent 2 0 R /Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>"
+IMAGE_PAGE = b"<< /Type /Page /Parent 2 0 R /Resources << /XObject << /Im1 6 0 R >> >> /Contents 5 0 R >>"
+IMAGE = b"<< /Type /XObject /Subtype /Image /Width 1 /Height 1 /BitsPerComponent 8 >>"
+
+
+def raw_pdf(*objects, eof=True):
+    """Uncompressed PDF bytes with the given objects (enough for the byte-level checks)."""
+    body = b"%PDF-1.4\n" + b"".join(b"%d 0 obj\n%s\nendobj\n" % (n, obj) for n, obj in enumerate(objects, start=3))
+    body += b"trailer\n<< /Root 1 0 R >>\n" + b" " * 100
+    return body + (b"%%EOF\n" if eof else b"")
+
+
+def reportlab_pdf(pages):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for n in range(pages):
+        pdf.drawString(72, 720, f"Page {n + 1}: led a team of five engineers")
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+class Upload(io.BytesIO):
+    """Stand-in for Streamlit's UploadedFile, which is a BytesIO with a name and size."""
+
+    def __init__(self, name, content):
+        super().__init__(content)
+        self.name = name
+        self.size = len(content)
+
+
+def test_sniff_file_type():
+    assert validators.sniff_file_type(b"%PDF-1.7\n...") == "pdf"
+    assert validators.sniff_file_type(b"\xef\xbb\xbfjunk\n%PDF-1.4\n") == "pdf"  # Junk before the header
+    assert validators.sniff_file_type(b"Jane Doe\nSoftware engineer") == "txt"
+    assert validators.sniff_file_type(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR") == ""
+    assert validators.sniff_file_type(b"") == ""
+
+
+@pytest.mark.parametrize("content, filename, message", [
+    (b"\x89PNG\r\n\x1a\n\x00\x00" * 20, "photo.pdf", "does not look like a PDF or text file"),
+    (b"Jane Doe, software engineer. " * 10, "resume.pdf", "has a .pdf extension but its content looks like TXT"),
+    (raw_pdf(TEXT_PAGE), "resume.txt", "has a .txt extension but its content looks like PDF"),
+    (raw_pdf(TEXT_PAGE, eof=False), "resume.pdf", "truncated or corrupted"),
+])
+def test_content_is_rejected(content, filename, message):
+    is_valid, error = validators.validate_file_content(content, filename)
+    assert not is_valid
+    assert message in error and f"'{filename}'" in error
+
+
+def test_text_based_files_are_accepted():
+    assert validators.validate_file_content(b"Jane Doe, software engineer. " * 10, "resume.txt") == (True, "")
+    assert validators.validate_file_content(reportlab_pdf(2), "resume.pdf") == (True, "")
+
+
+def test_page_count_is_estimated_from_raw_bytes():
+    assert validators.estimate_pdf_page_count(reportlab_pdf(3)) == 3
+    # /Type /Pages (the page tree) is not a page
+    assert validators.estimate_pdf_page_count(raw_pdf(b"<< /Type /Pages /Count 2 >>", TEXT_PAGE, TEXT_PAGE)) == 2
+    # Pages hidden in object streams: fall back to the page tree's /Count, else unknown
+    assert validators.estimate_pdf_page_count(raw_pdf(b"<< /Type /ObjStm >>", b"<< /Count 4 >>")) == 4
+    assert validators.estimate_pdf_page_count(raw_pdf(b"<< /Type /ObjStm /N 12 >>")) == 0
+
+
+def test_page_limit(monkeypatch):
+    monkeypatch.setattr(config, "MAX_PDF_PAGES", 3)
+    assert validators.validate_file_content(reportlab_pdf(3), "long.pdf") == (True, "")
+    is_valid, error = validators.validate_file_content(reportlab_pdf(4), "long.pdf")
+    assert not is_valid and "about 4 pages" in error
+    # An unknown page count is left to extraction, not treated as corrupted
+    assert validators.validate_file_content(raw_pdf(b"<< /Type /ObjStm /N 12 >>", b"<< /Font 1 >>"), "packed.pdf") == (True, "")
+
+
+def test_image_only_pdf():
+    scanned = raw_pdf(IMAGE_PAGE, IMAGE)
+    assert validators.is_image_only_pdf(scanned)
+    assert not validators.is_image_only_pdf(raw_pdf(TEXT_PAGE, IMAGE))  # Images plus a text layer
+    assert not validators.is_image_only_pdf(raw_pdf(IMAGE_PAGE, IMAGE, b"<< /Type /ObjStm >>"))  # Fonts may be hidden
+    is_valid, error = validators.validate_file_content(scanned, "scan.pdf")
+    assert not is_valid and "image-only" in error
+
+
+def test_preflight_checks_each_file_independently():
+    good_pdf = Upload("good.pdf", reportlab_pdf(1))
+    good_txt = Upload("good.txt", b"Jane Doe, software engineer. " * 10)
+    files = [
+        good_pdf,
+        Upload("scan.pdf", raw_pdf(IMAGE_PAGE, IMAGE)),
+        Upload("notes.docx", b"PK\x03\x04" * 50),
+        Upload("tiny.txt", b"hi"),
+        good_txt,
+    ]
+    accepted, rejected = validators.preflight_file_batch(files)
+    assert accepted == [good_pdf, good_txt]
+    assert [name for name, _ in rejected] == ["scan.pdf", "notes.docx", "tiny.txt"]
+    assert "image-only" in rejected[0][1]
+    assert "not allowed" in rejected[1][1]
+    assert "too small" in rejected[2][1]
+    # Accepted files are rewound for extraction
+    assert good_pdf.tell() == 0 and good_pdf.read(5) == b"%PDF-"
+
+
+@pytest.mark.parametrize("url, message", [
+    ("file:///etc/passwd", "must use http or https"),
+    ("http:///hook", "has no host"),
+    ("http://user:pw@93.184.216.34/hook", "must not contain credentials"),
+    ("http://93.184.216.34:99999/hook", "not a valid URL"),
+    ("http://10.0.0.5/hook", "not a public address"),
+    ("http://[::ffff:127.0.0.1]/hook", "not a public address"),
+    ("http://169.254.169.254/latest/meta-data", "not a public address"),
+])
+def test_callback_url_is_rejected(url, message):
+    is_valid, error = validators.validate_callback_url(url)
+    assert not is_valid and message in error
+
+
+def test_callback_url_allow_list(monkeypatch):
+    assert validators.validate_callback_url("https://93.184.216.34/hook") == (True, "")
+    monkeypatch.setattr(config, "API_WEBHOOK_ALLOWED_HOSTS", ["hooks.example.com", ".corp.example", "10.0.0.5"])
+    assert validators.validate_callback_url("https://hooks.example.com/done") == (True, "")
+    assert validators.validate_callback_url("https://ci.corp.example/done") == (True, "")
+    assert validators.validate_callback_url("http://10.0.0.5/hook") == (True, "")  # Listed hosts are trusted
+    assert not validators.validate_callback_url("https://evil-hooks.example.com/done")[0]
+    assert not validators.validate_callback_url("https://93.184.216.34/hook")[0]
@@ -2,7 +2,11 @@
 Input validation utilities for Resume Critiquer application.
 Validates uploaded files, extracted text, and user inputs.
 """
-from typing import Tuple, Optional
+import ipaddress
+import re
+import socket
+from typing import List, Tuple, Optional
+from urllib.parse import urlsplit
 from src import config
 
 
@@ -37,8 +41,7 @@ def validate_uploaded_file(uploaded_file) -> Tuple[bool, str]:
         return False, f"File '{uploaded_file.name}' is {size_mb:.1f}MB, exceeds maximum size of {config.MAX_FILE_SIZE_MB}MB"
 
     # Check minimum file size (resumes shouldn't be empty or tiny)
-    min_size = 100  # 100 bytes minimum
-    if uploaded_file.size < min_size:
+    if uploaded_file.size < config.MIN_FILE_SIZE_BYTES:
         return False, f"File '{uploaded_file.name}' is too small ({uploaded_file.size} bytes). May be empty or corrupted."
 
     return True, ""
@@ -69,6 +72,199 @@ def validate_file_batch(uploaded_files: list) -> Tuple[bool, str]:
     return True, ""
 
 
+def validate_zip_archive(uploaded_file) -> Tuple[bool, str]:
+    """
+    Validate an uploaded ZIP of resumes before it is opened.
+
+    Args:
+        uploaded_file: Streamlit UploadedFile object
+
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    if uploaded_file is None:
+        return False, "No file provided"
+
+    if not uploaded_file.name.lower().endswith(".zip"):
+        return False, f"'{uploaded_file.name}' is not a .zip archive"
+
+    if uploaded_file.size > config.ZIP_MAX_ARCHIVE_BYTES:
+        size_mb = uploaded_file.size / (1024 * 1024)
+        return False, f"Archive '{uploaded_file.name}' is {size_mb:.0f}MB, exceeds maximum size of {config.ZIP_MAX_ARCHIVE_MB}MB"
+
+    return True, ""
+
+
+def validate_zip_member(info) -> Tuple[bool, str]:
+    """
+    Validate one ZIP entry from its header, before any of it is decompressed.
+
+    Sizes in the header can lie; bulk_ingest.read_member enforces them while
+    decompressing.
+
+    Args:
+        info: zipfile.ZipInfo of the entry
+
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    name = info.filename
+    file_extension = name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+    if file_extension not in config.ALLOWED_FILE_TYPES:
+        return False, f"File type '.{file_extension}' not allowed. Allowed types: {', '.join(config.ALLOWED_FILE_TYPES)}"
+
+    if info.flag_bits & 0x1:
+        return False, f"'{name}' is encrypted"
+
+    if info.file_size > config.MAX_FILE_SIZE_BYTES:
+        size_mb = info.file_size / (1024 * 1024)
+        return False, f"'{name}' is {size_mb:.1f}MB uncompressed, exceeds maximum size of {config.MAX_FILE_SIZE_MB}MB"
+
+    if info.file_size < config.MIN_FILE_SIZE_BYTES:
+        return False, f"'{name}' is too small ({info.file_size} bytes). May be empty or corrupted."
+
+    if info.file_size > config.ZIP_MAX_COMPRESSION_RATIO * max(1, info.compress_size):
+        return False, f"'{name}' expands {info.file_size / max(1, info.compress_size):.0f}x when decompressed (possible zip bomb)"
+
+    return True, ""
+
+
+def sniff_file_type(content: bytes) -> str:
+    """
+    Detect the real file type from its leading bytes.
+
+    Args:
+        content: Raw file bytes (only the first few KB are inspected)
+
+    Returns:
+        "pdf", "txt", or empty string if the content looks like neither
+    """
+    head = content[:1024]
+    # PDF spec allows junk before the header, but it must appear in the first 1KB
+    if config.PDF_MAGIC_BYTES in head:
+        return "pdf"
+    # Plain text should not contain NUL bytes
+    if head and b"\x00" not in head:
+        return "txt"
+    return ""
+
+
+def estimate_pdf_page_count(content: bytes) -> int:
+    """
+    Estimate the page count of a PDF without parsing it.
+
+    Counts page objects in the raw bytes and falls back to the largest
+    /Count entry of the page tree. When the page tree itself lives in
+    compressed object streams (the default for pdfTeX and recent Word
+    exports) neither is visible, and the count is unknown.
+
+    Args:
+        content: Raw PDF bytes
+
+    Returns:
+        Estimated number of pages (0 if unknown)
+    """
+    pages = len(re.findall(rb"/Type\s*/Page(?![a-zA-Z])", content))
+    if pages:
+        return pages
+    counts = [int(m) for m in re.findall(rb"/Count\s+(\d+)", content)]
+    return max(counts) if counts else 0
+
+
+def is_image_only_pdf(content: bytes) -> bool:
+    """
+    Heuristically detect scanned / image-only PDFs from raw bytes.
+
+    A PDF that embeds images but never references a font has no text layer.
+    PDFs using compressed object streams hide their font dictionaries, so they
+    are never flagged here and are left to the extraction-time text check.
+
+    Args:
+        content: Raw PDF bytes
+
+    Returns:
+        True if the PDF appears to contain only images
+    """
+    if b"/ObjStm" in content:
+        return False
+    has_images = re.search(rb"/Subtype\s*/Image", content) is not None
+    has_fonts = b"/Font" in content
+    return has_images and not has_fonts
+
+
+def validate_file_content(content: bytes, filename: str = "") -> Tuple[bool, str]:
+    """
+    Validate raw file bytes before text extraction.
+
+    Checks run cheapest first and stop at the first failure:
+    magic bytes, PDF trailer, estimated page count (when it can be estimated
+    from raw bytes), then the image-only check.
+
+    Args:
+        content: Raw file bytes
+        filename: Original filename (for error messages)
+
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    file_ref = f"'{filename}'" if filename else "File"
+    declared_type = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+
+    detected_type = sniff_file_type(content)
+    if not detected_type:
+        return False, f"{file_ref} does not look like a PDF or text file."
+    if declared_type and detected_type != declared_type:
+        return False, f"{file_ref} has a .{declared_type} extension but its content looks like {detected_type.upper()}."
+
+    if detected_type != "pdf":
+        return True, ""
+
+    if b"%%EOF" not in content[-config.PDF_EOF_SCAN_BYTES:]:
+        return False, f"{file_ref} appears to be truncated or corrupted (missing PDF end-of-file marker)."
+
+    # 0 means the page tree is compressed; extraction still rejects PDFs without text
+    page_count = estimate_pdf_page_count(content)
+    if page_count > config.MAX_PDF_PAGES:
+        return False, f"{file_ref} has about {page_count} pages. Maximum: {config.MAX_PDF_PAGES} pages."
+
+    if is_image_only_pdf(content):
+        return False, f"{file_ref} looks like a scanned / image-only PDF with no text layer. Please upload a text-based PDF."
+
+    return True, ""
+
+
+def preflight_file_batch(uploaded_files: list) -> Tuple[list, List[Tuple[str, str]]]:
+    """
+    Run the cheap pre-flight checks over a batch of uploaded files.
+
+    Unlike validate_file_batch, a bad file does not reject the whole batch:
+    each file is checked independently (metadata first, then raw bytes) and
+    the reason for every rejection is reported.
+
+    Args:
+        uploaded_files: List of Streamlit UploadedFile objects
+
+    Returns:
+        Tuple of (accepted_files, rejected) where rejected is a list of
+        (filename, error_message) tuples
+    """
+    accepted = []
+    rejected = []
+    for uploaded_file in uploaded_files:
+        is_valid, error = validate_uploaded_file(uploaded_file)
+        if is_valid:
+            content = uploaded_file.read()
+            uploaded_file.seek(0)
+            is_valid, error = validate_file_content(content, uploaded_file.name)
+
+        if is_valid:
+            accepted.append(uploaded_file)
+        else:
+            rejected.append((sanitize_filename(uploaded_file.name), error))
+
+    return accepted, rejected
+
+
 def validate_extracted_text(text: str, filename: str = "") -> Tuple[bool, str]:
     """
     Validate extracted resume text.
@@ -147,6 +343,66 @@ def validate_target_role(target_role: Optional[str]) -> Tuple[bool, str]:
     return True, ""
 
 
+def _is_allowed_host(host: str) -> bool:
+    """Check a host against API_WEBHOOK_ALLOWED_HOSTS ("." entries match subdomains)."""
+    for allowed in config.API_WEBHOOK_ALLOWED_HOSTS:
+        if host == allowed or (allowed.startswith(".") and (host.endswith(allowed) or host == allowed[1:])):
+            return True
+    return False
+
+
+def validate_callback_url(url: str) -> Tuple[bool, str]:
+    """
+    Validate a webhook callback URL supplied with an API request.
+
+    Only http(s) URLs are accepted. With API_WEBHOOK_ALLOWED_HOSTS set the host
+    must be on that list; otherwise every address it resolves to must be public,
+    so callbacks can't reach loopback, private or link-local (cloud metadata)
+    services. Resolves DNS, so async callers should run it in a thread.
+
+    Args:
+        url: Callback URL
+
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    if len(url) > 2048:
+        return False, "Callback URL is too long (max 2048 characters)"
+
+    try:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        return False, "Callback URL is not a valid URL"
+
+    if parts.scheme not in ("http", "https"):
+        return False, "Callback URL must use http or https"
+    if not parts.hostname:
+        return False, "Callback URL has no host"
+    if parts.username or parts.password:
+        return False, "Callback URL must not contain credentials"
+
+    host = parts.hostname.lower()
+    if config.API_WEBHOOK_ALLOWED_HOSTS:
+        if _is_allowed_host(host):
+            return True, ""
+        return False, f"Callback host '{host}' is not allowed"
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError):
+        return False, f"Callback host '{host}' could not be resolved"
+
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])  # Drop an IPv6 zone id
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global:
+            return False, f"Callback host '{host}' is not a public address"
+
+    return True, ""
+
+
 def sanitize_filename(filename: str) -> str:
     """
     Sanitize filename to prevent directory traversal and injection attacks.